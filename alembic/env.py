@@ -1,8 +1,10 @@
+import re
 from logging.config import fileConfig
+from pathlib import Path
 
-from sqlalchemy import engine_from_config, pool
+from sqlalchemy import engine_from_config, inspect, pool
 
-from alembic import context
+from alembic import command, context
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
@@ -27,6 +29,35 @@ target_metadata = Base.metadata
 # ... etc.
 
 
+# Squashed DDL for the current head, applied in one round-trip on empty databases.
+FRESH_INSTALL_SQL = Path(__file__).with_name("fresh_install.sql")
+
+
+def fresh_install_sql(connection) -> str | None:
+    """Return the squashed schema SQL if it can be used for this upgrade.
+
+    The fast path only applies to `alembic upgrade head` on an empty database,
+    and only when the SQL file was generated for the current head revision;
+    otherwise the regular revision-by-revision upgrade runs.
+    """
+    cmd = getattr(config.cmd_opts, "cmd", None)
+    if not cmd or cmd[0] is not command.upgrade:
+        return None
+    if context.get_revision_argument() not in ("head", "heads"):
+        return None
+    if not FRESH_INSTALL_SQL.exists():
+        return None
+    inspector = inspect(connection)
+    if inspector.has_table("alembic_version") or inspector.has_table("users"):
+        return None
+
+    sql = FRESH_INSTALL_SQL.read_text(encoding="utf-8")
+    marker = re.search(r"^-- head: (\S+)$", sql, re.MULTILINE)
+    if marker is None or marker.group(1) != context.script.get_current_head():
+        return None
+    return sql
+
+
 def run_migrations_offline() -> None:
     """Run migrations in 'offline' mode.
 
@@ -67,8 +98,13 @@ def run_migrations_online() -> None:
     with connectable.connect() as connection:
         context.configure(connection=connection, target_metadata=target_metadata)
 
+        squashed_sql = fresh_install_sql(connection)
         with context.begin_transaction():
-            context.run_migrations()
+            if squashed_sql is not None:
+                connection.exec_driver_sql(squashed_sql)
+                context.get_context().stamp(context.script, "heads")
+            else:
+                context.run_migrations()
 
 
 if context.is_offline_mode():
@@ -0,0 +1,104 @@
+-- Squashed schema for fresh installs.
+--
+-- alembic/env.py runs this file in a single round-trip and stamps the database
+-- at the revision below when `alembic upgrade head` targets an empty database.
+-- Existing databases keep upgrading through the incremental revisions.
+--
+-- Keep this file in sync with alembic/versions/: when a revision is added,
+-- fold its DDL in here and update the head marker. If the marker does not
+-- match the current head, env.py ignores this file and runs every revision.
+--
+-- head: document_claimed_at_001
+
+CREATE EXTENSION IF NOT EXISTS vector;
+
+CREATE TABLE users (
+    id SERIAL PRIMARY KEY,
+    email VARCHAR NOT NULL,
+    username VARCHAR NOT NULL,
+    hashed_password VARCHAR NOT NULL,
+    full_name VARCHAR,
+    is_active BOOLEAN,
+    is_superuser BOOLEAN,
+    created_at TIMESTAMP WITHOUT TIME ZONE DEFAULT timezone('utc', now()),
+    updated_at TIMESTAMP WITHOUT TIME ZONE DEFAULT timezone('utc', now())
+);
+CREATE UNIQUE INDEX ix_users_email ON users (email);
+CREATE INDEX ix_users_id ON users (id);
+CREATE UNIQUE INDEX ix_users_username ON users (username);
+
+CREATE TABLE conversations (
+    id SERIAL PRIMARY KEY,
+    user_id INTEGER NOT NULL REFERENCES users (id),
+    title VARCHAR NOT NULL,
+    provider VARCHAR NOT NULL,
+    model VARCHAR NOT NULL,
+    created_at TIMESTAMP WITHOUT TIME ZONE DEFAULT timezone('utc', now()),
+    updated_at TIMESTAMP WITHOUT TIME ZONE DEFAULT timezone('utc', now()),
+    thread_id VARCHAR
+);
+CREATE INDEX ix_conversations_id ON conversations (id);
+CREATE UNIQUE INDEX ix_conversations_thread_id ON conversations (thread_id);
+CREATE INDEX ix_conversations_user_updated ON conversations (user_id, updated_at DESC);
+
+CREATE TABLE messages (
+    id SERIAL PRIMARY KEY,
+    conversation_id INTEGER NOT NULL REFERENCES conversations (id),
+    role VARCHAR NOT NULL,
+    content TEXT NOT NULL,
+    created_at TIMESTAMP WITHOUT TIME ZONE DEFAULT timezone('utc', now())
+);
+CREATE INDEX ix_messages_id ON messages (id);
+CREATE INDEX ix_messages_conversation_created ON messages (conversation_id, created_at DESC);
+
+CREATE TABLE documents (
+    id SERIAL PRIMARY KEY,
+    filename VARCHAR NOT NULL,
+    content TEXT,
+    file_path VARCHAR,
+    user_id INTEGER REFERENCES users (id),
+    created_at TIMESTAMP WITHOUT TIME ZONE DEFAULT timezone('utc', now()),
+    embedding halfvec(1536),
+    conversation_id INTEGER,
+    embedding_bin bit(1536) GENERATED ALWAYS AS (binary_quantize(embedding)) STORED,
+    processing_state VARCHAR NOT NULL DEFAULT 'ready',
+    content_hash VARCHAR(64),
+    claimed_at TIMESTAMP WITHOUT TIME ZONE,
+    source_document_id INTEGER,
+    content_tsv tsvector GENERATED ALWAYS AS (CASE WHEN embedding IS NOT NULL THEN to_tsvector('english', coalesce(filename, '') || ' ' || coalesce(content, '')) END) STORED,
+    CONSTRAINT fk_documents_conversation_id FOREIGN KEY (conversation_id) REFERENCES conversations (id),
+    CONSTRAINT fk_documents_source_document_id FOREIGN KEY (source_document_id) REFERENCES documents (id) ON DELETE CASCADE
+);
+CREATE INDEX ix_documents_id ON documents (id);
+CREATE INDEX ix_documents_user_conversation ON documents (user_id, conversation_id);
+CREATE INDEX ix_documents_user_content_hash ON documents (user_id, content_hash);
+CREATE INDEX ix_documents_source_document_id ON documents (source_document_id);
+CREATE INDEX ix_documents_embedding_bin_hnsw_conversation ON documents
+    USING hnsw (embedding_bin bit_hamming_ops) WITH (m = 24, ef_construction = 128)
+    WHERE conversation_id IS NOT NULL;
+CREATE INDEX ix_documents_embedding_bin_hnsw_shared ON documents
+    USING hnsw (embedding_bin bit_hamming_ops) WITH (m = 24, ef_construction = 128)
+    WHERE conversation_id IS NULL;
+CREATE INDEX ix_documents_content_tsv ON documents USING gin (content_tsv);
+CREATE INDEX ix_documents_processing ON documents (claimed_at) WHERE processing_state = 'processing';
+
+CREATE TABLE conversation_documents (
+    id SERIAL PRIMARY KEY,
+    conversation_id INTEGER NOT NULL REFERENCES conversations (id),
+    document_id INTEGER NOT NULL REFERENCES documents (id),
+    created_at TIMESTAMP WITHOUT TIME ZONE DEFAULT timezone('utc', now())
+);
+CREATE INDEX ix_conversation_documents_conversation_id ON conversation_documents (conversation_id);
+CREATE INDEX ix_conversation_documents_document_id ON conversation_documents (document_id);
+
+CREATE TABLE message_document_matches (
+    id SERIAL PRIMARY KEY,
+    message_id INTEGER NOT NULL REFERENCES messages (id),
+    document_id INTEGER NOT NULL REFERENCES documents (id),
+    matched_content TEXT,
+    relevance_score VARCHAR,
+    created_at TIMESTAMP WITHOUT TIME ZONE DEFAULT timezone('utc', now())
+);
+CREATE INDEX ix_message_document_matches_id ON message_document_matches (id);
+CREATE INDEX ix_message_document_matches_message_id ON message_document_matches (message_id);
+CREATE INDEX ix_message_document_matches_document_id ON message_document_matches (document_id);
@@ -8,9 +8,6 @@ Create Date: 2025-11-16 20:20:06.776153
 
 from typing import Sequence, Union
 
-import sqlalchemy as sa
-from pgvector.sqlalchemy import Vector
-
 from alembic import op
 
 # revision identifiers, used by Alembic.
@@ -25,82 +22,99 @@ def upgrade() -> None:
     # Create pgvector extension
     op.execute("CREATE EXTENSION IF NOT EXISTS vector")
 
-    # Create users table
-    op.create_table(
-        "users",
-        sa.Column("id", sa.Integer(), nullable=False),
-        sa.Column("email", sa.String(), nullable=False),
-        sa.Column("username", sa.String(), nullable=False),
-        sa.Column("hashed_password", sa.String(), nullable=False),
-        sa.Column("full_name", sa.String(), nullable=True),
-        sa.Column("is_active", sa.Boolean(), nullable=True),
-        sa.Column("is_superuser", sa.Boolean(), nullable=True),
-        sa.Column("created_at", sa.DateTime(), nullable=True),
-        sa.Column("updated_at", sa.DateTime(), nullable=True),
-        sa.PrimaryKeyConstraint("id"),
+    # Tables are created with raw DDL guarded by IF NOT EXISTS so re-running the
+    # migration after a partial failure is idempotent.
+    op.execute(
+        """
+        CREATE TABLE IF NOT EXISTS users (
+            id SERIAL PRIMARY KEY,
+            email VARCHAR NOT NULL,
+            username VARCHAR NOT NULL,
+            hashed_password VARCHAR NOT NULL,
+            full_name VARCHAR,
+            is_active BOOLEAN,
+            is_superuser BOOLEAN,
+            created_at TIMESTAMP WITHOUT TIME ZONE,
+            updated_at TIMESTAMP WITHOUT TIME ZONE
+        )
+        """
     )
-    op.create_index(op.f("ix_users_email"), "users", ["email"], unique=True)
-    op.create_index(op.f("ix_users_id"), "users", ["id"], unique=False)
-    op.create_index(op.f("ix_users_username"), "users", ["username"], unique=True)
 
-    # Create conversations table
-    op.create_table(
-        "conversations",
-        sa.Column("id", sa.Integer(), nullable=False),
-        sa.Column("user_id", sa.Integer(), nullable=False),
-        sa.Column("title", sa.String(), nullable=False),
-        sa.Column("provider", sa.String(), nullable=False),
-        sa.Column("model", sa.String(), nullable=False),
-        sa.Column("created_at", sa.DateTime(), nullable=True),
-        sa.Column("updated_at", sa.DateTime(), nullable=True),
-        sa.ForeignKeyConstraint(
-            ["user_id"],
-            ["users.id"],
-        ),
-        sa.PrimaryKeyConstraint("id"),
+    op.execute(
+        """
+        CREATE TABLE IF NOT EXISTS conversations (
+            id SERIAL PRIMARY KEY,
+            user_id INTEGER NOT NULL REFERENCES users (id),
+            title VARCHAR NOT NULL,
+            provider VARCHAR NOT NULL,
+            model VARCHAR NOT NULL,
+            created_at TIMESTAMP WITHOUT TIME ZONE,
+            updated_at TIMESTAMP WITHOUT TIME ZONE
+        )
+        """
     )
-    op.create_index(op.f("ix_conversations_id"), "conversations", ["id"], unique=False)
 
-    # Create messages table
-    op.create_table(
-        "messages",
-        sa.Column("id", sa.Integer(), nullable=False),
-        sa.Column("conversation_id", sa.Integer(), nullable=False),
-        sa.Column("role", sa.String(), nullable=False),
-        sa.Column("content", sa.Text(), nullable=False),
-        sa.Column("created_at", sa.DateTime(), nullable=True),
-        sa.ForeignKeyConstraint(
-            ["conversation_id"],
-            ["conversations.id"],
-        ),
-        sa.PrimaryKeyConstraint("id"),
+    op.execute(
+        """
+        CREATE TABLE IF NOT EXISTS messages (
+            id SERIAL PRIMARY KEY,
+            conversation_id INTEGER NOT NULL REFERENCES conversations (id),
+            role VARCHAR NOT NULL,
+            content TEXT NOT NULL,
+            created_at TIMESTAMP WITHOUT TIME ZONE
+        )
+        """
     )
-    op.create_index(op.f("ix_messages_id"), "messages", ["id"], unique=False)
 
-    # Create documents table
-    op.create_table(
-        "documents",
-        sa.Column("id", sa.Integer(), nullable=False),
-        sa.Column("filename", sa.String(), nullable=False),
-        sa.Column("content", sa.Text(), nullable=True),
-        sa.Column("file_path", sa.String(), nullable=True),
-        sa.Column("user_id", sa.Integer(), nullable=True),
-        sa.Column("created_at", sa.DateTime(), nullable=True),
-        sa.Column("embedding", Vector(1536), nullable=True),
-        sa.ForeignKeyConstraint(
-            ["user_id"],
-            ["users.id"],
-        ),
-        sa.PrimaryKeyConstraint("id"),
+    op.execute(
+        """
+        CREATE TABLE IF NOT EXISTS documents (
+            id SERIAL PRIMARY KEY,
+            filename VARCHAR NOT NULL,
+            content TEXT,
+            file_path VARCHAR,
+            user_id INTEGER REFERENCES users (id),
+            created_at TIMESTAMP WITHOUT TIME ZONE,
+            embedding vector(1536)
+        )
+        """
     )
-    op.create_index(op.f("ix_documents_id"), "documents", ["id"], unique=False)
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block, so the
+    # indexes are built after the tables are committed. This keeps index builds
+    # from taking a write-blocking lock when the migration runs on a live DB.
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS ix_users_email ON users (email)"
+        )
+        op.execute("CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_users_id ON users (id)")
+        op.execute(
+            "CREATE UNIQUE INDEX CONCURRENTLY IF NOT EXISTS ix_users_username ON users (username)"
+        )
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_conversations_id ON conversations (id)"
+        )
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_messages_id ON messages (id)"
+        )
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_documents_id ON documents (id)"
+        )
+        # ANN index for pgvector similarity search. The QA engine ranks chunks by
+        # cosine distance (`<=>`), so the index must use vector_cosine_ops.
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_documents_embedding_hnsw ON documents "
+            "USING hnsw (embedding vector_cosine_ops) WITH (m = 16, ef_construction = 64)"
+        )
 
 
 def downgrade() -> None:
     """Downgrade schema."""
-    op.drop_table("documents")
-    op.drop_table("messages")
-    op.drop_table("conversations")
-    op.drop_table("users")
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_documents_embedding_hnsw")
+    op.execute("DROP TABLE IF EXISTS documents")
+    op.execute("DROP TABLE IF EXISTS messages")
+    op.execute("DROP TABLE IF EXISTS conversations")
+    op.execute("DROP TABLE IF EXISTS users")
     # Drop pgvector extension
     op.execute("DROP EXTENSION IF EXISTS vector")
@@ -0,0 +1,57 @@
+"""add indexes for chat history and document match lookups
+
+Revision ID: chat_lookup_indexes_001
+Revises: embedding_bin_001
+Create Date: 2025-11-19 12:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = "chat_lookup_indexes_001"
+down_revision: Union[str, None] = "embedding_bin_001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (index name, table, column list) for every index added by this revision
+INDEXES = [
+    # Conversation history is always fetched per conversation in time order
+    (
+        "ix_messages_conversation_created",
+        "messages",
+        "conversation_id, created_at DESC",
+    ),
+    (
+        "ix_conversation_documents_conversation_id",
+        "conversation_documents",
+        "conversation_id",
+    ),
+    ("ix_conversation_documents_document_id", "conversation_documents", "document_id"),
+    (
+        "ix_message_document_matches_message_id",
+        "message_document_matches",
+        "message_id",
+    ),
+    (
+        "ix_message_document_matches_document_id",
+        "message_document_matches",
+        "document_id",
+    ),
+]
+
+
+def upgrade() -> None:
+    # Build the indexes without blocking writes; CONCURRENTLY must run outside a transaction
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.execute(
+                f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table} ({columns})"
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, _, _ in reversed(INDEXES):
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
@@ -0,0 +1,30 @@
+"""add (user_id, updated_at) index on conversations for the conversation list
+
+Revision ID: conversation_list_idx_001
+Revises: document_content_hash_001
+Create Date: 2025-11-23 12:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = "conversation_list_idx_001"
+down_revision: Union[str, None] = "document_content_hash_001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Build the index without blocking writes; CONCURRENTLY must run outside a transaction
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_conversations_user_updated "
+            "ON conversations (user_id, updated_at DESC)"
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_conversations_user_updated")
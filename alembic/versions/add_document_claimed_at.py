@@ -0,0 +1,36 @@
+"""add claimed_at to documents for recovering interrupted ingestion
+
+Revision ID: document_claimed_at_001
+Revises: embedding_halfvec_001
+Create Date: 2025-12-02 12:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = "document_claimed_at_001"
+down_revision: Union[str, None] = "embedding_halfvec_001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Nullable without a default: a metadata-only change, existing rows are not rewritten
+    op.execute(
+        "ALTER TABLE documents ADD COLUMN IF NOT EXISTS claimed_at TIMESTAMP WITHOUT TIME ZONE"
+    )
+
+    # Startup recovery scans only the few uploads still processing
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_documents_processing "
+            "ON documents (claimed_at) WHERE processing_state = 'processing'"
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_documents_processing")
+    op.execute("ALTER TABLE documents DROP COLUMN IF EXISTS claimed_at")
@@ -0,0 +1,35 @@
+"""add content hash to documents for duplicate upload detection
+
+Revision ID: document_content_hash_001
+Revises: documents_user_conv_idx_001
+Create Date: 2025-11-22 12:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = "document_content_hash_001"
+down_revision: Union[str, None] = "documents_user_conv_idx_001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute(
+        "ALTER TABLE documents ADD COLUMN IF NOT EXISTS content_hash VARCHAR(64)"
+    )
+
+    # Build the index without blocking writes; CONCURRENTLY must run outside a transaction
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_documents_user_content_hash "
+            "ON documents (user_id, content_hash)"
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_documents_user_content_hash")
+    op.execute("ALTER TABLE documents DROP COLUMN IF EXISTS content_hash")
@@ -0,0 +1,39 @@
+"""add full-text search column for hybrid retrieval
+
+Revision ID: document_content_tsv_001
+Revises: document_source_id_001
+Create Date: 2025-11-27 12:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = "document_content_tsv_001"
+down_revision: Union[str, None] = "document_source_id_001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Generated only for embedded chunk rows: uploaded documents hold the full text,
+    # which can exceed the 1 MB tsvector limit and is never searched directly.
+    op.execute(
+        "ALTER TABLE documents ADD COLUMN content_tsv tsvector "
+        "GENERATED ALWAYS AS (CASE WHEN embedding IS NOT NULL THEN "
+        "to_tsvector('english', coalesce(filename, '') || ' ' || coalesce(content, '')) END) STORED"
+    )
+
+    # Build the index without blocking writes; CONCURRENTLY must run outside a transaction
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_documents_content_tsv "
+            "ON documents USING gin (content_tsv)"
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_documents_content_tsv")
+    op.drop_column("documents", "content_tsv")
@@ -0,0 +1,27 @@
+"""add processing state to documents for background ingestion
+
+Revision ID: document_processing_state_001
+Revises: chat_lookup_indexes_001
+Create Date: 2025-11-20 12:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = "document_processing_state_001"
+down_revision: Union[str, None] = "chat_lookup_indexes_001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # A constant default is a metadata-only change on Postgres 11+, so existing rows are not rewritten
+    op.execute(
+        "ALTER TABLE documents ADD COLUMN IF NOT EXISTS processing_state VARCHAR NOT NULL DEFAULT 'ready'"
+    )
+
+
+def downgrade() -> None:
+    op.execute("ALTER TABLE documents DROP COLUMN IF EXISTS processing_state")
@@ -0,0 +1,47 @@
+"""link embedded chunk rows to the uploaded document they were split from
+
+Revision ID: document_source_id_001
+Revises: timestamp_server_defaults_001
+Create Date: 2025-11-26 12:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "document_source_id_001"
+down_revision: Union[str, None] = "timestamp_server_defaults_001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Nullable without a default: a catalog-only change, no table rewrite
+    op.add_column(
+        "documents", sa.Column("source_document_id", sa.Integer(), nullable=True)
+    )
+    op.create_foreign_key(
+        "fk_documents_source_document_id",
+        "documents",
+        "documents",
+        ["source_document_id"],
+        ["id"],
+        ondelete="CASCADE",
+    )
+    # Build the index without blocking writes; CONCURRENTLY must run outside a transaction
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_documents_source_document_id "
+            "ON documents (source_document_id)"
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_documents_source_document_id")
+    op.drop_constraint(
+        "fk_documents_source_document_id", "documents", type_="foreignkey"
+    )
+    op.drop_column("documents", "source_document_id")
@@ -0,0 +1,30 @@
+"""add composite index on documents (user_id, conversation_id)
+
+Revision ID: documents_user_conv_idx_001
+Revises: document_processing_state_001
+Create Date: 2025-11-21 12:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = "documents_user_conv_idx_001"
+down_revision: Union[str, None] = "document_processing_state_001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Build the index without blocking writes; CONCURRENTLY must run outside a transaction
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_documents_user_conversation "
+            "ON documents (user_id, conversation_id)"
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_documents_user_conversation")
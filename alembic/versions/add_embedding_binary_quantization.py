@@ -0,0 +1,38 @@
+"""add binary-quantized embedding column
+
+Revision ID: embedding_bin_001
+Revises: message_doc_matches_001
+Create Date: 2025-11-18 12:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = "embedding_bin_001"
+down_revision: Union[str, None] = "message_doc_matches_001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Generated shadow column: 1 bit per dimension (32x smaller than float32) used as
+    # a coarse first-stage filter; similarity_search re-ranks on the full embedding.
+    op.execute(
+        "ALTER TABLE documents ADD COLUMN embedding_bin bit(1536) "
+        "GENERATED ALWAYS AS (binary_quantize(embedding)) STORED"
+    )
+
+    # Build the index without blocking writes; CONCURRENTLY must run outside a transaction
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_documents_embedding_bin_hnsw "
+            "ON documents USING hnsw (embedding_bin bit_hamming_ops)"
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_documents_embedding_bin_hnsw")
+    op.drop_column("documents", "embedding_bin")
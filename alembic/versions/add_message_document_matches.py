@@ -8,7 +8,6 @@ Create Date: 2025-11-17 12:00:00.000000
 from typing import Sequence, Union
 
 from alembic import op
-import sqlalchemy as sa
 
 
 # revision identifiers, used by Alembic.
@@ -19,22 +18,24 @@ depends_on: Union[str, Sequence[str], None] = None
 
 
 def upgrade() -> None:
-    # Create message_document_matches table
-    op.create_table(
-        'message_document_matches',
-        sa.Column('id', sa.Integer(), nullable=False),
-        sa.Column('message_id', sa.Integer(), nullable=False),
-        sa.Column('document_id', sa.Integer(), nullable=False),
-        sa.Column('matched_content', sa.Text(), nullable=True),
-        sa.Column('relevance_score', sa.String(), nullable=True),
-        sa.Column('created_at', sa.DateTime(), nullable=True),
-        sa.ForeignKeyConstraint(['document_id'], ['documents.id'], ),
-        sa.ForeignKeyConstraint(['message_id'], ['messages.id'], ),
-        sa.PrimaryKeyConstraint('id')
-    )
-    op.create_index(op.f('ix_message_document_matches_id'), 'message_document_matches', ['id'], unique=False)
+    # Create message_document_matches table (idempotent raw DDL)
+    op.execute("""
+        CREATE TABLE IF NOT EXISTS message_document_matches (
+            id SERIAL PRIMARY KEY,
+            message_id INTEGER NOT NULL REFERENCES messages (id),
+            document_id INTEGER NOT NULL REFERENCES documents (id),
+            matched_content TEXT,
+            relevance_score VARCHAR,
+            created_at TIMESTAMP WITHOUT TIME ZONE
+        )
+    """)
+
+    # Build the index without blocking writes; CONCURRENTLY must run outside a transaction
+    with op.get_context().autocommit_block():
+        op.execute("CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_message_document_matches_id ON message_document_matches (id)")
 
 
 def downgrade() -> None:
-    op.drop_index(op.f('ix_message_document_matches_id'), table_name='message_document_matches')
-    op.drop_table('message_document_matches')
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_message_document_matches_id")
+    op.execute("DROP TABLE IF EXISTS message_document_matches")
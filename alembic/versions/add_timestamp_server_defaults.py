@@ -0,0 +1,40 @@
+"""stamp created_at/updated_at in the database
+
+Revision ID: timestamp_server_defaults_001
+Revises: drop_embedding_hnsw_001
+Create Date: 2025-11-25 12:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = "timestamp_server_defaults_001"
+down_revision: Union[str, None] = "drop_embedding_hnsw_001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TIMESTAMP_COLUMNS = [
+    ("users", "created_at"),
+    ("users", "updated_at"),
+    ("conversations", "created_at"),
+    ("conversations", "updated_at"),
+    ("messages", "created_at"),
+    ("documents", "created_at"),
+    ("conversation_documents", "created_at"),
+    ("message_document_matches", "created_at"),
+]
+
+
+def upgrade() -> None:
+    # Only the column default changes; existing rows are not rewritten
+    for table, column in TIMESTAMP_COLUMNS:
+        op.execute(
+            f"ALTER TABLE {table} ALTER COLUMN {column} SET DEFAULT timezone('utc', now())"
+        )
+
+
+def downgrade() -> None:
+    for table, column in TIMESTAMP_COLUMNS:
+        op.execute(f"ALTER TABLE {table} ALTER COLUMN {column} DROP DEFAULT")
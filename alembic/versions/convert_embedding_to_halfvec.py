@@ -0,0 +1,99 @@
+"""store documents.embedding as halfvec(1536)
+
+Databases created by the initial revision hold vector(1536). Searches bind the
+query as halfvec, so the column is converted in place. Both generated columns
+are computed from the embedding, and Postgres will not change the type of a
+column they use, so they are dropped around the conversion and added back with
+their indexes. Every row is rewritten, so run this in a maintenance window.
+
+Revision ID: embedding_halfvec_001
+Revises: embedding_unit_norm_001
+Create Date: 2025-12-01 12:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+
+from alembic import op
+
+revision: str = "embedding_halfvec_001"
+down_revision: Union[str, None] = "embedding_unit_norm_001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+_BIN_INDEX = "ON documents USING hnsw (embedding_bin bit_hamming_ops) WITH (m = 24, ef_construction = 128)"
+
+
+def _embedding_type() -> str:
+    if op.get_context().as_sql:
+        # Offline (--sql) scripts cannot inspect the column; they always convert
+        return ""
+    return (
+        op.get_bind()
+        .execute(
+            sa.text(
+                "SELECT format_type(atttypid, atttypmod) FROM pg_attribute "
+                "WHERE attrelid = 'documents'::regclass AND attname = 'embedding'"
+            )
+        )
+        .scalar_one()
+    )
+
+
+def _convert(column_type: str) -> None:
+    with op.get_context().autocommit_block():
+        op.execute(
+            "DROP INDEX CONCURRENTLY IF EXISTS ix_documents_embedding_bin_hnsw_conversation"
+        )
+        op.execute(
+            "DROP INDEX CONCURRENTLY IF EXISTS ix_documents_embedding_bin_hnsw_shared"
+        )
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_documents_content_tsv")
+        # Built for vector_cosine_ops by the initial revision; drop_embedding_hnsw_001
+        # normally removed it already
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_documents_embedding_hnsw")
+
+    op.drop_column("documents", "embedding_bin")
+    op.drop_column("documents", "content_tsv")
+    op.execute(
+        f"ALTER TABLE documents ALTER COLUMN embedding TYPE {column_type} USING embedding::{column_type}"
+    )
+    op.execute(
+        "ALTER TABLE documents ADD COLUMN embedding_bin bit(1536) "
+        "GENERATED ALWAYS AS (binary_quantize(embedding)) STORED"
+    )
+    op.execute(
+        "ALTER TABLE documents ADD COLUMN content_tsv tsvector "
+        "GENERATED ALWAYS AS (CASE WHEN embedding IS NOT NULL THEN "
+        "to_tsvector('english', coalesce(filename, '') || ' ' || coalesce(content, '')) END) STORED"
+    )
+
+    # CONCURRENTLY must run outside a transaction
+    with op.get_context().autocommit_block():
+        op.execute("SET maintenance_work_mem = '1GB'")
+        op.execute(
+            f"CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_documents_embedding_bin_hnsw_conversation {_BIN_INDEX} "
+            "WHERE conversation_id IS NOT NULL"
+        )
+        op.execute(
+            f"CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_documents_embedding_bin_hnsw_shared {_BIN_INDEX} "
+            "WHERE conversation_id IS NULL"
+        )
+        op.execute("RESET maintenance_work_mem")
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_documents_content_tsv "
+            "ON documents USING gin (content_tsv)"
+        )
+
+
+def upgrade() -> None:
+    # Databases created while the initial revision declared halfvec already match
+    if _embedding_type() != "halfvec(1536)":
+        _convert("halfvec(1536)")
+
+
+def downgrade() -> None:
+    if _embedding_type() != "vector(1536)":
+        _convert("vector(1536)")
@@ -0,0 +1,34 @@
+"""drop the full-precision HNSW index on documents.embedding
+
+Similarity search probes the binary-quantized index and re-ranks the
+candidates from the heap, so this index is never scanned but still holds a
+second copy of every embedding in memory and is maintained on every insert.
+
+Revision ID: drop_embedding_hnsw_001
+Revises: conversation_list_idx_001
+Create Date: 2025-11-24 12:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = "drop_embedding_hnsw_001"
+down_revision: Union[str, None] = "conversation_list_idx_001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # CONCURRENTLY must run outside a transaction
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_documents_embedding_hnsw")
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_documents_embedding_hnsw ON documents "
+            "USING hnsw (embedding vector_cosine_ops) WITH (m = 16, ef_construction = 64)"
+        )
@@ -0,0 +1,32 @@
+"""scale stored embeddings to unit length
+
+Revision ID: embedding_unit_norm_001
+Revises: embedding_bin_hnsw_scoped_001
+Create Date: 2025-11-30 12:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = "embedding_unit_norm_001"
+down_revision: Union[str, None] = "embedding_bin_hnsw_scoped_001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Searches now rank by inner product, which equals cosine similarity only for
+    # unit vectors. New chunks are normalized on insert; OpenAI embeddings already
+    # are, so this only rewrites rows from other providers. Scaling keeps every
+    # sign, so the generated binary-quantized column is unchanged.
+    op.execute(
+        "UPDATE documents SET embedding = l2_normalize(embedding) "
+        "WHERE embedding IS NOT NULL AND abs(l2_norm(embedding) - 1) > 0.001"
+    )
+
+
+def downgrade() -> None:
+    # Cosine distance is scale invariant, so normalized rows suit the old searches too
+    pass
@@ -0,0 +1,50 @@
+"""split the binary embedding HNSW index by conversation scope
+
+Revision ID: embedding_bin_hnsw_scoped_001
+Revises: embedding_bin_hnsw_tuned_001
+Create Date: 2025-11-29 12:00:00.000000
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = "embedding_bin_hnsw_scoped_001"
+down_revision: Union[str, None] = "embedding_bin_hnsw_tuned_001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+_INDEX = "ON documents USING hnsw (embedding_bin bit_hamming_ops) WITH (m = 24, ef_construction = 128)"
+
+
+def upgrade() -> None:
+    # One graph per search scope: a search inside a conversation no longer walks the
+    # conversation-less documents (and vice versa) only to filter them out afterwards
+    with op.get_context().autocommit_block():
+        op.execute("SET maintenance_work_mem = '1GB'")
+        op.execute(
+            f"CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_documents_embedding_bin_hnsw_conversation {_INDEX} "
+            "WHERE conversation_id IS NOT NULL"
+        )
+        op.execute(
+            f"CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_documents_embedding_bin_hnsw_shared {_INDEX} "
+            "WHERE conversation_id IS NULL"
+        )
+        op.execute("RESET maintenance_work_mem")
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_documents_embedding_bin_hnsw")
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute("SET maintenance_work_mem = '1GB'")
+        op.execute(
+            f"CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_documents_embedding_bin_hnsw {_INDEX}"
+        )
+        op.execute("RESET maintenance_work_mem")
+        op.execute(
+            "DROP INDEX CONCURRENTLY IF EXISTS ix_documents_embedding_bin_hnsw_conversation"
+        )
+        op.execute(
+            "DROP INDEX CONCURRENTLY IF EXISTS ix_documents_embedding_bin_hnsw_shared"
+        )
@@ -82,14 +82,18 @@ async def example_3_multi_provider():
     for name, cfg in llm_loader.providers.items():
         print(f"  - {name}: {cfg.provider} ({cfg.model})")
 
-    # Build models from different providers
+    # Build models from different providers concurrently
     print("\nBuilding models:")
-    for provider_name in ["openai", "azure", "ollama"]:
-        try:
-            model = llm_loader.build_model(provider_name)
-            print(f"  ✓ {provider_name}: {type(model).__name__}")
-        except Exception:
+    provider_names = ["openai", "azure", "ollama"]
+    models = await asyncio.gather(
+        *(asyncio.to_thread(llm_loader.build_model, name) for name in provider_names),
+        return_exceptions=True,
+    )
+    for provider_name, model in zip(provider_names, models):
+        if isinstance(model, Exception):
             print(f"  ✗ {provider_name}: Not configured")
+        else:
+            print(f"  ✓ {provider_name}: {type(model).__name__}")
 
 
 async def example_4_langgraph_workflow():
@@ -148,9 +152,25 @@ async def example_5_batch_processing():
 
     print(f"Processing {len(documents)} documents...")
 
-    for filename, content in documents:
-        file_path = save_document(content.encode(), filename)
-        processed = await processor.process_document(file_path)
+    # Documents are independent, so process them concurrently. The semaphore
+    # caps in-flight work so large batches don't stampede downstream backends.
+    semaphore = asyncio.Semaphore(8)
+
+    async def process(path):
+        async with semaphore:
+            return await processor.process_document(path)
+
+    # Encode once up front, then write all files concurrently before processing
+    encoded = [(filename, content.encode("utf-8")) for filename, content in documents]
+    paths = await asyncio.gather(
+        *(
+            asyncio.to_thread(save_document, data, filename)
+            for filename, data in encoded
+        )
+    )
+    results = await asyncio.gather(*(process(path) for path in paths))
+
+    for (filename, _), processed in zip(documents, results):
         print(f"  ✓ {filename}: {processed['summary']['total_words']} words")
 
 
@@ -8,6 +8,18 @@ import asyncio
 
 from llm_pkg import QAEngine, graph_manager, llm_loader, save_document
 
+# OpenRouter provider sections and their display names
+OPENROUTER_MODELS: tuple[tuple[str, str], ...] = (
+    ("openrouter", "GPT-4o"),
+    ("openrouter_claude", "Claude 3.5 Sonnet"),
+    ("openrouter_llama", "Llama 3.1 70B"),
+    ("openrouter_gemini", "Gemini Pro 1.5"),
+)
+# Padded "provider → name" labels, formatted once
+OPENROUTER_MODEL_LABELS: tuple[tuple[str, str], ...] = tuple(
+    (provider, f"{provider:20} → {name:25}") for provider, name in OPENROUTER_MODELS
+)
+
 
 async def example_simple_query():
     """Example 1: Simple direct query (no documents)"""
@@ -79,29 +91,39 @@ async def example_document_query():
         print()
 
 
-def example_model_comparison():
+async def example_model_comparison():
     """Example 3: Compare different models"""
     print("=" * 60)
     print("Example 3: Model Comparison")
     print("=" * 60)
 
-    models = [
-        ("openrouter", "GPT-4o"),
-        ("openrouter_claude", "Claude 3.5 Sonnet"),
-        ("openrouter_llama", "Llama 3.1 70B"),
-        ("openrouter_gemini", "Gemini Pro 1.5"),
-    ]
-
     print("\nConfigured OpenRouter Models:")
     print("-" * 60)
 
-    for provider, name in models:
-        try:
-            model = llm_loader.build_model(provider)
-            config = llm_loader.get_provider_config(provider)
-            print(f"✓ {provider:20} → {name:25} ({config.model})")
-        except Exception as e:
-            print(f"✗ {provider:20} → Error: {str(e)[:40]}")
+    # Only build providers that are actually configured; report the rest directly
+    configured = [
+        (provider, label)
+        for provider, label in OPENROUTER_MODEL_LABELS
+        if provider in llm_loader.providers
+    ]
+    for provider, _ in OPENROUTER_MODEL_LABELS:
+        if provider not in llm_loader.providers:
+            print(f"✗ {provider:20} → Error: not configured")
+
+    # Build all models concurrently instead of one after another
+    results = await asyncio.gather(
+        *(
+            asyncio.to_thread(llm_loader.build_model, provider)
+            for provider, _ in configured
+        ),
+        return_exceptions=True,
+    )
+
+    for (provider, label), result in zip(configured, results):
+        if isinstance(result, Exception):
+            print(f"✗ {provider:20} → Error: {str(result)[:40]}")
+        else:
+            print(f"✓ {label} ({llm_loader.providers[provider].model})")
 
     print()
 
@@ -147,7 +169,7 @@ async def main():
     await example_document_query()
 
     # Example 3: Model comparison
-    example_model_comparison()
+    await example_model_comparison()
 
     # Example 4: Temperature control
     await example_with_temperature()
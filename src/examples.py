@@ -39,7 +39,7 @@ async def example_1_upload_and_process():
     """
     
     # Save as a document
-    file_path = save_document(sample_text.encode(), "sample_paper.txt")
+    file_path = save_document(sample_text.encode(), "sample_paper.txt", extracted_text=sample_text)
     print(f"✓ Document saved: {file_path}")
     
     # Process the document
@@ -87,7 +87,7 @@ async def example_3_multi_provider():
     print("\nBuilding models:")
     for provider_name in ["openai", "azure", "ollama"]:
         try:
-            model = llm_loader.build_model(provider_name)
+            model = llm_loader.get_model(provider_name)
             print(f"  ✓ {provider_name}: {type(model).__name__}")
         except Exception as e:
             print(f"  ✗ {provider_name}: Not configured")
@@ -150,7 +150,7 @@ async def example_5_batch_processing():
     print(f"Processing {len(documents)} documents...")
     
     for filename, content in documents:
-        file_path = save_document(content.encode(), filename)
+        file_path = save_document(content.encode(), filename, extracted_text=content)
         processed = await processor.process_document(file_path)
         print(f"  ✓ {filename}: {processed['summary']['total_words']} words")
 
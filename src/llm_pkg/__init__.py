@@ -30,11 +30,15 @@ __version__ = "0.1.0"
 __author__ = "Rajendra Yadav"
 __email__ = "rajendra@example.com"
 
-from llm_pkg.config import llm_loader, graph_manager, LLMLoader, LangGraphManager
+from llm_pkg.config import LLMLoader, LangGraphManager
 from llm_pkg.document_processor import DocumentProcessor
 from llm_pkg.qa_engine import QAEngine
 from llm_pkg.storage import (
     save_document,
+    save_document_async,
+    save_document_stream,
+    save_document_file,
+    record_document,
     list_documents,
     list_document_metadata,
     DocumentMetadata,
@@ -56,8 +60,21 @@ __all__ = [
     "graph_manager",
     # Storage functions
     "save_document",
+    "save_document_async",
+    "save_document_stream",
+    "save_document_file",
+    "record_document",
     "list_documents",
     "list_document_metadata",
     "DocumentMetadata",
     "STORAGE_DIR",
 ]
+
+
+def __getattr__(name: str):
+    # llm_loader and graph_manager are created lazily by llm_pkg.config on first access
+    if name in {"llm_loader", "graph_manager"}:
+        from llm_pkg import config
+
+        return getattr(config, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -7,18 +7,23 @@ and configurable LangChain/LangGraph pipelines for Q&A and analysis.
 
 from __future__ import annotations
 
+import asyncio
 import logging
+import os
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
 
-from fastapi import FastAPI, File, Form, HTTPException, UploadFile
+from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse
 from rich.logging import RichHandler
+from starlette.types import ASGIApp, Receive, Scope, Send
 
 from llm_pkg.auth.router import router as auth_router
 from llm_pkg.chat_router import router as chat_router
-from llm_pkg.config import graph_manager, llm_loader
-from llm_pkg.database.models import create_tables
-from llm_pkg.document_processor import DocumentProcessor
+from llm_pkg.config import doc_processor, graph_manager, llm_loader
+from llm_pkg.database.models import get_async_engine, get_engine
+from llm_pkg.ingest import recover_documents, start_ingest_workers
 from llm_pkg.qa_engine import QAEngine
 from llm_pkg.storage import STORAGE_DIR
 
@@ -31,13 +36,142 @@ logging.basicConfig(
 )
 logger = logging.getLogger("llm_pkg")
 
+async def _probe_database() -> None:
+    """Probe database connection without crashing the app if unavailable."""
+    from sqlalchemy import text
+
+    try:
+        async with get_async_engine().connect() as conn:
+            await conn.execute(text("SELECT 1"))
+            logger.info("📊 Database connection OK")
+
+            # The schema is owned by Alembic; report the applied revision instead
+            # of creating tables at startup.
+            has_versions = await conn.scalar(
+                text("SELECT to_regclass('alembic_version') IS NOT NULL")
+            )
+            version = (
+                await conn.scalar(text("SELECT version_num FROM alembic_version"))
+                if has_versions
+                else None
+            )
+        if version:
+            logger.info("🗂️  Database schema revision: %s", version)
+        else:
+            logger.warning(
+                "⚠️  Database schema has not been migrated. Run `alembic upgrade head`."
+            )
+    except Exception as e:
+        logger.warning(
+            "⚠️  Database is not reachable right now. The API will start, "
+            "but endpoints that require the database will fail until it is available. "
+            "Start Postgres (e.g., docker-compose up -d postgres) and run migrations (alembic upgrade head)."
+        )
+        logger.warning("DB connection error: %s", e)
+
+
+async def _warm_models() -> None:
+    """Build and cache every configured provider's chat model ahead of requests."""
+    names = list(llm_loader.providers)
+    results = await asyncio.gather(
+        *(asyncio.to_thread(llm_loader.get_model, name) for name in names),
+        return_exceptions=True,
+    )
+    for name, result in zip(names, results):
+        if isinstance(result, Exception):
+            logger.debug("Skipping warm-up for provider %s: %s", name, result)
+    ready = sum(not isinstance(result, Exception) for result in results)
+    logger.info("🔥 Warmed %d/%d provider model(s)", ready, len(names))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """Initialize components on startup and release them on shutdown."""
+    logger.info("🚀 LLM-PKG starting up...")
+
+    # Independent startup work, run concurrently
+    await asyncio.gather(_probe_database(), _warm_models())
+
+    # Per-worker components shared through app.state instead of module globals
+    app.state.doc_processor = doc_processor
+    app.state.qa_engine = QAEngine(llm_loader, graph_manager)
+
+    # Opt-in hot-reload of llm_config.toml (needs the optional watchdog package)
+    if os.getenv("LLM_CONFIG_WATCH", "").lower() in {"1", "true", "yes"}:
+        try:
+            llm_loader.start_watching()
+        except ImportError as e:
+            logger.warning("%s", e)
+
+    # Uploads are processed off the request path by these workers
+    ingest_workers = start_ingest_workers(app.state.doc_processor)
+    # Uploads a previous run left processing are queued again once the workers run
+    ingest_workers.append(asyncio.create_task(recover_documents(), name="ingest-recovery"))
+
+    logger.info("📁 Storage directory: %s", STORAGE_DIR)
+    logger.info("⚙️  Loaded %d provider(s)", len(llm_loader.providers))
+    logger.info("✅ Application ready!")
+
+    yield
+
+    llm_loader.stop_watching()
+    for worker in ingest_workers:
+        worker.cancel()
+    await asyncio.gather(*ingest_workers, return_exceptions=True)
+    await get_async_engine().dispose()
+    # The sync engine is only created if something (e.g. ingestion) used it
+    if get_engine.cache_info().currsize:
+        get_engine().dispose()
+    logger.info("👋 LLM-PKG shutting down...")
+
+
 # Initialize FastAPI
 app = FastAPI(
     title="LLM-PKG: Document Processing & QA Platform",
     description="Upload documents, process them with Docling-like scanning, and query using LangChain/LangGraph",
     version="0.1.0",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan,
 )
 
+# Deprecated endpoints mapped to the message pointing at their replacement. They
+# are answered with 410 Gone before routing, so request bodies (e.g. large
+# multipart uploads to /upload) are never read, parsed, or validated.
+DEPRECATED_ENDPOINTS: dict[tuple[str, str], str] = {
+    ("POST", "/upload"): (
+        "This endpoint is deprecated. Please use POST /chat/upload-document "
+        "with conversation_id instead."
+    ),
+    ("GET", "/documents"): (
+        "This endpoint is deprecated. Please use GET /chat/documents "
+        "with conversation_id instead."
+    ),
+    ("POST", "/query"): (
+        "This endpoint is deprecated. Please use POST /chat/send "
+        "with conversation_id instead."
+    ),
+}
+
+
+class DeprecatedEndpointMiddleware:
+    """Reject deprecated endpoints with 410 without consuming the request body."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "http":
+            detail = DEPRECATED_ENDPOINTS.get((scope["method"], scope["path"]))
+            if detail is not None:
+                response = ORJSONResponse({"detail": detail}, status_code=410)
+                await response(scope, receive, send)
+                return
+        await self.app(scope, receive, send)
+
+
+# Registered before CORS so the 410 responses still carry CORS headers
+app.add_middleware(DeprecatedEndpointMiddleware)
+
 # Add CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -54,13 +188,6 @@ app.add_middleware(
 app.include_router(auth_router)
 app.include_router(chat_router)
 
-# Initialize components
-doc_processor = DocumentProcessor()
-qa_engine = QAEngine(
-    llm_loader, graph_manager
-)  # Global instance for non-auth endpoints
-
-
 @app.get("/")
 async def root() -> dict[str, str]:
     """Root endpoint with API information."""
@@ -73,110 +200,36 @@ async def root() -> dict[str, str]:
 
 
 @app.get("/health")
-async def health_check() -> dict[str, str]:
+async def health_check() -> ORJSONResponse:
     """Health check endpoint."""
-    return {"status": "healthy", "service": "llm-pkg"}
-
-
-@app.post("/upload")
-async def upload_document(file: UploadFile = File(...)) -> JSONResponse:
-    """
-    DEPRECATED: Upload a document for processing.
-    
-    This endpoint is deprecated and should not be used.
-    Use POST /chat/upload-document instead for proper conversation isolation.
-    
-    This endpoint does not enforce conversation-specific isolation and may cause
-    documents to bleed across conversations.
-    """
-    raise HTTPException(
-        status_code=410,  # Gone
-        detail="This endpoint is deprecated. Please use POST /chat/upload-document with conversation_id instead."
-    )
-
-
-@app.get("/documents")
-async def list_documents() -> JSONResponse:
-    """
-    DEPRECATED: List all uploaded documents with metadata.
-    
-    This endpoint is deprecated and should not be used.
-    Use GET /chat/documents?conversation_id={id} instead for proper conversation isolation.
-    """
-    raise HTTPException(
-        status_code=410,  # Gone
-        detail="This endpoint is deprecated. Please use GET /chat/documents with conversation_id instead."
-    )
-
-
-@app.post("/query")
-async def query_documents(
-    question: str = Form(...),
-    provider: str | None = Form(None),
-    document_name: str | None = Form(None),
-) -> JSONResponse:
-    """
-    DEPRECATED: Query documents using LangChain/LangGraph.
-    
-    This endpoint is deprecated and should not be used.
-    Use POST /chat/send instead for proper conversation isolation and tracking.
-    """
-    raise HTTPException(
-        status_code=410,  # Gone
-        detail="This endpoint is deprecated. Please use POST /chat/send with conversation_id instead."
-    )
+    # Polled by container health checks; bypass response-model validation and encoding
+    return ORJSONResponse({"status": "healthy", "service": "llm-pkg"})
 
 
 @app.get("/config")
-async def get_config() -> JSONResponse:
+async def get_config() -> ORJSONResponse:
     """Get current LLM configuration."""
     try:
-        return JSONResponse(
-            status_code=200,
-            content={
-                "providers": {
-                    name: {
-                        "provider": cfg.provider,
-                        "model": cfg.model,
-                    }
-                    for name, cfg in llm_loader.providers.items()
-                },
-                "default": (
-                    {
-                        "provider": (
-                            llm_loader.default.provider if llm_loader.default else None
-                        ),
-                        "model": (
-                            llm_loader.default.model if llm_loader.default else None
-                        ),
-                    }
-                    if llm_loader.default
-                    else None
-                ),
-            },
-        )
+        return ORJSONResponse(llm_loader.serialized_providers())
     except Exception as e:
-        logger.error(f"Error getting config: {e}")
+        logger.error("Error getting config: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.post("/config/reload")
-async def reload_config() -> JSONResponse:
+async def reload_config() -> dict[str, str]:
     """Reload LLM configuration from TOML file."""
     try:
         llm_loader.reload()
         logger.info("Configuration reloaded successfully")
-        return JSONResponse(
-            status_code=200,
-            content={"message": "Configuration reloaded successfully"},
-        )
+        return {"message": "Configuration reloaded successfully"}
     except Exception as e:
-        logger.error(f"Error reloading config: {e}")
+        logger.error("Error reloading config: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.delete("/documents/{filename}")
-async def delete_document(filename: str) -> JSONResponse:
+def delete_document(filename: str) -> dict[str, str]:
     """Delete a specific document."""
     try:
         file_path = STORAGE_DIR / filename
@@ -184,75 +237,45 @@ async def delete_document(filename: str) -> JSONResponse:
             raise HTTPException(status_code=404, detail="Document not found")
 
         file_path.unlink()
-        logger.info(f"Document deleted: {filename}")
+        logger.info("Document deleted: %s", filename)
 
-        return JSONResponse(
-            status_code=200,
-            content={"message": f"Document '{filename}' deleted successfully"},
-        )
+        return {"message": f"Document '{filename}' deleted successfully"}
     except HTTPException:
         raise
     except Exception as e:
-        logger.error(f"Error deleting document: {e}")
+        logger.error("Error deleting document: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@app.on_event("startup")
-async def startup_event():
-    """Initialize components on startup."""
-    logger.info("🚀 LLM-PKG starting up...")
-
-    # Probe database connection without crashing the app if unavailable
-    from sqlalchemy import text
-    from llm_pkg.database.models import engine
-
-    try:
-        with engine.connect() as conn:
-            conn.execute(text("SELECT 1"))
-        logger.info("📊 Database connection OK")
-    except Exception as e:
-        logger.warning(
-            "⚠️  Database is not reachable right now. The API will start, "
-            "but endpoints that require the database will fail until it is available. "
-            "Start Postgres (e.g., docker-compose up -d postgres) and run migrations (alembic upgrade head)."
-        )
-        logger.warning(f"DB connection error: {e}")
-
-    logger.info(f"📁 Storage directory: {STORAGE_DIR}")
-    logger.info(f"⚙️  Loaded {len(llm_loader.providers)} provider(s)")
-    logger.info("✅ Application ready!")
-
-
-@app.on_event("shutdown")
-async def shutdown_event():
-    """Cleanup on shutdown."""
-    logger.info("👋 LLM-PKG shutting down...")
-
-
-if __name__ == "__main__":
-    import uvicorn
-
-    uvicorn.run(
-        "llm_pkg.app:app",
-        host="0.0.0.0",
-        port=8000,
-        reload=True,
-        log_level="info",
-    )
-
-
 def main() -> None:
     """Entry point for the console script `llm-pkg-server`.
 
     Runs a uvicorn server pointing at this FastAPI app. Mirrors the behavior of
     `python -m llm_pkg.app` but without requiring -m execution.
+
+    By default the server auto-reloads with a single worker for development.
+    With ENV=prod it runs WEB_CONCURRENCY worker processes (default: CPU count)
+    without reload. The event loop and HTTP parser come from UVICORN_LOOP and
+    UVICORN_HTTP (default: auto, which picks uvloop and httptools when uvicorn[standard]
+    installed them).
+    Each worker builds its own components and caches in the lifespan hook.
     """
     import uvicorn
 
+    production = os.getenv("ENV", "dev").lower() in {"prod", "production"}
+    workers = int(os.getenv("WEB_CONCURRENCY", os.cpu_count() or 1)) if production else 1
+
     uvicorn.run(
         "llm_pkg.app:app",
         host="0.0.0.0",
         port=8000,
-        reload=True,
+        reload=not production,
+        workers=workers,
+        loop=os.getenv("UVICORN_LOOP", "auto"),
+        http=os.getenv("UVICORN_HTTP", "auto"),
         log_level="info",
     )
+
+
+if __name__ == "__main__":
+    main()
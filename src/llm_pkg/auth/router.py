@@ -8,8 +8,8 @@ from datetime import timedelta
 from typing import Annotated
 
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
 
 from llm_pkg.auth.utils import (
     UserCreate,
@@ -20,25 +20,29 @@ from llm_pkg.auth.utils import (
     get_current_active_user,
     get_current_user,
 )
-from llm_pkg.database.models import User, get_db
+from llm_pkg.database.models import SessionLocal, User
 
 router = APIRouter(prefix="/auth", tags=["authentication"])
 logger = logging.getLogger("llm_pkg.auth")
 
 
+def _register(user: UserCreate) -> User:
+    # The session lives only as long as the threadpool call, not the whole request
+    with SessionLocal() as db:
+        return create_user(db, user)
+
+
+def _authenticate(username: str, password: str) -> User | None:
+    with SessionLocal() as db:
+        return authenticate_user(db, username, password)
+
+
 @router.post("/register", response_model=UserResponse)
-async def register_user(user: UserCreate, db: Session = Depends(get_db)):
+async def register_user(user: UserCreate):
     """Register a new user."""
     try:
-        db_user = create_user(db, user)
-        return UserResponse(
-            id=db_user.id,
-            email=db_user.email,
-            username=db_user.username,
-            full_name=db_user.full_name,
-            is_active=db_user.is_active,
-            created_at=db_user.created_at,
-        )
+        # Password hashing is CPU-bound; keep it off the event loop
+        return await run_in_threadpool(_register, user)
     except HTTPException:
         raise
     except Exception:
@@ -52,10 +56,12 @@ async def register_user(user: UserCreate, db: Session = Depends(get_db)):
 @router.post("/login")
 async def login_for_access_token(
     form_data: Annotated[OAuth2PasswordRequestForm, Depends()],
-    db: Session = Depends(get_db),
 ):
     """Authenticate user and return access token."""
-    user = authenticate_user(db, form_data.username, form_data.password)
+    # Password verification (PBKDF2) is CPU-bound; keep it off the event loop
+    user = await run_in_threadpool(
+        _authenticate, form_data.username, form_data.password
+    )
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -72,14 +78,7 @@ async def login_for_access_token(
 @router.get("/me", response_model=UserResponse)
 async def read_users_me(current_user: User = Depends(get_current_active_user)):
     """Get current user information."""
-    return UserResponse(
-        id=current_user.id,
-        email=current_user.email,
-        username=current_user.username,
-        full_name=current_user.full_name,
-        is_active=current_user.is_active,
-        created_at=current_user.created_at,
-    )
+    return current_user
 
 
 @router.post("/refresh-token")
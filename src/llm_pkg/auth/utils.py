@@ -11,17 +11,19 @@ from typing import Optional
 
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from jose import JWTError, jwt
+from jose import JWTError, jwk, jwt
 from passlib.context import CryptContext
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 from sqlalchemy.orm import Session
 
-from llm_pkg.database.models import User, get_db
+from llm_pkg.database.models import SessionLocal, User
 
 # Security settings
 SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-here-change-in-production")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
+# Key object built once; passing the raw secret makes python-jose rebuild it on every encode/decode
+SIGNING_KEY = jwk.construct(SECRET_KEY, ALGORITHM)
 
 # Use pbkdf2_sha256 to avoid external bcrypt backend issues in containers
 pwd_context = CryptContext(schemes=["pbkdf2_sha256"], deprecated="auto")
@@ -45,6 +47,8 @@ class UserCreate(BaseModel):
 
 
 class UserResponse(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
     id: int
     email: str
     username: str
@@ -71,7 +75,7 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     else:
         expire = datetime.utcnow() + timedelta(minutes=15)
     to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    encoded_jwt = jwt.encode(to_encode, SIGNING_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
 
@@ -85,17 +89,20 @@ def authenticate_user(db: Session, username: str, password: str) -> Optional[Use
     return user
 
 
-def get_current_user(
-    token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)
-) -> User:
-    """Get the current authenticated user from JWT token."""
+def get_current_user(token: str = Depends(oauth2_scheme)) -> User:
+    """Get the current authenticated user from JWT token.
+
+    Uses its own short-lived session rather than the request-scoped one, so the
+    pooled connection is returned as soon as the user is loaded instead of being
+    held for the rest of the request (e.g. across a multi-second LLM call).
+    """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = jwt.decode(token, SIGNING_KEY, algorithms=[ALGORITHM])
         username: str = payload.get("sub")
         if username is None:
             raise credentials_exception
@@ -103,7 +110,8 @@ def get_current_user(
     except JWTError:
         raise credentials_exception
 
-    user = db.query(User).filter(User.username == token_data.username).first()
+    with SessionLocal() as db:
+        user = db.query(User).filter(User.username == token_data.username).first()
     if user is None:
         raise credentials_exception
     return user
@@ -3,18 +3,39 @@ Chat API endpoints.
 Handles conversations, messages, and LLM interactions.
 """
 
-from typing import List, Optional
-
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
-from pydantic import BaseModel
-from sqlalchemy.orm import Session
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from types import MappingProxyType
+from typing import Final, List, Mapping, Optional
+
+import orjson
+from fastapi import APIRouter, Depends, HTTPException, Query, status, UploadFile, File, Form
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
+from pydantic import BaseModel, ConfigDict, field_validator
+from sqlalchemy import delete, exists, func, insert, select, tuple_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 
 from llm_pkg.auth.utils import get_current_active_user
-from llm_pkg.database.models import Conversation, Message, User, get_db, Document as DBDocument
+from llm_pkg.database.models import (AsyncSessionLocal, Conversation, ConversationDocument, Message,
+                                     MessageDocumentMatch, User, get_async_db, Document as DBDocument)
+from llm_pkg.embedding_cache import get_query_embedder, query_embedding_stats
 from llm_pkg.qa_engine import QAEngine
+from llm_pkg.response_cache import invalidate_conversation, is_follow_up, response_cache
 
 router = APIRouter(prefix="/chat", tags=["chat"])
 
+# Default model recorded on new conversations for each provider
+DEFAULT_MODEL: Final = "gpt-4o"
+PROVIDER_DEFAULT_MODELS: Final[Mapping[str, str]] = MappingProxyType({
+    "default": "gpt-4o",
+    "openai": "gpt-4o",
+    "gemini": "gemini-pro",
+    "anthropic": "claude-3-opus-20240229",
+})
+
 
 class ConversationCreate(BaseModel):
     title: str
@@ -23,12 +44,19 @@ class ConversationCreate(BaseModel):
 
 
 class ConversationResponse(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+    
     id: int
     title: str
     provider: str
     model: str
-    created_at: str
-    updated_at: str
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+    
+    @field_validator("updated_at", mode="before")
+    @classmethod
+    def _default_to_created_at(cls, value, info):
+        return value if value is not None else info.data.get("created_at")
 
 
 class MessageCreate(BaseModel):
@@ -37,11 +65,13 @@ class MessageCreate(BaseModel):
 
 
 class MessageResponse(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+    
     id: int
     conversation_id: int
     role: str
     content: str
-    created_at: str
+    created_at: datetime
 
 
 class ChatRequest(BaseModel):
@@ -58,94 +88,150 @@ class ChatResponse(BaseModel):
     sources: List[dict]
 
 
-def get_qa_engine(user: User = Depends(get_current_active_user)) -> QAEngine:
-    """Get QA engine instance for the current user."""
-    # Create user-specific QA engine instance
+# QA engines are reused per (user, conversation) so the conversation history and
+# caches survive between turns; idle entries expire after QA_ENGINE_TTL_SECONDS.
+QA_ENGINE_TTL_SECONDS = 30 * 60
+QA_ENGINE_CACHE_SIZE = 256
+_qa_engines: OrderedDict[tuple[int, Optional[int]], tuple[float, QAEngine]] = OrderedDict()
+_qa_engines_lock = threading.Lock()
+
+
+def _cached_qa_engine(user_id: int, conversation_id: Optional[int] = None) -> QAEngine:
     from llm_pkg.config import graph_manager, llm_loader
     
-    return QAEngine(llm_loader, graph_manager, user_id=user.id)
+    key = (user_id, conversation_id)
+    now = time.monotonic()
+    with _qa_engines_lock:
+        cached = _qa_engines.pop(key, None)
+        if cached is not None and cached[0] > now:
+            engine = cached[1]
+        else:
+            engine = QAEngine(llm_loader, graph_manager, user_id=user_id, conversation_id=conversation_id)
+        _qa_engines[key] = (now + QA_ENGINE_TTL_SECONDS, engine)
+        while len(_qa_engines) > QA_ENGINE_CACHE_SIZE:
+            _qa_engines.popitem(last=False)
+    return engine
+
+
+def get_qa_engine(user: User = Depends(get_current_active_user)) -> QAEngine:
+    """Get QA engine instance for the current user."""
+    return _cached_qa_engine(user.id)
+
+
+@router.get("/cache-stats")
+async def cache_stats(current_user: User = Depends(get_current_active_user)):
+    """Hit/miss counters for the shared query embedding cache."""
+    return query_embedding_stats()
+
+
+async def _owns_conversation(db: AsyncSession, conversation_id: int, user_id: int) -> bool:
+    """Ownership check as an EXISTS probe; no conversation row is fetched or hydrated."""
+    return bool(await db.scalar(select(exists().where(Conversation.id == conversation_id,
+                                                      Conversation.user_id == user_id, ))))
 
 
 @router.post("/conversations", response_model=ConversationResponse)
 async def create_conversation(conv: ConversationCreate, current_user: User = Depends(get_current_active_user),
-                              db: Session = Depends(get_db), ):
+                              db: AsyncSession = Depends(get_async_db), ):
     """Create a new conversation."""
     db_conv = Conversation(user_id=current_user.id, title=conv.title, provider=conv.provider, model=conv.model, )
     db.add(db_conv)
-    db.commit()
-    db.refresh(db_conv)
+    await db.commit()
     
-    return ConversationResponse(id=db_conv.id, title=db_conv.title, provider=db_conv.provider, model=db_conv.model,
-                                created_at=db_conv.created_at.isoformat(), updated_at=db_conv.updated_at.isoformat(), )
+    return db_conv
+
+
+# Page size for /conversations when a cursor is given without a limit
+CONVERSATION_PAGE_SIZE = 50
+
+
+def _parse_cursor(cursor: str) -> tuple[datetime, int]:
+    """Split a keyset cursor of the form ``<ISO timestamp>,<id>``."""
+    try:
+        timestamp, row_id = cursor.rsplit(",", 1)
+        return datetime.fromisoformat(timestamp), int(row_id)
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
 
 
 @router.get("/conversations", response_model=List[ConversationResponse])
-async def list_conversations(current_user: User = Depends(get_current_active_user), db: Session = Depends(get_db)):
-    """List user's conversations."""
-    conversations = (db.query(Conversation).filter(Conversation.user_id == current_user.id).order_by(
-        Conversation.updated_at.desc()).all())
-    
-    return [ConversationResponse(id=conv.id, title=conv.title, provider=conv.provider, model=conv.model,
-                                 created_at=conv.created_at.isoformat(),
-                                 updated_at=conv.updated_at.isoformat() if conv.updated_at else conv.created_at.isoformat(), )
-            for conv in conversations]
+async def list_conversations(limit: Optional[int] = Query(None, ge=1, le=200), cursor: Optional[str] = None,
+                             current_user: User = Depends(get_current_active_user),
+                             db: AsyncSession = Depends(get_async_db)):
+    """List user's conversations, most recently updated first.
+
+    Without ``limit`` or ``cursor`` every conversation is returned. To page, pass
+    ``limit`` and then ``cursor=<updated_at>,<id>`` of the last conversation received;
+    a cursor without a limit returns pages of CONVERSATION_PAGE_SIZE.
+    """
+    query = select(Conversation.id, Conversation.title, Conversation.provider, Conversation.model,
+                   Conversation.created_at, Conversation.updated_at).where(
+        Conversation.user_id == current_user.id)
+    if cursor:
+        updated_at, conversation_id = _parse_cursor(cursor)
+        query = query.where(tuple_(Conversation.updated_at, Conversation.id) < (updated_at, conversation_id))
+    query = query.order_by(Conversation.updated_at.desc(), Conversation.id.desc())
+    if limit is None and cursor:
+        limit = CONVERSATION_PAGE_SIZE
+    if limit is not None:
+        query = query.limit(limit)
+    rows = await db.execute(query)
+    # Rows go straight to response_model, which reads them via from_attributes in one pass
+    return rows.all()
 
 
 @router.get("/conversations/{conversation_id}/messages", response_model=List[MessageResponse])
-async def get_conversation_messages(conversation_id: int, current_user: User = Depends(get_current_active_user),
-                                    db: Session = Depends(get_db), ):
-    """Get messages for a conversation."""
+async def get_conversation_messages(conversation_id: int, limit: Optional[int] = Query(None, ge=1, le=1000),
+                                    cursor: Optional[str] = None,
+                                    current_user: User = Depends(get_current_active_user),
+                                    db: AsyncSession = Depends(get_async_db), ):
+    """Get messages for a conversation, oldest first.
+
+    Without ``limit`` the whole conversation is returned; with it, pass
+    ``cursor=<created_at>,<id>`` of the last message received to fetch the next page.
+    """
     # Verify conversation ownership
-    conversation = (db.query(Conversation).filter(Conversation.id == conversation_id,
-                                                  Conversation.user_id == current_user.id).first())
-    
-    if not conversation:
+    if not await _owns_conversation(db, conversation_id, current_user.id):
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Conversation not found")
-    
-    messages = (db.query(Message).filter(Message.conversation_id == conversation_id).order_by(Message.created_at).all())
-    
-    return [MessageResponse(id=msg.id, conversation_id=msg.conversation_id, role=msg.role, content=msg.content,
-                            created_at=msg.created_at.isoformat(), ) for msg in messages]
-
-
-@router.post("/send", response_model=ChatResponse)
-async def send_message(request: ChatRequest, current_user: User = Depends(get_current_active_user),
-                       db: Session = Depends(get_db), ):
-    """Send a message and get AI response."""
-    import logging
+    query = select(Message.id, Message.conversation_id, Message.role, Message.content, Message.created_at).where(
+        Message.conversation_id == conversation_id)
+    if cursor:
+        created_at, message_id = _parse_cursor(cursor)
+        query = query.where(tuple_(Message.created_at, Message.id) > (created_at, message_id))
+    query = query.order_by(Message.created_at, Message.id)
+    if limit is not None:
+        query = query.limit(limit)
+    return (await db.execute(query)).all()
+
+
+async def _start_turn(db: AsyncSession, request: ChatRequest,
+                      current_user: User) -> tuple[int, str, MessageResponse]:
+    """Get or create the conversation and save the user message in one transaction."""
     import uuid
     
-    logger = logging.getLogger(__name__)
-    
-    try:
+    async with db.begin():
         # Get or create conversation
         if request.conversation_id:
-            conversation = (db.query(Conversation).filter(Conversation.id == request.conversation_id,
-                                                          Conversation.user_id == current_user.id, ).first())
+            # Only the columns the turn needs, not the whole conversation row
+            conversation = (await db.execute(select(Conversation.id, Conversation.title, Conversation.thread_id).where(
+                Conversation.id == request.conversation_id, Conversation.user_id == current_user.id, ))).first()
             if not conversation:
                 raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Conversation not found", )
             
             # Update title if it's still the default and this is the first message
             if conversation.title == "New Conversation":
-                message_count = db.query(Message).filter(Message.conversation_id == conversation.id).count()
-                if message_count == 0:
-                    conversation.title = request.message[:50] + "..." if len(request.message) > 50 else request.message
-                    db.add(conversation)
+                # EXISTS stops at the first row instead of counting the whole history
+                has_messages = await db.scalar(select(exists().where(Message.conversation_id == conversation.id)))
+                if not has_messages:
+                    await db.execute(update(Conversation).where(Conversation.id == conversation.id).values(
+                        title=request.message[:50] + "..." if len(request.message) > 50 else request.message))
         else:
             # Create new conversation with thread_id
             thread_id = str(uuid.uuid4())
             
             # Get the appropriate model for the selected provider
             provider = request.provider or "default"
-            
-            # Map provider to default model
-            provider_model_map = {
-                "default": "gpt-4o",
-                "openai": "gpt-4o",
-                "gemini": "gemini-pro",
-                "anthropic": "claude-3-opus-20240229",
-            }
-            model = provider_model_map.get(provider, "gpt-4o")
+            model = PROVIDER_DEFAULT_MODELS.get(provider, DEFAULT_MODEL)
             
             conversation = Conversation(
                 user_id=current_user.id,
@@ -155,35 +241,134 @@ async def send_message(request: ChatRequest, current_user: User = Depends(get_cu
                 thread_id=thread_id,
             )
             db.add(conversation)
-            db.commit()
-            db.refresh(conversation)
+            await db.flush()  # assigns conversation.id without ending the transaction
         
         # Save user message
-        user_msg = Message(conversation_id=conversation.id, role="user", content=request.message, )
-        db.add(user_msg)
-        db.commit()
-        db.refresh(user_msg)
+        user_msg_id, created_at = (await db.execute(
+            insert(Message).values(conversation_id=conversation.id, role="user", content=request.message).returning(
+                Message.id, Message.created_at))).one()
+    
+    user_message = MessageResponse(id=user_msg_id, conversation_id=conversation.id, role="user",
+                                   content=request.message, created_at=created_at)
+    return conversation.id, conversation.thread_id, user_message
+
+
+async def _finish_turn(db: AsyncSession, conversation_id: int, answer: str, user_id: int,
+                       sources: List[dict]) -> MessageResponse:
+    """Save the assistant message, its document matches and the conversation timestamp in one transaction.
+    
+    Runs before the reply is returned, so the message id handed to the client always
+    refers to a stored row. created_at comes from the database clock, like the user
+    message's, so the two always sort in order.
+    """
+    async with db.begin():
+        message_id, created_at = (await db.execute(
+            insert(Message).values(conversation_id=conversation_id, role="assistant", content=answer).returning(
+                Message.id, Message.created_at))).one()
+        assistant_message = MessageResponse(id=message_id, conversation_id=conversation_id, role="assistant",
+                                            content=answer, created_at=created_at)
+        
+        # Track document matches if sources were used
+        if sources:
+            # Resolve every cited filename in one IN query, then insert all matches in one batch
+            names = {source.get("source") for source in sources}
+            doc_ids = {}
+            # Matches point at the uploaded documents, not their embedded chunk rows
+            for doc_id, filename in await db.execute(select(DBDocument.id, DBDocument.filename).where(
+                    DBDocument.user_id == user_id, DBDocument.filename.in_(names), DBDocument.embedding.is_(None))):
+                doc_ids.setdefault(filename, doc_id)
+            
+            rows = [{
+                "message_id": assistant_message.id,
+                "document_id": doc_ids[source.get("source")],
+                "matched_content": source.get("content", "")[:1000],  # Store first 1000 chars
+                "relevance_score": str(source.get("similarity", "N/A")),
+            } for source in sources if source.get("source") in doc_ids]
+            if rows:
+                await db.execute(insert(MessageDocumentMatch), rows)
+        
+        # Update conversation timestamp
+        await db.execute(update(Conversation).where(Conversation.id == conversation_id).values(
+            updated_at=created_at))
+    return assistant_message
+
+
+async def _document_generation(db: AsyncSession, conversation_id: int) -> tuple:
+    """Version of a conversation's documents, shared by every worker.
+    
+    Changes when a document row is added or deleted, or an upload finishes ingesting.
+    """
+    row = (await db.execute(select(func.count(), func.max(DBDocument.id),
+                                   func.count().filter(DBDocument.processing_state == "ready")).where(
+        DBDocument.conversation_id == conversation_id))).one()
+    return tuple(row)
+
+
+async def _cached_answer(db: AsyncSession, conversation_id: int,
+                         request: ChatRequest) -> tuple[Optional[List[float]], Optional[tuple], Optional[dict]]:
+    """Embed the question and look it up in the semantic response cache.
+    
+    A near-identical earlier question in this conversation is answered from the
+    cache. The embedding is cached too, so retrieval reuses it on a miss. Follow-ups
+    that lean on the history skip the cache both ways (no lookup, no store).
+    
+    Returns the embedding, the document generation to store the answer under (read
+    before retrieval, so an answer racing an upload is never served) and the cached result.
+    """
+    import logging
+    
+    if is_follow_up(request.message):
+        return None, None, None
+    try:
+        question_embedding = await get_query_embedder().aembed_query(request.message)
+    except Exception as e:
+        logging.getLogger(__name__).debug("Skipping semantic cache, question embedding failed: %s", e)
+        return None, None, None
+    generation = await _document_generation(db, conversation_id)
+    return question_embedding, generation, response_cache.lookup(conversation_id, request.provider,
+                                                                 question_embedding, generation)
+
+
+@router.post("/send", response_model=ChatResponse)
+async def send_message(request: ChatRequest, current_user: User = Depends(get_current_active_user),
+                       db: AsyncSession = Depends(get_async_db), ):
+    """Send a message and get AI response."""
+    import logging
+    
+    logger = logging.getLogger(__name__)
+    
+    try:
+        conversation_id, thread_id, user_message = await _start_turn(db, request, current_user)
         
         # Get QA engine with conversation-specific context
-        from llm_pkg.config import graph_manager, llm_loader
+        qa_engine = _cached_qa_engine(current_user.id, conversation_id)
         
-        qa_engine = QAEngine(llm_loader, graph_manager, user_id=current_user.id, conversation_id=conversation.id)
+        question_embedding, generation, cached = await _cached_answer(db, conversation_id, request)
         
         # Use RAG with thread ID for conversation continuity
         sources = []
         try:
-            # Use RAG-enabled query method with thread ID
-            result = await qa_engine.query(request.message, request.provider, thread_id=conversation.thread_id)
+            if cached is not None:
+                result = cached
+                logger.info("Semantic cache hit for conversation %s", conversation_id)
+                # The engine did not run, so record the turn in its history here
+                qa_engine.remember_turn(thread_id, request.message, result["answer"])
+            else:
+                # Use RAG-enabled query method with thread ID
+                result = await qa_engine.query(request.message, request.provider, thread_id=thread_id)
+                if question_embedding is not None:
+                    response_cache.store(conversation_id, request.provider, question_embedding, result,
+                                         generation)
             answer = result["answer"]
             sources = result.get("sources", [])
             metadata = result.get("metadata", {})
             
             # Log the mode being used
             mode = metadata.get("mode", "unknown")
-            logger.info(f"Query mode: {mode}, Sources: {len(sources)}")
+            logger.info("Query mode: %s, Sources: %d", mode, len(sources))
         
         except Exception as e:
-            logger.warning(f"RAG query failed, falling back to simple query: {e}")
+            logger.warning("RAG query failed, falling back to simple query: %s", e)
             try:
                 # Fallback to simple query without RAG
                 answer = await qa_engine.query_simple(request.message, request.provider)
@@ -191,47 +376,13 @@ async def send_message(request: ChatRequest, current_user: User = Depends(get_cu
                 logger.exception("Both RAG and simple query failed")
                 answer = f"I apologize, but I encountered an error: {str(e2)}"
         
-        # Save assistant message
-        assistant_msg = Message(conversation_id=conversation.id, role="assistant", content=answer, )
-        db.add(assistant_msg)
-        db.commit()
-        db.refresh(assistant_msg)
+        assistant_message = await _finish_turn(db, conversation_id, answer, current_user.id, sources)
         
-        # Track document matches if sources were used
-        if sources:
-            from llm_pkg.database.models import MessageDocumentMatch
-            
-            for source in sources:
-                # Find the document by filename/source
-                doc = db.query(DBDocument).filter(
-                    DBDocument.filename == source.get("source"),
-                    DBDocument.user_id == current_user.id
-                ).first()
-                
-                if doc:
-                    match = MessageDocumentMatch(
-                        message_id=assistant_msg.id,
-                        document_id=doc.id,
-                        matched_content=source.get("content", "")[:1000],  # Store first 1000 chars
-                        relevance_score=str(source.get("similarity", "N/A"))
-                    )
-                    db.add(match)
-            
-            db.commit()
-        
-        # Update conversation timestamp
-        conversation.updated_at = assistant_msg.created_at
-        db.commit()
-        
-        return ChatResponse(conversation_id=conversation.id,
-                            user_message=MessageResponse(id=user_msg.id, conversation_id=user_msg.conversation_id,
-                                                         role=user_msg.role, content=user_msg.content,
-                                                         created_at=user_msg.created_at.isoformat(), ),
-                            assistant_message=MessageResponse(id=assistant_msg.id,
-                                                              conversation_id=assistant_msg.conversation_id,
-                                                              role=assistant_msg.role, content=assistant_msg.content,
-                                                              created_at=assistant_msg.created_at.isoformat(), ),
-                            answer=answer, sources=sources, )
+        response = ChatResponse(conversation_id=conversation_id, user_message=user_message,
+                                assistant_message=assistant_message, answer=answer, sources=sources, )
+        # Already validated on construction: serialize straight to JSON instead of letting
+        # FastAPI dump it to a dict and validate it again against response_model
+        return Response(content=response.model_dump_json(), media_type="application/json")
     except HTTPException:
         raise
     except Exception as e:
@@ -240,32 +391,142 @@ async def send_message(request: ChatRequest, current_user: User = Depends(get_cu
                             detail=f"Failed to process message: {str(e)}", )
 
 
+@router.post("/send/stream")
+async def send_message_stream(request: ChatRequest, current_user: User = Depends(get_current_active_user),
+                              db: AsyncSession = Depends(get_async_db), ):
+    """Send a message and stream the AI response as newline-delimited JSON events.
+    
+    Emits ``{"type": "token", "text": ...}`` as the answer is generated and
+    ``{"type": "reset"}`` when the text so far is replaced by a fallback answer,
+    then a final ``{"type": "done", ...}`` event carrying the ChatResponse fields.
+    """
+    import logging
+    
+    logger = logging.getLogger(__name__)
+    
+    conversation_id, thread_id, user_message = await _start_turn(db, request, current_user)
+    qa_engine = _cached_qa_engine(current_user.id, conversation_id)
+    question_embedding, generation, cached = await _cached_answer(db, conversation_id, request)
+    
+    def event(**fields) -> bytes:
+        return orjson.dumps(fields) + b"\n"
+    
+    async def events():
+        sources = []
+        try:
+            if cached is not None:
+                logger.info("Semantic cache hit for conversation %s", conversation_id)
+                result = cached
+                qa_engine.remember_turn(thread_id, request.message, result["answer"])
+                yield event(type="token", text=result["answer"])
+            else:
+                async for kind, value in qa_engine.query_stream(request.message, request.provider,
+                                                                thread_id=thread_id):
+                    if kind == "result":
+                        result = value
+                    else:
+                        yield event(type=kind, text=value)
+                if question_embedding is not None:
+                    response_cache.store(conversation_id, request.provider, question_embedding, result,
+                                         generation)
+            answer = result["answer"]
+            sources = result.get("sources", [])
+        except Exception as e:
+            logger.warning("RAG query failed, falling back to simple query: %s", e)
+            try:
+                answer = await qa_engine.query_simple(request.message, request.provider)
+            except Exception as e2:
+                logger.exception("Both RAG and simple query failed")
+                answer = f"I apologize, but I encountered an error: {str(e2)}"
+            yield event(type="reset", text="")
+            yield event(type="token", text=answer)
+        
+        # The request's session may already be closed once the body streams, so the
+        # turn is saved in its own session before the final event is sent
+        async with AsyncSessionLocal() as session:
+            assistant_message = await _finish_turn(session, conversation_id, answer, current_user.id, sources)
+        response = ChatResponse(conversation_id=conversation_id, user_message=user_message,
+                                assistant_message=assistant_message, answer=answer, sources=sources, )
+        yield event(type="done", **response.model_dump(mode="json"))
+    
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+
 @router.delete("/conversations/{conversation_id}")
 async def delete_conversation(conversation_id: int, current_user: User = Depends(get_current_active_user),
-                              db: Session = Depends(get_db), ):
+                              db: AsyncSession = Depends(get_async_db), ):
     """Delete a conversation."""
-    conversation = (db.query(Conversation).filter(Conversation.id == conversation_id,
-                                                  Conversation.user_id == current_user.id).first())
-    
-    if not conversation:
+    if not await _owns_conversation(db, conversation_id, current_user.id):
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Conversation not found")
     
-    db.delete(conversation)
-    db.commit()
+    # Set-based deletes, children first, instead of loading every message and
+    # document into the session for the ORM cascade to delete row by row
+    message_ids = select(Message.id).where(Message.conversation_id == conversation_id)
+    document_ids = select(DBDocument.id).where(DBDocument.conversation_id == conversation_id)
+    await db.execute(delete(MessageDocumentMatch).where(
+        MessageDocumentMatch.message_id.in_(message_ids) | MessageDocumentMatch.document_id.in_(document_ids)))
+    await db.execute(delete(ConversationDocument).where(ConversationDocument.conversation_id == conversation_id))
+    await db.execute(delete(Message).where(Message.conversation_id == conversation_id))
+    await db.execute(delete(DBDocument).where(DBDocument.conversation_id == conversation_id))
+    await db.execute(delete(Conversation).where(Conversation.id == conversation_id))
+    await db.commit()
+    
+    with _qa_engines_lock:
+        _qa_engines.pop((current_user.id, conversation_id), None)
+    invalidate_conversation(conversation_id)
     
     return {"message": "Conversation deleted successfully"}
 
 
+async def _register_upload(db: AsyncSession, user_id: int, conversation_id: int, filename: str, file_path: str,
+                           content_hash: str) -> tuple[int, str, bool, bool]:
+    """Insert the document row for an upload, reusing extracted text from an identical earlier upload.
+    
+    Re-uploading content already attached to the same conversation returns that document
+    instead of adding a second copy to its retrieval context. If that document is still
+    processing but no worker holds it (lost in a restart), it is queued again.
+    
+    Returns the document id, its processing state, whether a row was inserted and whether
+    the document needs queueing for ingestion.
+    """
+    from llm_pkg.ingest import unclaimed
+    
+    same_conversation = (await db.execute(
+        select(DBDocument.id, DBDocument.processing_state, unclaimed().label("unclaimed")).where(
+            DBDocument.user_id == user_id, DBDocument.conversation_id == conversation_id,
+            DBDocument.content_hash == content_hash, DBDocument.processing_state != "failed", ).limit(1))).first()
+    if same_conversation is not None:
+        # Queueing a document another process also queued is harmless: only one worker claims it
+        requeue = same_conversation.processing_state == "processing" and bool(same_conversation.unclaimed)
+        return same_conversation.id, same_conversation.processing_state, False, requeue
+    
+    existing = (await db.execute(select(DBDocument.content).where(DBDocument.user_id == user_id,
+                                                                  DBDocument.content_hash == content_hash,
+                                                                  DBDocument.processing_state == "ready", ).limit(
+        1))).first()
+    db_doc = DBDocument(filename=filename, file_path=file_path, user_id=user_id, conversation_id=conversation_id,
+                        content_hash=content_hash, )
+    if existing is not None:
+        db_doc.content = existing.content
+        db_doc.processing_state = "ready"
+    else:
+        db_doc.processing_state = "processing"
+    db.add(db_doc)
+    await db.commit()
+    return db_doc.id, db_doc.processing_state, True, db_doc.processing_state == "processing"
+
+
 @router.post("/upload-document")
 async def upload_document(file: UploadFile = File(...), conversation_id: int = Form(...),
-                          current_user: User = Depends(get_current_active_user), db: Session = Depends(get_db), ):
+                          current_user: User = Depends(get_current_active_user),
+                          db: AsyncSession = Depends(get_async_db), ):
     """
     Upload a document for a specific conversation.
     Documents are strictly conversation-specific for isolation.
     """
     import logging
-    from llm_pkg.storage import STORAGE_DIR
-    from llm_pkg.document_processor import DocumentProcessor
+    from llm_pkg.ingest import enqueue_document
+    from llm_pkg.storage import save_document_stream
     
     logger = logging.getLogger(__name__)
     
@@ -274,39 +535,28 @@ async def upload_document(file: UploadFile = File(...), conversation_id: int = F
             raise HTTPException(status_code=400, detail="Filename is required")
         
         # Verify conversation ownership (required)
-        conversation = (db.query(Conversation).filter(Conversation.id == conversation_id,
-                                                      Conversation.user_id == current_user.id, ).first())
-        if not conversation:
+        if not await _owns_conversation(db, conversation_id, current_user.id):
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Conversation not found", )
         
-        # Read file content
-        content = await file.read()
+        # Stream the upload to storage in chunks instead of buffering it in memory
+        file_path, content_hash = await save_document_stream(file, file.filename)
         
-        # Save to storage
-        file_path = STORAGE_DIR / file.filename
-        file_path.parent.mkdir(parents=True, exist_ok=True)
-        with file_path.open("wb") as f:
-            f.write(content)
+        # Record the document now; text extraction runs in the background ingest workers
+        # unless the same content was already processed for this user
+        document_id, processing_state, created, queue = await _register_upload(
+            db, current_user.id, conversation_id, file.filename, str(file_path), content_hash)
+        if queue:
+            await enqueue_document(document_id, file_path, conversation_id)
+        if created:
+            # Earlier answers did not see this document
+            invalidate_conversation(conversation_id)
         
-        # Process document
-        doc_processor = DocumentProcessor()
-        processed_data = await doc_processor.process_document(file_path)
-
-        # Determine stored content: prefer processed 'full_text' if available (text/md/pdf), then 'text', then raw bytes
-        stored_text = processed_data.get("full_text") or processed_data.get("text") or content.decode("utf-8", errors="ignore")
-
-        # Save to database
-        db_doc = DBDocument(filename=file.filename,
-                            content=stored_text,
-                            file_path=str(file_path), user_id=current_user.id, conversation_id=conversation_id, )
-        db.add(db_doc)
-        db.commit()
-        db.refresh(db_doc)
+        logger.info("Document uploaded: %s for user %s, conversation %s", file.filename, current_user.id,
+                    conversation_id)
         
-        logger.info(f"Document uploaded: {file.filename} for user {current_user.id}, conversation {conversation_id}")
-        
-        return {"message": "Document uploaded successfully", "document_id": db_doc.id, "filename": file.filename,
-                "conversation_id": conversation_id, "scope": "conversation", }
+        return {"message": "Document uploaded successfully", "document_id": document_id, "filename": file.filename,
+                "conversation_id": conversation_id, "scope": "conversation", "status": processing_state,
+                "content_hash": content_hash, }
     
     except HTTPException:
         raise
@@ -317,37 +567,50 @@ async def upload_document(file: UploadFile = File(...), conversation_id: int = F
 
 
 @router.get("/documents")
-async def list_user_documents(conversation_id: int,
-                              current_user: User = Depends(get_current_active_user), db: Session = Depends(get_db), ):
+async def list_user_documents(conversation_id: int, current_user: User = Depends(get_current_active_user),
+                              db: AsyncSession = Depends(get_async_db), ):
     """List documents for a specific conversation."""
     # Verify conversation ownership
-    conversation = (db.query(Conversation).filter(Conversation.id == conversation_id,
-                                                  Conversation.user_id == current_user.id, ).first())
-    if not conversation:
+    if not await _owns_conversation(db, conversation_id, current_user.id):
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Conversation not found", )
     
     # Get documents for this conversation only
-    documents = db.query(DBDocument).filter(
+    documents = await db.execute(select(DBDocument.id, DBDocument.filename, DBDocument.conversation_id,
+                                        DBDocument.created_at, DBDocument.processing_state).where(
         DBDocument.user_id == current_user.id,
         DBDocument.conversation_id == conversation_id
-    ).all()
+    ))
+    
+    # ORJSONResponse serializes the datetimes natively, skipping jsonable_encoder
+    return ORJSONResponse([{"id": doc.id, "filename": doc.filename, "conversation_id": doc.conversation_id,
+                            "created_at": doc.created_at, "scope": "conversation",
+                            "status": doc.processing_state, } for doc in documents])
+
+
+@router.get("/documents/{document_id}/status")
+async def get_document_status(document_id: int, current_user: User = Depends(get_current_active_user),
+                              db: AsyncSession = Depends(get_async_db), ):
+    """Poll the ingestion state of an uploaded document."""
+    state = await db.scalar(select(DBDocument.processing_state).where(DBDocument.id == document_id,
+                                                                      DBDocument.user_id == current_user.id, ))
+    if state is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Document not found", )
     
-    return [{"id": doc.id, "filename": doc.filename, "conversation_id": doc.conversation_id,
-             "created_at": doc.created_at.isoformat(), "scope": "conversation", } for doc in documents]
+    return {"document_id": document_id, "status": state}
 
 
 @router.get("/documents/{document_id}/preview")
 async def preview_document(
     document_id: int,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Get document preview with full content."""
     # Get document and verify ownership
-    document = db.query(DBDocument).filter(
+    document = await db.scalar(select(DBDocument).where(
         DBDocument.id == document_id,
         DBDocument.user_id == current_user.id
-    ).first()
+    ))
     
     if not document:
         raise HTTPException(
@@ -356,77 +619,69 @@ async def preview_document(
         )
     
     # Get usage statistics - how many times this document was referenced
-    from llm_pkg.database.models import MessageDocumentMatch
-    
-    usage_count = db.query(MessageDocumentMatch).filter(
+    usage_count = await db.scalar(select(func.count(MessageDocumentMatch.id)).where(
         MessageDocumentMatch.document_id == document_id
-    ).count()
+    ))
     
     # Get the messages that used this document
-    matches = db.query(MessageDocumentMatch).filter(
+    matches = (await db.scalars(select(MessageDocumentMatch).where(
         MessageDocumentMatch.document_id == document_id
-    ).order_by(MessageDocumentMatch.created_at.desc()).limit(10).all()
+    ).options(selectinload(MessageDocumentMatch.message)).order_by(
+        MessageDocumentMatch.created_at.desc()).limit(10))).all()
     
     match_previews = []
     for match in matches:
-        message = db.query(Message).filter(Message.id == match.message_id).first()
+        message = match.message
         if message:
             match_previews.append({
                 "message_id": match.message_id,
                 "message_content": message.content[:100] + "..." if len(message.content) > 100 else message.content,
                 "matched_content": match.matched_content[:200] + "..." if match.matched_content and len(match.matched_content) > 200 else match.matched_content,
                 "relevance_score": match.relevance_score,
-                "created_at": match.created_at.isoformat()
+                "created_at": match.created_at
             })
     
-    return {
+    return ORJSONResponse({
         "id": document.id,
         "filename": document.filename,
         "content": document.content,
         "file_path": document.file_path,
         "conversation_id": document.conversation_id,
-        "created_at": document.created_at.isoformat(),
+        "created_at": document.created_at,
         "usage_count": usage_count,
         "recent_matches": match_previews
-    }
+    })
 
 
 @router.get("/messages/{message_id}/document-matches")
 async def get_message_document_matches(
     message_id: int,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     """Get all documents that were used to generate a specific message."""
     # Verify message belongs to user's conversation
-    message = db.query(Message).filter(Message.id == message_id).first()
-    if not message:
+    conversation_id = await db.scalar(select(Message.conversation_id).where(Message.id == message_id))
+    if conversation_id is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Message not found"
         )
     
-    conversation = db.query(Conversation).filter(
-        Conversation.id == message.conversation_id,
-        Conversation.user_id == current_user.id
-    ).first()
-    
-    if not conversation:
+    if not await _owns_conversation(db, conversation_id, current_user.id):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Access denied"
         )
     
     # Get document matches
-    from llm_pkg.database.models import MessageDocumentMatch
-    
-    matches = db.query(MessageDocumentMatch).filter(
+    matches = (await db.scalars(select(MessageDocumentMatch).where(
         MessageDocumentMatch.message_id == message_id
-    ).all()
+    ).options(selectinload(MessageDocumentMatch.document)))).all()
     
     result = []
     for match in matches:
-        document = db.query(DBDocument).filter(DBDocument.id == match.document_id).first()
+        document = match.document
         if document:
             result.append({
                 "document_id": match.document_id,
@@ -436,5 +691,5 @@ async def get_message_document_matches(
                 "conversation_id": document.conversation_id
             })
     
-    return result
+    return ORJSONResponse(result)
 
@@ -15,10 +15,9 @@ from rich.panel import Panel
 from rich.progress import Progress
 from rich.table import Table
 
-from llm_pkg.config import llm_loader
-from llm_pkg.document_processor import DocumentProcessor
+from llm_pkg.config import doc_processor, llm_loader
 from llm_pkg.qa_engine import QAEngine
-from llm_pkg.storage import list_document_metadata, save_document
+from llm_pkg.storage import list_document_metadata, record_document, save_document_file
 
 console = Console()
 logger = logging.getLogger("llm_pkg.cli")
@@ -30,7 +29,7 @@ class CLI:
     def __init__(self):
         from llm_pkg.config import graph_manager
 
-        self.doc_processor = DocumentProcessor()
+        self.doc_processor = doc_processor
         self.qa_engine = QAEngine(llm_loader, graph_manager)
 
     async def upload_document(self, file_path: str):
@@ -46,18 +45,19 @@ class CLI:
         with Progress() as progress:
             task = progress.add_task("[cyan]Processing...", total=100)
 
-            # Read file
-            with open(path, "rb") as f:
-                content = f.read()
-            progress.update(task, advance=30)
-
-            # Save document
-            saved_path = save_document(content, path.name)
-            progress.update(task, advance=30)
+            # Save document with a kernel-side copy rather than reading it whole
+            saved_path = await asyncio.to_thread(save_document_file, path)
+            progress.update(task, advance=60)
 
             # Process document
             processed = await self.doc_processor.process_document(saved_path)
-            progress.update(task, advance=40)
+            progress.update(task, advance=30)
+
+            # Record it in the database with the extracted text, as save_document does
+            await asyncio.to_thread(
+                record_document, saved_path, extracted_text=processed.get("full_text")
+            )
+            progress.update(task, advance=10)
 
         # Display results
         console.print(
@@ -160,41 +160,46 @@ class CLI:
             )
         )
 
-        while True:
-            try:
-                command = console.input("\n[bold cyan]llm-pkg>[/bold cyan] ").strip()
-
-                if not command:
-                    continue
-
-                parts = command.split(maxsplit=1)
-                cmd = parts[0].lower()
-                args = parts[1] if len(parts) > 1 else ""
-
-                if cmd == "exit":
-                    console.print("[yellow]Goodbye![/yellow]")
-                    break
-                elif cmd == "upload":
-                    if args:
-                        asyncio.run(self.upload_document(args))
+        # One event loop for the whole session, so the HTTP clients and thread pool
+        # warmed by the first command are reused by the following ones
+        with asyncio.Runner() as runner:
+            while True:
+                try:
+                    command = console.input(
+                        "\n[bold cyan]llm-pkg>[/bold cyan] "
+                    ).strip()
+
+                    if not command:
+                        continue
+
+                    parts = command.split(maxsplit=1)
+                    cmd = parts[0].lower()
+                    args = parts[1] if len(parts) > 1 else ""
+
+                    if cmd == "exit":
+                        console.print("[yellow]Goodbye![/yellow]")
+                        break
+                    elif cmd == "upload":
+                        if args:
+                            runner.run(self.upload_document(args))
+                        else:
+                            console.print("[red]Usage: upload <file_path>[/red]")
+                    elif cmd == "list":
+                        self.list_documents()
+                    elif cmd == "query":
+                        if args:
+                            runner.run(self.query(args))
+                        else:
+                            console.print("[red]Usage: query <question>[/red]")
+                    elif cmd == "config":
+                        self.show_config()
                     else:
-                        console.print("[red]Usage: upload <file_path>[/red]")
-                elif cmd == "list":
-                    self.list_documents()
-                elif cmd == "query":
-                    if args:
-                        asyncio.run(self.query(args))
-                    else:
-                        console.print("[red]Usage: query <question>[/red]")
-                elif cmd == "config":
-                    self.show_config()
-                else:
-                    console.print(f"[red]Unknown command: {cmd}[/red]")
-
-            except KeyboardInterrupt:
-                console.print("\n[yellow]Use 'exit' to quit.[/yellow]")
-            except Exception as e:
-                console.print(f"[red]Error: {e}[/red]")
+                        console.print(f"[red]Unknown command: {cmd}[/red]")
+
+                except KeyboardInterrupt:
+                    console.print("\n[yellow]Use 'exit' to quit.[/yellow]")
+                except Exception as e:
+                    console.print(f"[red]Error: {e}[/red]")
 
 
 def main():
@@ -1,11 +1,15 @@
 from __future__ import annotations
 
+import functools
 import os
 import logging
+import re
+import threading
+import tomllib
 from pathlib import Path
-from typing import Any, Mapping, NamedTuple
+from typing import Any, Callable, Mapping, NamedTuple
 
-import tomli
+from llm_pkg.document_processor import DocumentProcessor
 
 # Guard heavy third-party imports so the package can be imported in minimal dev
 # environments (tests, linters, docs) even if provider integrations are not
@@ -70,6 +74,83 @@ else:
     CONFIG_FILE = LOCAL_CONFIG
 
 
+# API key placeholders in the TOML: any value wrapped in angle brackets, e.g.
+# api_key = "<OPENAI_API_KEY>" or "<your-api-key>"; the inside names the env variable
+_PLACEHOLDER_RE = re.compile(r"^<([^>]*)>$")
+# Environment variable tried when a placeholder's own variable is unset
+_DEFAULT_ENV_BY_PROVIDER = {
+    "openai": "OPENAI_API_KEY",
+    "azure_openai": "AZURE_OPENAI_API_KEY",
+    "google_genai": "GOOGLE_API_KEY",
+}
+# Provider names accepted in the TOML mapped to the ones `init_chat_model` expects
+_PROVIDER_ALIASES = {
+    "vertexai": "google_genai",
+    "google": "google_genai",
+}
+
+
+def _rename_kwargs(config_kwargs: dict[str, Any], renames: tuple[tuple[str, str], ...]) -> None:
+    for generic, specific in renames:
+        if generic in config_kwargs:
+            config_kwargs.setdefault(specific, config_kwargs.pop(generic))
+
+
+def _remap_azure_openai(config_kwargs: dict[str, Any]) -> None:
+    config_kwargs.setdefault("deployment_id", None)
+
+
+# Per-provider rewrites of the merged TOML/call kwargs, keyed by resolved provider.
+# - openai: map generic "api_key"/"base_url" to openai_api_key/openai_api_base so
+#   OpenAI-compatible endpoints (e.g. OpenRouter) are used instead of platform OpenAI.
+# - google_genai (also vertexai/google): accept api_key, project and credentials in
+#   the TOML for google_api_key, project_id and google_credentials.
+_PROVIDER_REMAPPERS: dict[str, Callable[[dict[str, Any]], None]] = {
+    "openai": functools.partial(
+        _rename_kwargs, renames=(("api_key", "openai_api_key"), ("base_url", "openai_api_base"))
+    ),
+    "google_genai": functools.partial(
+        _rename_kwargs,
+        renames=(("api_key", "google_api_key"), ("project", "project_id"), ("credentials", "google_credentials")),
+    ),
+    "azure_openai": _remap_azure_openai,
+}
+
+
+@functools.lru_cache(maxsize=None)
+def _env(name: str, default: str | None = None) -> str | None:
+    """os.getenv for build_model's API key lookups, memoized until LLMLoader.reload()."""
+    return os.getenv(name, default)
+
+
+# Last parsed TOML per resolved config path, with the (st_mtime_ns, st_size) it was
+# parsed at, so loaders sharing a file don't re-read it until it changes.
+_TOML_CACHE: dict[str, tuple[tuple[int, int], dict[str, Any]]] = {}
+
+
+def _load_toml(path: Path) -> tuple[tuple[int, int], dict[str, Any]]:
+    """Return the file's (st_mtime_ns, st_size) and its parsed contents, parsing only on change."""
+    st = path.stat()
+    file_key = (st.st_mtime_ns, st.st_size)
+    resolved = str(path.resolve())
+    cached = _TOML_CACHE.get(resolved)
+    if cached is not None and cached[0] == file_key:
+        return cached
+    with path.open("rb") as config_file:
+        raw = tomllib.load(config_file)
+    _TOML_CACHE[resolved] = (file_key, raw)
+    return file_key, raw
+
+
+def _freeze(value: Any) -> Any:
+    """Hashable stand-in for TOML values (tables and arrays) used in model cache keys."""
+    if isinstance(value, Mapping):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
 class ProviderConfig(NamedTuple):
     provider: str
     model: str
@@ -88,8 +169,18 @@ class LLMLoader:
     
     def __init__(self, config_path: Path | None = None) -> None:
         self.config_path = config_path or CONFIG_FILE
-        self.providers: dict[str, ProviderConfig] = {}
-        self.default: ProviderConfig | None = None
+        # (providers, default) published together by reload(); see the properties below.
+        self._state: tuple[dict[str, ProviderConfig], ProviderConfig | None] = ({}, None)
+        self._observer: Any = None
+        self._reload_timer: threading.Timer | None = None
+        self._watch_lock = threading.Lock()
+        self._serialized_cache: dict[str, Any] | None = None
+        # Built chat models keyed by resolved provider settings and kwargs; see get_model().
+        self._model_cache: dict[tuple, Any] = {}
+        self._model_cache_lock = threading.Lock()
+        # (st_mtime_ns, st_size) of the config file last applied; reload() skips
+        # rebuilding providers while it is unchanged.
+        self._file_key: tuple[int, int] | None = None
         # Attempt to load configuration, but handle missing/malformed files gracefully.
         try:
             self.reload()
@@ -103,6 +194,12 @@ class LLMLoader:
             )
     
     def reload(self) -> None:
+        # Built models and the memoized API key lookups capture the environment, so they
+        # and the serialized view are dropped on every reload even when the file is unchanged.
+        self._serialized_cache = None
+        _env.cache_clear()
+        with self._model_cache_lock:
+            self._model_cache.clear()
         # If the config file doesn't exist, do not raise; set empty providers.
         if not self.config_path.exists():
             logger.warning(
@@ -111,20 +208,23 @@ class LLMLoader:
                 self.config_path,
                 LOCAL_CONFIG,
             )
-            self.providers.clear()
-            self.default = None
+            self._state = ({}, None)
+            self._file_key = None
             return
         
         # Read and parse TOML, with helpful error messages on parse failure.
         try:
-            raw_text = self.config_path.read_text(encoding="utf-8")
-            raw = tomli.loads(raw_text)
+            file_key, raw = _load_toml(self.config_path)
         except Exception as e:
             raise RuntimeError(
                 f"Failed to read or parse LLM config at {self.config_path}: {e}"
-            )(e)
+            ) from e
         
-        self.providers.clear()
+        # The parsed providers are still current if the file hasn't been touched.
+        if file_key == self._file_key:
+            return
+        
+        providers: dict[str, ProviderConfig] = {}
         default_section = raw.get("default", {})
         for name, section in raw.items():
             if name in {"default", "metadata", "logging"}:
@@ -134,110 +234,180 @@ class LLMLoader:
                 raise ValueError(f"Provider section '{name}' must declare `provider`.")
             model = section.get("model", section.get("deployment_id") or "gpt-4o")
             meta = {k: v for k, v in section.items() if k not in {"provider", "model"}}
-            self.providers[name] = ProviderConfig(
+            providers[name] = ProviderConfig(
                 provider=provider, model=model, meta=meta
             )
         
-        self.default = None
+        default = None
         if default_section:
             provider_name = default_section.get("provider_name")
-            if provider_name and provider_name in self.providers:
-                self.default = self.providers[provider_name]
+            if provider_name and provider_name in providers:
+                default = providers[provider_name]
             else:
                 fallback_provider = default_section.get("provider")
                 fallback_model = default_section.get("model")
                 if fallback_provider and fallback_model:
-                    self.default = ProviderConfig(
+                    default = ProviderConfig(
                         provider=fallback_provider, model=fallback_model, meta={}
                     )
         
-        if not self.default and "openai" in self.providers:
-            self.default = self.providers["openai"]
+        if not default and "openai" in providers:
+            default = providers["openai"]
+        
+        # Build the new state off to the side and publish it in one step so
+        # concurrent readers never observe a half-populated provider set.
+        self._state = (providers, default)
+        self._file_key = file_key
+    
+    @property
+    def providers(self) -> dict[str, ProviderConfig]:
+        return self._state[0]
+    
+    @property
+    def default(self) -> ProviderConfig | None:
+        return self._state[1]
+    
+    def start_watching(self, debounce_s: float = 0.1) -> None:
+        """Reload automatically when the config file changes on disk.
+
+        Editors often emit several events per save, so reloads are debounced:
+        the file is re-read once no event has arrived for ``debounce_s`` seconds.
+        Requires the optional ``watchdog`` package.
+        """
+        try:
+            from watchdog.events import FileSystemEventHandler
+            from watchdog.observers import Observer
+        except ImportError as e:
+            raise ImportError(
+                "Config hot-reload requires watchdog. Install it with `pip install watchdog`."
+            ) from e
+        
+        target = str(self.config_path.resolve())
+        loader = self
+        
+        class _ConfigFileHandler(FileSystemEventHandler):
+            def on_any_event(self, event) -> None:
+                paths = {getattr(event, "src_path", None), getattr(event, "dest_path", None)}
+                if any(p and os.path.abspath(p) == target for p in paths):
+                    loader._schedule_reload(debounce_s)
+        
+        with self._watch_lock:
+            if self._observer is not None:
+                return
+            # Watch the directory rather than the file so atomic "write temp + rename"
+            # saves, which replace the inode, are still seen.
+            observer = Observer()
+            observer.schedule(_ConfigFileHandler(), str(Path(target).parent), recursive=False)
+            observer.daemon = True
+            observer.start()
+            self._observer = observer
+        logger.info("Watching %s for LLM config changes", target)
+    
+    def stop_watching(self) -> None:
+        with self._watch_lock:
+            observer, self._observer = self._observer, None
+            if self._reload_timer is not None:
+                self._reload_timer.cancel()
+                self._reload_timer = None
+        if observer is not None:
+            observer.stop()
+            observer.join()
+    
+    def _schedule_reload(self, debounce_s: float) -> None:
+        with self._watch_lock:
+            if self._reload_timer is not None:
+                self._reload_timer.cancel()
+            self._reload_timer = threading.Timer(debounce_s, self._reload_from_watch)
+            self._reload_timer.daemon = True
+            self._reload_timer.start()
+    
+    def _reload_from_watch(self) -> None:
+        try:
+            self.reload()
+            logger.info("Reloaded LLM config from %s", self.config_path)
+        except Exception as exc:
+            # Keep serving the last good config while the file is mid-edit or invalid
+            logger.warning("Failed to reload LLM config from %s: %s", self.config_path, exc)
+    
+    def serialized_providers(self) -> dict[str, Any]:
+        """Return the JSON-ready provider listing served by `/config`.
+
+        The structure only changes on `reload()`, so it is built once and reused.
+        """
+        if self._serialized_cache is None:
+            providers, default = self._state
+            self._serialized_cache = {
+                "providers": {
+                    name: {"provider": cfg.provider, "model": cfg.model}
+                    for name, cfg in providers.items()
+                },
+                "default": (
+                    {"provider": default.provider, "model": default.model}
+                    if default
+                    else None
+                ),
+            }
+        return self._serialized_cache
     
     def get_provider_config(self, name: str | None = None) -> ProviderConfig:
+        providers, default = self._state
         if name:
-            if name not in self.providers:
+            if name not in providers:
                 raise KeyError(f"No provider section named '{name}'")
-            return self.providers[name]
-        if self.default:
-            return self.default
+            return providers[name]
+        if default:
+            return default
         raise ValueError("No default provider configured.")
     
+    def get_model(self, name: str | None = None, **kwargs: Any):
+        """Return a chat model for `name`, building it only on first use.
+
+        Model construction (client setup, auth headers) is kept off the request
+        path by caching instances per resolved (provider, model, settings, kwargs)
+        until `reload()`, so the default section and sections with identical
+        settings share one client. Nested tables and arrays in the settings are
+        frozen into the key; anything else unhashable falls through to
+        `build_model()` uncached.
+        """
+        cfg = self.get_provider_config(name)
+        try:
+            key = (cfg.provider, cfg.model, _freeze(cfg.meta), _freeze(kwargs))
+            model = self._model_cache.get(key)
+        except TypeError:
+            return self.build_model(name, **kwargs)
+        if model is None:
+            with self._model_cache_lock:
+                model = self._model_cache.get(key)
+                if model is None:
+                    model = self.build_model(name, **kwargs)
+                    self._model_cache[key] = model
+        return model
+    
     def build_model(self, name: str | None = None, **kwargs: Any):
         cfg = self.get_provider_config(name)
         config_kwargs = {**cfg.meta}
         # Merge kwargs passed to function invocation and config.
         config_kwargs.update(kwargs)
         
-        # Replace placeholder API keys with environment variables
-        if "api_key" in config_kwargs:
-            api_key_value = config_kwargs["api_key"]
-            # Check if it's a placeholder (starts with < and ends with >)
-            if (
-                    isinstance(api_key_value, str)
-                    and api_key_value.startswith("<")
-                    and api_key_value.endswith(">")
-            ):
-                # Extract the env var name and try to get from environment
-                env_var_name = api_key_value.strip("<>")
-                env_value = os.getenv(env_var_name)
-                if env_value:
-                    config_kwargs["api_key"] = env_value
-                else:
-                    # Try common environment variable names
-                    if cfg.provider in {"google_genai", "google", "vertexai"}:
-                        config_kwargs["api_key"] = os.getenv(
-                            "GOOGLE_API_KEY", api_key_value
-                        )
-                    elif cfg.provider == "openai":
-                        config_kwargs["api_key"] = os.getenv(
-                            "OPENAI_API_KEY", api_key_value
-                        )
-                    elif cfg.provider == "azure_openai":
-                        config_kwargs["api_key"] = os.getenv(
-                            "AZURE_OPENAI_API_KEY", api_key_value
-                        )
-        
-        # Map generic "api_key"/"base_url" to provider-specific names for
-        # the OpenAI-compatible provider so the underlying client recognizes
-        # them (e.g. openai_api_key, openai_api_base). This ensures OpenRouter
-        # base URLs and API keys are used instead of trying to hit platform
-        # OpenAI endpoints.
-        if cfg.provider == "openai":
-            if "api_key" in config_kwargs:
-                config_kwargs.setdefault("openai_api_key", config_kwargs.pop("api_key"))
-            if "base_url" in config_kwargs:
-                config_kwargs.setdefault(
-                    "openai_api_base", config_kwargs.pop("base_url")
-                )
-        
-        # Vertex AI (Google Gemini) provider-specific mapping. LangChain's
-        # VertexAI/Google provider accepts values like project_id, location
-        # and credentials; make it convenient to specify an `api_key` or
-        # `google_credentials` in the provider section of the TOML.
-        if cfg.provider in {"vertexai", "google", "google_genai"}:
-            # map common keys to what the runtime often expects
-            if "api_key" in config_kwargs:
-                config_kwargs.setdefault("google_api_key", config_kwargs.pop("api_key"))
-            if "project" in config_kwargs:
-                config_kwargs.setdefault("project_id", config_kwargs.pop("project"))
-            if "location" in config_kwargs:
-                config_kwargs.setdefault("location", config_kwargs.pop("location"))
-            if "credentials" in config_kwargs:
-                config_kwargs.setdefault(
-                    "google_credentials", config_kwargs.pop("credentials")
-                )
+        # Normalize any provider aliases to the provider names expected by
+        # `init_chat_model` (for example: vertexai -> google_genai).
+        model_provider = _PROVIDER_ALIASES.get(cfg.provider, cfg.provider)
         
-        if cfg.provider == "azure_openai":
-            config_kwargs.setdefault("deployment_id", cfg.meta.get("deployment_id"))
+        # Replace placeholder API keys (e.g. "<OPENAI_API_KEY>") with environment
+        # variables, falling back to the provider's conventional variable.
+        api_key_value = config_kwargs.get("api_key")
+        match = _PLACEHOLDER_RE.match(api_key_value) if isinstance(api_key_value, str) else None
+        if match:
+            env_value = _env(match.group(1))
+            if env_value:
+                config_kwargs["api_key"] = env_value
+            elif model_provider in _DEFAULT_ENV_BY_PROVIDER:
+                config_kwargs["api_key"] = _env(_DEFAULT_ENV_BY_PROVIDER[model_provider], api_key_value)
         
-        # Normalize any provider aliases to the provider names expected by
-        # `init_chat_model` (for example: vertexai -> google_vertexai).
-        provider_aliases = {
-            "vertexai": "google_genai",
-            "google": "google_genai",
-        }
-        model_provider = provider_aliases.get(cfg.provider, cfg.provider)
+        # Rename generic settings to the names the provider's client expects
+        remap = _PROVIDER_REMAPPERS.get(model_provider)
+        if remap is not None:
+            remap(config_kwargs)
         
         # Avoid passing duplicate keyword arguments. init_chat_model accepts the
         # model_provider and other keyword args; pass the resolved config_kwargs
@@ -266,7 +436,7 @@ class LangGraphManager:
         self.runtime: Runtime | None = None
     
     def apply_config(self, provider_name: str | None = None) -> RunnableConfig:
-        model = self.loader.build_model(provider_name)
+        model = self.loader.get_model(provider_name)
         metadata = {
             "langchain_provider": provider_name or self.loader.default.provider,
             "langchain_model": getattr(model, "model", "custom"),
@@ -278,5 +448,23 @@ class LangGraphManager:
         return {"langgraph_runtime": self.runtime} if self.runtime else {}
 
 
-llm_loader = LLMLoader()
-graph_manager = LangGraphManager(llm_loader)
+# llm_loader and graph_manager are built on first access (PEP 562), so importing
+# this module doesn't read and parse the config for callers that never use an LLM.
+llm_loader: LLMLoader
+graph_manager: LangGraphManager
+_singletons_lock = threading.Lock()
+
+
+def __getattr__(name: str) -> Any:
+    if name not in {"llm_loader", "graph_manager"}:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    with _singletons_lock:
+        if "llm_loader" not in globals():
+            globals()["llm_loader"] = LLMLoader()
+        if "graph_manager" not in globals():
+            globals()["graph_manager"] = LangGraphManager(globals()["llm_loader"])
+    return globals()[name]
+
+
+# Stateless, so one instance serves every request, worker and QA engine
+doc_processor = DocumentProcessor()
@@ -6,9 +6,16 @@ Processes various document formats, extracts text, metadata, and structure.
 
 from __future__ import annotations
 
+import asyncio
 import logging
+import multiprocessing
+import os
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import islice
 from pathlib import Path
-from typing import Any
+from typing import Any, Iterator
 
 import pdfplumber
 import pypdf
@@ -16,6 +23,118 @@ from langchain_core.documents import Document
 
 logger = logging.getLogger("llm_pkg.document_processor")
 
+# A stripped line under 100 characters that starts with a digit, "#" or "*", or
+# has uppercase but no lowercase letters; group 1 is the stripped line
+_HEADING_RE = re.compile(
+    r"^[^\S\n]*(?=[#*\d]|[^\na-z]*[A-Z][^\na-z]*$)(\S(?:[^\n]{0,97}\S)?)[^\S\n]*$",
+    re.MULTILINE,
+)
+_LIST_ITEM_RE = re.compile(r"^[^\S\n]*(?:[•*-]|[12]\.)", re.MULTILINE)
+
+# Characters split at a time when counting words
+_WORD_COUNT_WINDOW = 1 << 20
+
+
+def _count_words(text: str) -> int:
+    """len(text.split()) without materializing every word of a large text at once."""
+    total = start = 0
+    while start < len(text):
+        end = min(start + _WORD_COUNT_WINDOW, len(text))
+        # Extend the window to the next whitespace so no word straddles two windows
+        while end < len(text) and not text[end].isspace():
+            end += 1
+        total += len(text[start:end].split())
+        start = end
+    return total
+
+
+# PDFs with at least this many pages are extracted by a pool of worker processes
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "32"))
+# Processes in that pool (1 disables parallel extraction)
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", str(min(8, os.cpu_count() or 1))))
+
+
+def _page_data(page: Any) -> dict[str, Any]:
+    """Extract the text and table summary of one pdfplumber page."""
+    # Extract text
+    text = page.extract_text() or ""
+
+    # Extract tables
+    tables = page.extract_tables()
+
+    page_data = {
+        "page_number": page.page_number,
+        "text": text,
+        "num_tables": len(tables) if tables else 0,
+        # extract_text() lays words out space/newline separated, so this matches
+        # len(page.extract_words()) without a second character-grouping pass
+        "num_words": len(text.split()),
+        "width": page.width,
+        "height": page.height,
+    }
+
+    # Add table data if present
+    if tables:
+        page_data["tables"] = [
+            {"rows": len(table), "cols": len(table[0]) if table else 0}
+            for table in tables
+        ]
+
+    return page_data
+
+
+def _extract_page_range(file_path: str, first: int, last: int) -> list[dict[str, Any]]:
+    """Extract pages first..last (1-based, inclusive); runs in a pool process."""
+    with pdfplumber.open(file_path, pages=list(range(first, last + 1))) as pdf:
+        return [_page_data(page) for page in pdf.pages]
+
+
+# Threads parsing documents concurrently for process_document()
+DOC_PARSE_THREADS = int(os.getenv("DOC_PARSE_THREADS", "4"))
+_parse_pool: ThreadPoolExecutor | None = None
+_pools_lock = threading.Lock()
+
+
+def _parse_executor() -> ThreadPoolExecutor:
+    global _parse_pool
+    if _parse_pool is None:
+        with _pools_lock:
+            if _parse_pool is None:
+                _parse_pool = ThreadPoolExecutor(
+                    max_workers=DOC_PARSE_THREADS, thread_name_prefix="doc-parse"
+                )
+    return _parse_pool
+
+
+_pdf_pool: ProcessPoolExecutor | None = None
+
+
+def _extract_pages_parallel(file_path: Path, num_pages: int) -> list[dict[str, Any]]:
+    """Split a PDF into contiguous page ranges and extract them in worker processes.
+
+    pdfminer is pure Python and a pdfplumber document is not safe to share across
+    threads, so each process opens the file itself and works on its own range.
+    """
+    global _pdf_pool
+    if _pdf_pool is None:
+        with _pools_lock:
+            if _pdf_pool is None:
+                # spawn: forking a process that runs an event loop and threads is unsafe
+                _pdf_pool = ProcessPoolExecutor(
+                    max_workers=PDF_WORKERS,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+    step = -(-num_pages // PDF_WORKERS)
+    ranges = [
+        (first, min(first + step - 1, num_pages))
+        for first in range(1, num_pages + 1, step)
+    ]
+    futures = [
+        _pdf_pool.submit(_extract_page_range, str(file_path), first, last)
+        for first, last in ranges
+    ]
+    return [page_data for future in futures for page_data in future.result()]
+
 
 class DocumentProcessor:
     """
@@ -26,16 +145,35 @@ class DocumentProcessor:
     def __init__(self):
         self.supported_formats = {".pdf", ".txt", ".md"}
 
-    async def process_document(self, file_path: Path) -> dict[str, Any]:
+    async def process_document(
+        self, file_path: Path, page_text: bool = True
+    ) -> dict[str, Any]:
         """
         Process a document and extract all relevant information.
 
+        Parsing is CPU-bound, so it runs on a dedicated thread pool to keep the
+        event loop serving other requests meanwhile. The pool is separate from
+        the loop's default executor, so a burst of large uploads can't occupy
+        the threads that asyncio.to_thread() callers (file saves, DB writes)
+        depend on.
+
         Args:
             file_path: Path to the document
+            page_text: Keep each PDF page's text in ``pages`` alongside
+                ``full_text``. Callers that only need ``full_text`` pass False
+                so the document's text is held once rather than twice.
 
         Returns:
             Dictionary containing processed document data
         """
+        return await asyncio.get_running_loop().run_in_executor(
+            _parse_executor(), self.process_document_sync, file_path, page_text
+        )
+
+    def process_document_sync(
+        self, file_path: Path, page_text: bool = True
+    ) -> dict[str, Any]:
+        """Blocking variant of process_document, for threads and scripts."""
         suffix = file_path.suffix.lower()
 
         if suffix not in self.supported_formats:
@@ -44,17 +182,16 @@ class DocumentProcessor:
         logger.info(f"Processing document: {file_path.name}")
 
         if suffix == ".pdf":
-            return await self._process_pdf(file_path)
+            return self._process_pdf(file_path, page_text)
         elif suffix in {".txt", ".md"}:
-            return await self._process_text(file_path)
+            return self._process_text(file_path)
         else:
             raise ValueError(f"Unsupported format: {suffix}")
 
-    async def _process_pdf(self, file_path: Path) -> dict[str, Any]:
+    def _process_pdf(self, file_path: Path, page_text: bool = True) -> dict[str, Any]:
         """Process PDF documents with advanced extraction."""
         metadata = {}
         pages = []
-        full_text = ""
 
         # Extract basic metadata using pypdf
         try:
@@ -70,39 +207,26 @@ class DocumentProcessor:
         # Extract text and structure using pdfplumber
         try:
             with pdfplumber.open(file_path) as pdf:
-                for page_num, page in enumerate(pdf.pages, 1):
-                    # Extract text
-                    text = page.extract_text() or ""
-
-                    # Extract tables
-                    tables = page.extract_tables()
-
-                    # Extract words with positions (for layout analysis)
-                    words = page.extract_words()
-
-                    page_data = {
-                        "page_number": page_num,
-                        "text": text,
-                        "num_tables": len(tables) if tables else 0,
-                        "num_words": len(words) if words else 0,
-                        "width": page.width,
-                        "height": page.height,
-                    }
-
-                    # Add table data if present
-                    if tables:
-                        page_data["tables"] = [
-                            {"rows": len(table), "cols": len(table[0]) if table else 0}
-                            for table in tables
-                        ]
-
-                    pages.append(page_data)
-                    full_text += f"\n--- Page {page_num} ---\n{text}\n"
-
+                num_pages = len(pdf.pages)
+                parallel = num_pages >= PDF_PARALLEL_MIN_PAGES and PDF_WORKERS > 1
+                if not parallel:
+                    pages = [_page_data(page) for page in pdf.pages]
+            if parallel:
+                pages = _extract_pages_parallel(file_path, num_pages)
         except Exception as e:
             logger.error(f"Error processing PDF with pdfplumber: {e}")
             raise
 
+        # Page texts are joined once; growing a str with += is quadratic
+        full_text = "".join(
+            f"\n--- Page {page_data['page_number']} ---\n{page_data['text']}\n"
+            for page_data in pages
+        )
+
+        if not page_text:
+            for page_data in pages:
+                del page_data["text"]
+
         # Analyze document structure
         structure = self._analyze_structure(full_text, pages)
 
@@ -120,16 +244,12 @@ class DocumentProcessor:
             },
         }
 
-    async def _process_text(self, file_path: Path) -> dict[str, Any]:
+    def _process_text(self, file_path: Path) -> dict[str, Any]:
         """Process plain text and markdown documents."""
         try:
             with open(file_path, "r", encoding="utf-8") as f:
                 text = f.read()
 
-            # Basic text analysis
-            lines = text.split("\n")
-            words = text.split()
-
             structure = self._analyze_structure(text, [])
 
             return {
@@ -141,8 +261,8 @@ class DocumentProcessor:
                 "full_text": text,
                 "structure": structure,
                 "summary": {
-                    "total_lines": len(lines),
-                    "total_words": len(words),
+                    "total_lines": text.count("\n") + 1,
+                    "total_words": _count_words(text),
                     "total_characters": len(text),
                 },
             }
@@ -155,57 +275,44 @@ class DocumentProcessor:
         Analyze document structure (Docling-like).
         Identifies sections, headings, lists, etc.
         """
-        lines = text.split("\n")
-
-        # Detect potential headings (simple heuristic)
+        # Potential headings: short lines that are all caps or start with a
+        # number/marker. Only the first 10 are reported.
         headings = []
-        for i, line in enumerate(lines):
-            stripped = line.strip()
-            if stripped and len(stripped) < 100:
-                # Check if line is all caps or starts with number/marker
-                if (
-                    stripped.isupper()
-                    or stripped[0].isdigit()
-                    or stripped.startswith("#")
-                    or stripped.startswith("*")
-                ):
-                    headings.append(
-                        {
-                            "line_number": i + 1,
-                            "text": stripped[:50],
-                        }
-                    )
+        line_number, pos = 1, 0
+        for match in islice(_HEADING_RE.finditer(text), 10):
+            line_number += text.count("\n", pos, match.start())
+            pos = match.start()
+            headings.append({"line_number": line_number, "text": match.group(1)[:50]})
 
         # Detect lists
-        list_items = sum(
-            1 for line in lines if line.strip().startswith(("•", "-", "*", "1.", "2."))
-        )
+        list_items = sum(1 for _ in _LIST_ITEM_RE.finditer(text))
 
         return {
-            "num_headings": len(headings[:10]),  # Limit to first 10
-            "headings": headings[:10],
+            "num_headings": len(headings),
+            "headings": headings,
             "num_list_items": list_items,
             "has_structure": len(headings) > 0,
         }
 
-    def create_langchain_documents(
+    def iter_langchain_documents(
         self, processed_data: dict[str, Any]
-    ) -> list[Document]:
+    ) -> Iterator[Document]:
         """
-        Convert processed data to LangChain Document objects.
+        Yield LangChain Document objects for processed data, one at a time.
+
+        Consumers that chunk or embed documents as they go never hold a second
+        copy of every page's text alongside processed_data.
 
         Args:
-            processed_data: Output from process_document
+            processed_data: Output from process_document (with page_text=True)
 
-        Returns:
-            List of LangChain Document objects
+        Yields:
+            LangChain Document objects
         """
-        documents = []
-
         if processed_data["format"] == "pdf":
-            # Create one document per page
+            # One document per page
             for page in processed_data["pages"]:
-                doc = Document(
+                yield Document(
                     page_content=page["text"],
                     metadata={
                         "source": processed_data["filename"],
@@ -213,16 +320,26 @@ class DocumentProcessor:
                         "format": "pdf",
                     },
                 )
-                documents.append(doc)
         else:
             # Single document for text files
-            doc = Document(
+            yield Document(
                 page_content=processed_data["full_text"],
                 metadata={
                     "source": processed_data["filename"],
                     "format": processed_data["format"],
                 },
             )
-            documents.append(doc)
 
-        return documents
+    def create_langchain_documents(
+        self, processed_data: dict[str, Any]
+    ) -> list[Document]:
+        """
+        Convert processed data to LangChain Document objects.
+
+        Args:
+            processed_data: Output from process_document
+
+        Returns:
+            List of LangChain Document objects
+        """
+        return list(self.iter_langchain_documents(processed_data))
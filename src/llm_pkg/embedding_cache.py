@@ -0,0 +1,260 @@
+"""
+Embedding cache.
+Wraps an embeddings provider with a process-wide LRU so repeated questions and
+repeated chunk texts (boilerplate headers, re-uploaded files) skip the network
+round-trip to the embedding API. Entries are written through to a small SQLite
+file so they survive reloads and worker restarts.
+
+In memory, vectors are kept as float16 arrays (3 KB for 1536 dimensions instead
+of ~48 KB as a list of Python floats). That is the precision pgvector's halfvec
+columns store them at anyway.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_CACHE_SIZE = 10_000
+# Rows kept in the on-disk cache; least recently used rows are pruned past this
+EMBEDDING_DISK_CACHE_SIZE = int(os.getenv("EMBEDDING_DISK_CACHE_SIZE", "100000"))
+# Prune the on-disk cache once every this many writes
+_PRUNE_EVERY = 1000
+
+
+class CachedEmbedder(Embeddings):
+    """Embeddings wrapper that memoizes query and document embeddings by content hash."""
+
+    def __init__(
+        self,
+        inner: Embeddings,
+        maxsize: int = EMBEDDING_CACHE_SIZE,
+        path: Optional[Path] = None,
+        disk_maxsize: int = EMBEDDING_DISK_CACHE_SIZE,
+    ) -> None:
+        self.inner = inner
+        self.model = str(getattr(inner, "model", type(inner).__name__))
+        self.maxsize = maxsize
+        self.disk_maxsize = disk_maxsize
+        self.hits = 0
+        self.misses = 0
+        self._cache: OrderedDict[bytes, np.ndarray] = OrderedDict()
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._db: Optional[sqlite3.Connection] = None
+        if path is not None:
+            self._db = sqlite3.connect(
+                str(path), check_same_thread=False, isolation_level=None
+            )
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS embedding_cache "
+                "(hash BLOB PRIMARY KEY, model TEXT NOT NULL, vector BLOB NOT NULL, used_at REAL NOT NULL)"
+            )
+            self._db.execute(
+                "CREATE INDEX IF NOT EXISTS ix_embedding_cache_used_at ON embedding_cache (used_at)"
+            )
+
+    def _key(self, text: str) -> bytes:
+        return hashlib.sha256(f"{self.model}\0{text}".encode()).digest()
+
+    def embed_query(self, text: str) -> List[float]:
+        key = self._key(text)
+        with self._lock:
+            embedding = self._lookup(key)
+            if embedding is not None:
+                self.hits += 1
+                return embedding
+            self.misses += 1
+
+        embedding = self.inner.embed_query(text)
+        with self._lock:
+            self._remember(key, embedding)
+            self._disk_put(key, embedding)
+        return embedding
+
+    async def aembed_query(self, text: str) -> List[float]:
+        # A memory hit is answered on the event loop; only the disk cache and the
+        # provider call are worth a worker thread
+        key = self._key(text)
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return cached.tolist()
+        return await asyncio.to_thread(self.embed_query, text)
+
+    def _lookup(self, key: bytes) -> Optional[List[float]]:
+        """Memory, then disk; caller holds the lock."""
+        cached = self._cache.get(key)
+        if cached is not None:
+            self._cache.move_to_end(key)
+            return cached.tolist()
+        embedding = self._disk_get(key)
+        if embedding is not None:
+            self._remember(key, embedding)
+        return embedding
+
+    def _remember(self, key: bytes, embedding: List[float]) -> None:
+        self._cache[key] = np.asarray(embedding, dtype=np.float16)
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.maxsize:
+            self._cache.popitem(last=False)
+
+    def _disk_get(self, key: bytes) -> Optional[List[float]]:
+        if self._db is None:
+            return None
+        row = self._db.execute(
+            "SELECT vector FROM embedding_cache WHERE hash = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        self._db.execute(
+            "UPDATE embedding_cache SET used_at = ? WHERE hash = ?", (time.time(), key)
+        )
+        return array("f", row[0]).tolist()
+
+    def _disk_put(self, key: bytes, embedding: List[float]) -> None:
+        if self._db is None:
+            return
+        # Vectors are stored as float32 blobs
+        self._db.execute(
+            "INSERT OR REPLACE INTO embedding_cache (hash, model, vector, used_at) VALUES (?, ?, ?, ?)",
+            (key, self.model, array("f", embedding).tobytes(), time.time()),
+        )
+        self._writes += 1
+        if self._writes % _PRUNE_EVERY == 0:
+            self._db.execute(
+                "DELETE FROM embedding_cache WHERE hash IN "
+                "(SELECT hash FROM embedding_cache ORDER BY used_at DESC LIMIT -1 OFFSET ?)",
+                (self.disk_maxsize,),
+            )
+
+    def _partition(
+        self, texts: List[str]
+    ) -> tuple[List[bytes], Dict[bytes, List[float]], Dict[bytes, str]]:
+        """Split texts into cached embeddings and the distinct texts still to embed."""
+        keys = [self._key(text) for text in texts]
+        found: Dict[bytes, List[float]] = {}
+        missing: Dict[bytes, str] = {}
+        with self._lock:
+            for key, text in zip(keys, texts):
+                if key in found or key in missing:
+                    continue
+                embedding = self._lookup(key)
+                if embedding is not None:
+                    found[key] = embedding
+                else:
+                    missing[key] = text
+            self.hits += len(texts) - len(missing)
+            self.misses += len(missing)
+        return keys, found, missing
+
+    def _merge(
+        self,
+        keys: List[bytes],
+        found: Dict[bytes, List[float]],
+        missing: Dict[bytes, str],
+        embedded: List[List[float]],
+    ) -> List[List[float]]:
+        with self._lock:
+            for key, embedding in zip(missing, embedded):
+                self._remember(key, embedding)
+                self._disk_put(key, embedding)
+                found[key] = embedding
+        return [found[key] for key in keys]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys, found, missing = self._partition(texts)
+        embedded = self.inner.embed_documents(list(missing.values())) if missing else []
+        return self._merge(keys, found, missing, embedded)
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys, found, missing = self._partition(texts)
+        # Use the provider's native async client rather than the base class's thread hop
+        embedded = (
+            await self.inner.aembed_documents(list(missing.values())) if missing else []
+        )
+        return self._merge(keys, found, missing, embedded)
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self._cache),
+                "maxsize": self.maxsize,
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cache.clear()
+            self.hits = 0
+            self.misses = 0
+
+
+def _disk_cache_path() -> Optional[Path]:
+    """Location of the persistent cache: EMBEDDING_CACHE_PATH, or data/cache/emb_cache.sqlite.
+
+    The default stays out of STORAGE_DIR, where every file is listed and served as an
+    upload. Setting EMBEDDING_CACHE_PATH to an empty string keeps the cache in memory only.
+    """
+    from llm_pkg.storage import PROJECT_ROOT
+
+    configured = os.getenv("EMBEDDING_CACHE_PATH")
+    if configured == "":
+        return None
+    path = (
+        Path(configured)
+        if configured
+        else PROJECT_ROOT / "data" / "cache" / "emb_cache.sqlite"
+    )
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        sqlite3.connect(str(path)).close()
+    except (OSError, sqlite3.Error) as e:
+        logger.warning(
+            "Embedding cache at %s unavailable, keeping it in memory only: %s", path, e
+        )
+        return None
+    return path
+
+
+_query_embedder: Optional[CachedEmbedder] = None
+_query_embedder_lock = threading.Lock()
+
+
+def get_query_embedder() -> CachedEmbedder:
+    """Return the shared cached OpenAI embedder, creating it on first use."""
+    global _query_embedder
+    if _query_embedder is None:
+        with _query_embedder_lock:
+            if _query_embedder is None:
+                from langchain_openai import OpenAIEmbeddings
+
+                _query_embedder = CachedEmbedder(
+                    OpenAIEmbeddings(), path=_disk_cache_path()
+                )
+    return _query_embedder
+
+
+def query_embedding_stats() -> dict[str, int]:
+    """Cache counters for the shared embedder (all zero until it is first used)."""
+    if _query_embedder is None:
+        return {"hits": 0, "misses": 0, "size": 0, "maxsize": EMBEDDING_CACHE_SIZE}
+    return _query_embedder.stats()
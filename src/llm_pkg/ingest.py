@@ -0,0 +1,258 @@
+"""
+Background document ingestion.
+Uploads are acknowledged as soon as the file is on disk; worker tasks drain a
+bounded queue, extract the text, split and embed it into the vector store and
+mark each document ready (or failed).
+
+The queue lives in process memory, so the database is the source of truth: a
+worker claims a document (claimed_at) before processing it, and at startup every
+upload still processing without a live claim is queued again. The claim is a
+single conditional UPDATE, so a document queued by several server processes is
+processed once.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+from datetime import timedelta
+from pathlib import Path
+
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+from sqlalchemy import delete, select, update
+
+from llm_pkg.database.models import Document as DBDocument
+from llm_pkg.database.models import UTC_NOW, SessionLocal
+from llm_pkg.document_processor import DocumentProcessor
+from llm_pkg.embedding_cache import get_query_embedder
+from llm_pkg.qa_engine import CHUNK_OVERLAP, CHUNK_SIZE
+from llm_pkg.response_cache import invalidate_conversation
+from llm_pkg.storage import PostgreSQLVectorStore
+
+logger = logging.getLogger(__name__)
+
+# Uploads wait for a free slot once this many documents are pending
+INGEST_QUEUE_SIZE = int(os.getenv("INGEST_QUEUE_SIZE", "100"))
+# Documents processed concurrently per server process
+INGEST_CONCURRENCY = int(os.getenv("INGEST_CONCURRENCY", "4"))
+# A claim older than this many seconds is taken to belong to a worker that died
+INGEST_CLAIM_TIMEOUT = float(os.getenv("INGEST_CLAIM_TIMEOUT", "1800"))
+
+ingest_queue: asyncio.Queue[tuple[int, Path, int]] = asyncio.Queue(
+    maxsize=INGEST_QUEUE_SIZE
+)
+
+
+async def enqueue_document(
+    document_id: int, file_path: Path, conversation_id: int
+) -> None:
+    """Queue a stored upload for processing; waits while the queue is full."""
+    await ingest_queue.put((document_id, file_path, conversation_id))
+
+
+def _update_document(document_id: int, **values) -> None:
+    with SessionLocal() as db:
+        db.query(DBDocument).filter(DBDocument.id == document_id).update(values)
+        db.commit()
+
+
+def unclaimed():
+    """SQL condition: no live worker holds the upload (never claimed, or the claim timed out)."""
+    return DBDocument.claimed_at.is_(None) | (
+        DBDocument.claimed_at < UTC_NOW - timedelta(seconds=INGEST_CLAIM_TIMEOUT)
+    )
+
+
+def _claim_document(document_id: int) -> bool:
+    """Take a processing upload for this worker; False if it is finished or held elsewhere."""
+    with SessionLocal() as db:
+        claimed = db.execute(
+            update(DBDocument)
+            .where(
+                DBDocument.id == document_id,
+                DBDocument.processing_state == "processing",
+                unclaimed(),
+            )
+            .values(claimed_at=UTC_NOW)
+            .returning(DBDocument.id)
+            .execution_options(synchronize_session=False)
+        ).first()
+        if claimed is not None:
+            # Chunks left by an interrupted earlier attempt would be indexed twice
+            db.execute(
+                delete(DBDocument).where(DBDocument.source_document_id == document_id)
+            )
+        db.commit()
+        return claimed is not None
+
+
+def _release_claim(document_id: int) -> None:
+    """Hand an interrupted upload back, so the next startup queues it again."""
+    with SessionLocal() as db:
+        db.execute(
+            delete(DBDocument).where(DBDocument.source_document_id == document_id)
+        )
+        db.query(DBDocument).filter(
+            DBDocument.id == document_id, DBDocument.processing_state == "processing"
+        ).update({"claimed_at": None})
+        db.commit()
+
+
+def _unclaimed_documents() -> list[tuple[int, Path, int]]:
+    with SessionLocal() as db:
+        rows = db.execute(
+            select(
+                DBDocument.id, DBDocument.file_path, DBDocument.conversation_id
+            ).where(
+                DBDocument.processing_state == "processing",
+                DBDocument.file_path.isnot(None),
+                unclaimed(),
+            )
+        ).all()
+    return [(row.id, Path(row.file_path), row.conversation_id) for row in rows]
+
+
+async def recover_documents() -> None:
+    """Queue uploads left processing by a restart or crash.
+
+    Documents still waiting in another process's queue may be queued here too;
+    whichever worker claims one first processes it and the other skips it.
+    """
+    try:
+        pending = await asyncio.to_thread(_unclaimed_documents)
+    except Exception as e:
+        logger.warning("Could not look for interrupted uploads: %s", e)
+        return
+    if pending:
+        logger.info("Re-queueing %d interrupted upload(s)", len(pending))
+    for document_id, file_path, conversation_id in pending:
+        await enqueue_document(document_id, file_path, conversation_id)
+
+
+def _mark_failed(document_id: int) -> None:
+    with SessionLocal() as db:
+        # Chunks indexed before the failure must not be searchable
+        db.execute(
+            delete(DBDocument).where(DBDocument.source_document_id == document_id)
+        )
+        db.query(DBDocument).filter(DBDocument.id == document_id).update(
+            {"processing_state": "failed"}
+        )
+        db.commit()
+
+
+def _document_owner(document_id: int) -> tuple[int, str]:
+    with SessionLocal() as db:
+        return db.execute(
+            select(DBDocument.user_id, DBDocument.filename).where(
+                DBDocument.id == document_id
+            )
+        ).one()
+
+
+async def index_document(document_id: int, conversation_id: int, text: str) -> int:
+    """Split a document's text and embed the chunks into the vector store; returns the chunk count.
+
+    Queries then search the stored chunks instead of loading, splitting and
+    embedding the document themselves.
+    """
+    user_id, filename = await asyncio.to_thread(_document_owner, document_id)
+    splitter = RecursiveCharacterTextSplitter(
+        chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP
+    )
+    chunks = splitter.split_documents(
+        [
+            Document(
+                page_content=text,
+                metadata={
+                    "source": filename,
+                    "id": document_id,
+                    "conversation_id": conversation_id,
+                },
+            )
+        ]
+    )
+    if chunks:
+        vector_store = PostgreSQLVectorStore(
+            get_query_embedder(), user_id=user_id, conversation_id=conversation_id
+        )
+        await vector_store.aadd_texts(
+            [chunk.page_content for chunk in chunks],
+            [chunk.metadata for chunk in chunks],
+        )
+    return len(chunks)
+
+
+async def ingest_document(
+    processor: DocumentProcessor,
+    document_id: int,
+    file_path: Path,
+    conversation_id: int,
+) -> None:
+    """Extract a document's text and store it, recording the outcome in processing_state."""
+    if not await asyncio.to_thread(_claim_document, document_id):
+        logger.info("Document %s is finished or claimed by another worker", document_id)
+        return
+    try:
+        # Only the joined text is stored, so per-page copies are not kept
+        processed_data = await processor.process_document(file_path, page_text=False)
+
+        # Prefer processed 'full_text' (text/md/pdf), then 'text'. Text files are always
+        # extracted, so an empty result means a binary file without a text layer: store
+        # NULL rather than the raw bytes decoded as UTF-8.
+        stored_text = (
+            processed_data.get("full_text") or processed_data.get("text") or None
+        )
+
+        if stored_text:
+            # Index before the document is marked ready, so no query indexes it concurrently.
+            # Without embeddings the first query to see the document indexes it instead.
+            try:
+                await index_document(document_id, conversation_id, stored_text)
+            except Exception as e:
+                logger.warning(
+                    "Could not index document %s, it will be indexed on first query: %s",
+                    document_id,
+                    e,
+                )
+
+        await asyncio.to_thread(
+            _update_document, document_id, content=stored_text, processing_state="ready"
+        )
+        # Answers cached while the document was processing did not see it
+        invalidate_conversation(conversation_id)
+        logger.info("Document %s processed: %s", document_id, file_path.name)
+    except asyncio.CancelledError:
+        # Shutdown: release the document rather than leave it claimed, so the next
+        # startup processes it again. Run inline; this task is being cancelled.
+        try:
+            _release_claim(document_id)
+        except Exception:
+            logger.exception("Could not release document %s", document_id)
+        raise
+    except Exception:
+        logger.exception("Failed to process document %s", document_id)
+        await asyncio.to_thread(_mark_failed, document_id)
+
+
+async def ingest_worker(processor: DocumentProcessor) -> None:
+    """Process queued documents until cancelled."""
+    while True:
+        document_id, file_path, conversation_id = await ingest_queue.get()
+        try:
+            await ingest_document(processor, document_id, file_path, conversation_id)
+        except Exception:
+            # Keep the worker alive even if recording the failure itself failed
+            logger.exception("Ingest worker error for document %s", document_id)
+        finally:
+            ingest_queue.task_done()
+
+
+def start_ingest_workers(processor: DocumentProcessor) -> list[asyncio.Task]:
+    """Spawn INGEST_CONCURRENCY worker tasks on the running loop."""
+    return [
+        asyncio.create_task(ingest_worker(processor), name=f"ingest-worker-{i}")
+        for i in range(INGEST_CONCURRENCY)
+    ]
@@ -6,30 +6,160 @@ Implements question-answering using LangChain and LangGraph with RAG and memory.
 
 from __future__ import annotations
 
+import asyncio
+import functools
+import hashlib
 import logging
-from typing import Any, Optional
+import os
+import re
+from collections import OrderedDict, deque
+from contextlib import aclosing
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Callable, Optional, TypedDict
 import uuid
 
+import numpy as np
 from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
 from langchain_core.messages import HumanMessage
-from langchain_openai import OpenAIEmbeddings
+from langchain_core.runnables import RunnableConfig
 from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langgraph.graph import END, StateGraph
+from langgraph.graph import END, START, StateGraph
 from langgraph.graph.state import CompiledStateGraph
-from langgraph.checkpoint.memory import MemorySaver
 
-from llm_pkg.config import LangGraphManager, LLMLoader
-from llm_pkg.document_processor import DocumentProcessor
+from llm_pkg.config import LangGraphManager, LLMLoader, doc_processor
+from llm_pkg.embedding_cache import get_query_embedder
+from llm_pkg.response_cache import retrieval_cache
 from llm_pkg.storage import PostgreSQLVectorStore
 
 logger = logging.getLogger("llm_pkg.qa_engine")
 
+# Prompt templates, filled with str.format_map; values are inserted verbatim, so braces
+# in questions or document text need no escaping
+_AGENT_PROMPT = """You are a helpful AI assistant. Answer the user's question directly using your general knowledge and the conversation history if available.
+
+DO NOT ask the user to upload or paste any documents or files. If the user references a specific file that is not available, say that you don't have access to the file and answer from your general knowledge instead.
+
+Question: {question}
+
+Answer:"""
+
+_RAG_PROMPT = """You are an AI assistant helping the user with their question based on the uploaded documents.
+
+I have provided context from {num_docs} document(s): {doc_list}
+
+Please analyze ALL the provided context carefully and answer the question. Synthesize information from multiple documents if relevant. If the information is spread across different documents, combine them in your answer.
+
+Context from uploaded documents:
+{context}
+
+Question: {question}
+
+Instructions:
+- Use the context above to answer the question thoroughly
+- If information is found in the documents, cite which document(s) you're referencing
+- If the context doesn't fully answer the question, use your general knowledge to supplement
+- DO NOT ask the user to upload additional documents
+- Provide a clear, comprehensive answer
+
+Answer:"""
+
+_FALLBACK_PROMPT = (
+    "You are a helpful AI assistant. The user asked: {question}\n\n"
+    "Answer directly using your general knowledge. Do NOT ask the user to upload or paste any documents or files. "
+    "If you don't know, give the best possible general answer."
+)
+
+# Messages made only of greetings, thanks and acknowledgements. The whole message must
+# match, so "hi, what does the report say about X" still retrieves.
+_SMALL_TALK_RE = re.compile(
+    r"\s*(?:(?:hi|hello|hey|thanks|thank you|thx|ok|okay|bye|goodbye|good (?:morning|afternoon|evening)"
+    r"|great|cool|nice)\b[\s,.!?]*)+",
+    re.IGNORECASE,
+)
+
+# Phrases showing the model asked the user for document contents instead of answering,
+# matched in one pass over the answer
+_ASK_FOR_UPLOAD_SIGNALS = (
+    "please provide",
+    "please paste",
+    "i need the text",
+    "provide the content",
+    "upload the",
+    "send the",
+    "paste the",
+    "can't access files",
+    "i don't have access to",
+)
+_ASK_FOR_UPLOAD_RE = re.compile("|".join(map(re.escape, _ASK_FOR_UPLOAD_SIGNALS)), re.IGNORECASE)
+
+
+def cosine_top_k(vectors: Any, query: Any, k: int) -> list[int]:
+    """Indices of the k rows of ``vectors`` most cosine-similar to ``query``, best first."""
+    # One matrix-vector product over L2-normalized float32 rows; argpartition avoids a full sort
+    matrix = np.asarray(vectors, dtype=np.float32)
+    matrix = matrix / np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-12)
+    scores = matrix @ np.asarray(query, dtype=np.float32)
+    if k >= len(scores):
+        return np.argsort(scores)[::-1].tolist()
+    top = np.argpartition(scores, -k)[-k:]
+    return top[np.argsort(scores[top])[::-1]].tolist()
+
+# Characters per chunk, and characters shared by neighbouring chunks
+CHUNK_SIZE = 1000
+CHUNK_OVERLAP = 200
+# Documents whose chunks each QA engine keeps for re-use
+CHUNK_CACHE_DOCUMENTS = 256
+# Tokens of retrieved chunks placed in the prompt, and chunk token counts each engine remembers
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "3000"))
+TOKEN_COUNT_CACHE_SIZE = 4096
+# Earlier messages quoted in the prompt (3 exchanges), within a token budget
+HISTORY_MESSAGES = 6
+HISTORY_TOKEN_BUDGET = 2048
+# Conversation threads whose history each QA engine keeps
+HISTORY_THREADS = 256
+
+
+class RollingHistory:
+    """The last few messages of a thread, pre-formatted and trimmed from the left.
+
+    Each message is formatted and token-counted once, when it is added, instead of
+    the whole history being rebuilt for every prompt.
+    """
+
+    def __init__(self, count_tokens: Callable[[str], int], max_messages: int = HISTORY_MESSAGES,
+                 token_budget: int = HISTORY_TOKEN_BUDGET) -> None:
+        self._count_tokens = count_tokens
+        self._lines: deque[tuple[str, int]] = deque(maxlen=max_messages)
+        self._tokens = 0
+        self._text: Optional[str] = None
+        self.token_budget = token_budget
+
+    def append(self, role: str, content: str) -> None:
+        line = f"{role}: {content}"
+        if len(self._lines) == self._lines.maxlen:
+            self._tokens -= self._lines[0][1]
+        tokens = self._count_tokens(line)
+        self._lines.append((line, tokens))
+        self._tokens += tokens
+        # Always keep the newest message, even if it alone exceeds the budget
+        while self._tokens > self.token_budget and len(self._lines) > 1:
+            self._tokens -= self._lines.popleft()[1]
+        self._text = None
+
+    def text(self) -> str:
+        if self._text is None:
+            self._text = "\n".join(line for line, _ in self._lines)
+        return self._text
+
+    def __len__(self) -> int:
+        return len(self._lines)
+
 
 class QAState(dict):
     """State for LangGraph QA workflow."""
 
     question: str
-    chat_history: list
     documents: list[Document]
     context: str
     answer: str
@@ -38,6 +168,136 @@ class QAState(dict):
     thread_id: str
 
 
+def _prompt_cache_kwargs(llm: Any, cache_key: Optional[str]) -> dict[str, Any]:
+    """Provider-specific invoke kwargs that route a thread's turns to the same prompt cache.
+
+    Platform OpenAI takes a ``prompt_cache_key``; self-hosted OpenAI-compatible servers
+    (vLLM) take a ``cache_salt`` so the thread's prefix blocks are reused but not shared
+    with other threads. OpenRouter and non-OpenAI clients get no extra arguments.
+    """
+    if not cache_key or type(llm).__name__ != "ChatOpenAI":
+        return {}
+    base_url = llm.openai_api_base or ""
+    if not base_url or "api.openai.com" in base_url:
+        return {"prompt_cache_key": cache_key}
+    if "openrouter.ai" in base_url:
+        return {}
+    return {"extra_body": {"cache_salt": cache_key}}
+
+
+def _cacheable_prompt(llm: Any, prefix: str, prompt: str) -> Any:
+    """Join the stable prefix and the per-turn prompt, marking the prefix for Anthropic caching."""
+    if prefix and type(llm).__name__ == "ChatAnthropic":
+        return [HumanMessage(content=[
+            {"type": "text", "text": prefix, "cache_control": {"type": "ephemeral"}},
+            {"type": "text", "text": prompt},
+        ])]
+    return prefix + prompt
+
+
+# Queue of ("token" | "reset", text) events for the answer being generated, set by
+# QAEngine.query_stream for the duration of one query
+_token_sink: ContextVar[Optional[asyncio.Queue]] = ContextVar("qa_token_sink", default=None)
+# Characters generated between checks of a streaming answer for an upload request
+_UPLOAD_CHECK_INTERVAL = 64
+_UPLOAD_SIGNAL_MAX_LEN = max(map(len, _ASK_FOR_UPLOAD_SIGNALS))
+
+
+async def _stream_answer(llm: Any, prompt: Any, stop_on_upload_request: bool = False,
+                         **kwargs: Any) -> tuple[str, bool]:
+    """Stream a completion, forwarding tokens to the active token sink.
+
+    Returns the text and whether it asked the user for an upload. With
+    ``stop_on_upload_request`` the stream is abandoned as soon as it does, so the
+    rest of an answer that will be replaced is never generated.
+    """
+    sink = _token_sink.get()
+    parts: list[str] = []
+    # Text not yet scanned for upload requests, plus enough already-scanned overlap
+    # to catch a phrase split across chunks
+    window = ""
+    async with aclosing(llm.astream(prompt, **kwargs)) as stream:
+        async for chunk in stream:
+            text = chunk if isinstance(chunk, str) else chunk.text
+            if not text:
+                continue
+            parts.append(text)
+            if sink is not None:
+                sink.put_nowait(("token", text))
+            window += text
+            if len(window) >= _UPLOAD_SIGNAL_MAX_LEN + _UPLOAD_CHECK_INTERVAL:
+                if stop_on_upload_request and _ASK_FOR_UPLOAD_RE.search(window):
+                    return "".join(parts), True
+                window = window[-_UPLOAD_SIGNAL_MAX_LEN:]
+    # Without early stopping the scanned text is only rescanned here, together with the rest
+    answer = "".join(parts)
+    return answer, bool(_ASK_FOR_UPLOAD_RE.search(window if stop_on_upload_request else answer))
+
+
+class Source(TypedDict):
+    """A retrieved chunk as reported in a query result."""
+
+    source: Optional[str]
+    filename: Optional[str]
+    id: Optional[int]
+    page: Optional[int]
+    content: str
+    similarity: Optional[float]
+
+
+def _source(doc: Document) -> Source:
+    metadata = doc.metadata
+    name = metadata.get("source")
+    return {
+        "source": name,
+        "filename": name,
+        "id": metadata.get("id"),
+        "page": metadata.get("page"),
+        "content": doc.page_content[:200] + "...",
+        "similarity": metadata.get("similarity"),
+    }
+
+
+# Configurable key under which the shared graph's nodes find the engine running them
+_ENGINE_CONFIG_KEY = "qa_engine"
+
+
+async def _retrieve(state: dict, config: RunnableConfig) -> dict:
+    return await config["configurable"][_ENGINE_CONFIG_KEY]._retrieve_node(state)
+
+
+async def _generate(state: dict, config: RunnableConfig) -> dict:
+    return await config["configurable"][_ENGINE_CONFIG_KEY]._generate_node(state)
+
+
+async def _warmup(state: dict, config: RunnableConfig) -> None:
+    await config["configurable"][_ENGINE_CONFIG_KEY]._warmup_node(state)
+
+
+@functools.cache
+def _compiled_qa_graph() -> CompiledStateGraph:
+    """Build and compile the QA workflow once; engines bind copies of it to themselves.
+
+    Compiling takes most of the time of creating an engine, and one is created for
+    every new conversation.
+    """
+    workflow = StateGraph(dict)
+
+    # Define nodes
+    workflow.add_node("retrieve", _retrieve)
+    workflow.add_node("warmup", _warmup)
+    workflow.add_node("generate", _generate)
+
+    # Define edges: the model is prepared while retrieval runs, and generation
+    # waits for both
+    workflow.add_edge(START, "retrieve")
+    workflow.add_edge(START, "warmup")
+    workflow.add_edge(["retrieve", "warmup"], "generate")
+    workflow.add_edge("generate", END)
+
+    return workflow.compile()
+
+
 class QAEngine:
     """
     Question-Answering engine using LangChain and LangGraph.
@@ -50,21 +310,28 @@ class QAEngine:
         graph_manager: LangGraphManager,
         user_id: Optional[int] = None,
         conversation_id: Optional[int] = None,
+        embeddings: Optional[Embeddings] = None,
+        use_memory: bool = True,
     ):
         self.llm_loader = llm_loader
         self.graph_manager = graph_manager
-        self.doc_processor = DocumentProcessor()
+        self.doc_processor = doc_processor
         self.text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=1000,
-            chunk_overlap=200,
+            chunk_size=CHUNK_SIZE,
+            chunk_overlap=CHUNK_OVERLAP,
         )
         self.user_id = user_id
         self.conversation_id = conversation_id
+        self.embeddings = embeddings
         self.vector_store = None
-        
-        # Memory saver for LangGraph
-        self.memory = MemorySaver()
-        self.qa_graph = self._build_qa_graph()
+        # Storage-directory files (no database row) already embedded by this engine
+        self._indexed_files: set[str] = set()
+        # Chunks per (document, content digest), so unchanged documents aren't re-split
+        self._chunk_cache: OrderedDict[tuple[Any, bytes], list[Document]] = OrderedDict()
+        # Conversation memory is the per-thread RollingHistory below, so the shared
+        # graph runs without a checkpointer that would keep every turn's state
+        self.use_memory = use_memory
+        self.qa_graph = _compiled_qa_graph()
 
         # Optional: token encoding library to validate token counts
         try:
@@ -72,30 +339,77 @@ class QAEngine:
             self._tiktoken = tiktoken
         except Exception:
             self._tiktoken = None
-
-    def _build_qa_graph(self) -> CompiledStateGraph:
-        """Build LangGraph workflow for QA with memory."""
-        workflow = StateGraph(dict)
-
-        # Define nodes
-        workflow.add_node("retrieve", self._retrieve_node)
-        workflow.add_node("generate", self._generate_node)
-
-        # Define edges
-        workflow.set_entry_point("retrieve")
-        workflow.add_edge("retrieve", "generate")
-        workflow.add_edge("generate", END)
-
-        # Compile with memory checkpointer
-        return workflow.compile(checkpointer=self.memory)
+        self._encoding = None
+        # Token counts of recently packed chunks, by content digest
+        self._token_counts: OrderedDict[bytes, int] = OrderedDict()
+        # Recent messages per thread, quoted at the start of each prompt
+        self._histories: OrderedDict[str, RollingHistory] = OrderedDict()
+
+    def _count_tokens(self, text: str) -> int:
+        """Token count with tiktoken when available, otherwise roughly four characters per token."""
+        if self._encoding is None and self._tiktoken is not None:
+            try:
+                self._encoding = self._tiktoken.encoding_for_model("gpt-4o")
+            except Exception:
+                # The encoding could not be loaded (e.g. offline); stop trying
+                self._tiktoken = None
+        if self._encoding is not None:
+            return len(self._encoding.encode(text, disallowed_special=()))
+        return len(text) // 4 + 1
+
+    def remember_turn(self, thread_id: Optional[str], question: str, answer: str) -> None:
+        """Append a finished exchange to the thread's history, including answers served from cache."""
+        if not thread_id or not self.use_memory:
+            return
+        history = self._histories.pop(thread_id, None) or RollingHistory(self._count_tokens)
+        history.append("User", question)
+        history.append("Assistant", answer)
+        self._histories[thread_id] = history
+        while len(self._histories) > HISTORY_THREADS:
+            self._histories.popitem(last=False)
+
+    async def _warmup_node(self, state: dict) -> None:
+        """Build (or fetch the cached) chat model off the event loop while documents are retrieved."""
+        try:
+            await asyncio.to_thread(self.llm_loader.get_model, state.get("provider"))
+        except Exception as e:
+            # Generation builds it again and reports the error
+            logger.debug(f"Model warmup failed: {e}")
 
     async def _retrieve_node(self, state: dict) -> dict:
         """Retrieve relevant documents."""
         question = state["question"]
         document_name = state.get("document_name")
 
+        # Greetings and acknowledgements need no documents
+        if _SMALL_TALK_RE.fullmatch(question):
+            logger.info("Small talk, skipping retrieval")
+            state["documents"] = []
+            state["context"] = ""
+            state["context_tokens"] = 0
+            state["use_agent_mode"] = True
+            return state
+
         logger.info(f"Retrieving documents for: {question[:50]}...")
 
+        # A near-duplicate of a recent question in this conversation retrieves the
+        # same chunks, so reuse them and skip loading, splitting and searching
+        question_embedding = None
+        if self.conversation_id is not None:
+            try:
+                question_embedding = await (self.embeddings or get_query_embedder()).aembed_query(question)
+            except Exception as e:
+                logger.warning(f"Could not embed question for the retrieval cache: {e}")
+        if question_embedding is not None:
+            cached = retrieval_cache.lookup(self.conversation_id, document_name, question_embedding)
+            if cached is not None:
+                logger.info("Retrieval cache hit")
+                state["documents"] = cached["documents"]
+                state["context"] = cached["context"]
+                state["context_tokens"] = cached["context_tokens"]
+                state["use_agent_mode"] = False
+                return state
+
         # Load and process documents (user and conversation specific)
         documents = await self._load_documents(document_name)
 
@@ -104,36 +418,51 @@ class QAEngine:
             logger.info("No documents found, using AI agent mode")
             state["documents"] = []
             state["context"] = ""
+            state["context_tokens"] = 0
             state["use_agent_mode"] = True
             return state
 
-        # Split documents
-        chunks = self.text_splitter.split_documents(documents)
-        logger.info(f"Created {len(chunks)} chunks from documents")
+        # Only documents without chunks in the vector store yet are split and embedded;
+        # earlier queries already indexed the rest
+        pending = [doc for doc in documents
+                   if not doc.metadata.get("indexed") and doc.metadata.get("source") not in self._indexed_files]
+        chunks = self._split_documents(pending)
+        logger.info(f"Created {len(chunks)} chunks from {len(pending)} newly indexed document(s)")
 
         try:
-            # Create or update vector store with OpenAI embeddings
-            embeddings = OpenAIEmbeddings()
-            self.vector_store = PostgreSQLVectorStore(
-                embeddings,
-                user_id=self.user_id,
-                conversation_id=self.conversation_id
-            )
-
-            # Add documents to vector store
-            texts = [chunk.page_content for chunk in chunks]
-            metadatas = [chunk.metadata for chunk in chunks]
-            self.vector_store.add_texts(texts, metadatas)
+            # Created on first use and kept for the engine's lifetime, with the shared,
+            # query-cached OpenAI embeddings (one client and connection pool per process)
+            if self.vector_store is None:
+                self.vector_store = PostgreSQLVectorStore(
+                    self.embeddings or get_query_embedder(),
+                    user_id=self.user_id,
+                    conversation_id=self.conversation_id
+                )
+
+            # Add new documents to vector store
+            if chunks:
+                texts = [chunk.page_content for chunk in chunks]
+                metadatas = [chunk.metadata for chunk in chunks]
+                await self.vector_store.aadd_texts(texts, metadatas)
+                # Files read from the storage directory have no row to link chunks to
+                self._indexed_files.update(doc.metadata.get("source") for doc in pending if "id" not in doc.metadata)
 
             # Retrieve relevant chunks - use k=10 to get chunks from multiple documents
             # This ensures we use all uploaded documents, not just one
-            k_value = min(10, len(chunks))  # Don't request more chunks than we have
-            relevant_docs = self.vector_store.similarity_search(question, k=k_value)
+            # Hybrid vector + keyword search, reusing the embedding from the retrieval cache lookup
+            relevant_docs = await self.vector_store.ahybrid_search(question, k=10, embedding=question_embedding)
+            searched = True
         except Exception as e:
-            logger.warning(f"Vector store failed, using all document chunks: {e}")
-            # Fallback: use first few chunks directly
-            k_value = min(10, len(chunks))
-            relevant_docs = chunks[:k_value]
+            logger.warning(f"Vector store failed, ranking document chunks in memory: {e}")
+            if any(doc.metadata.get("indexed") for doc in documents):
+                try:
+                    documents = await self._load_documents(document_name, indexed_content=True)
+                except Exception as load_error:
+                    logger.warning(f"Could not load indexed documents' text: {load_error}")
+            relevant_docs = await self._rank_chunks(question, question_embedding, self._split_documents(documents), k=10)
+            searched = False
+
+        relevant_docs, context_tokens = self._pack_context(relevant_docs)
 
         # Log which documents we're using
         doc_sources = set([doc.metadata.get("source", "unknown") for doc in relevant_docs])
@@ -141,159 +470,213 @@ class QAEngine:
 
         # Create context
         context = "\n\n".join([doc.page_content for doc in relevant_docs])
+        if searched and question_embedding is not None:
+            retrieval_cache.store(self.conversation_id, document_name, question_embedding,
+                                  {"documents": relevant_docs, "context": context, "context_tokens": context_tokens})
 
         state["documents"] = relevant_docs
         state["context"] = context
+        state["context_tokens"] = context_tokens
         state["use_agent_mode"] = False
 
         return state
 
+    def _pack_context(self, chunks: list[Document]) -> tuple[list[Document], int]:
+        """Keep chunks, best first, while they fit in CONTEXT_TOKEN_BUDGET; returns them and their token count.
+
+        A chunk that does not fit is skipped, so a smaller, lower-ranked one can still be used.
+        """
+        packed = []
+        total = 0
+        for chunk in chunks:
+            tokens = self._chunk_tokens(chunk.page_content)
+            if total + tokens <= CONTEXT_TOKEN_BUDGET:
+                packed.append(chunk)
+                total += tokens
+        if len(packed) < len(chunks):
+            logger.info(f"Context token budget {CONTEXT_TOKEN_BUDGET} kept {len(packed)} of {len(chunks)} chunks")
+        return packed, total
+
+    def _chunk_tokens(self, text: str) -> int:
+        """Token count of a chunk, remembered by content since the same chunks are retrieved repeatedly."""
+        key = hashlib.blake2b(text.encode(), digest_size=16).digest()
+        tokens = self._token_counts.get(key)
+        if tokens is None:
+            tokens = self._count_tokens(text)
+            self._token_counts[key] = tokens
+            while len(self._token_counts) > TOKEN_COUNT_CACHE_SIZE:
+                self._token_counts.popitem(last=False)
+        else:
+            self._token_counts.move_to_end(key)
+        return tokens
+
+    async def _rank_chunks(self, question: str, question_embedding: Optional[list[float]],
+                           chunks: list[Document], k: int) -> list[Document]:
+        """Top-k chunks by cosine similarity to the question, or the first k if embedding fails."""
+        if len(chunks) <= k:
+            return chunks
+        try:
+            embeddings = self.embeddings or get_query_embedder()
+            if question_embedding is None:
+                question_embedding = await embeddings.aembed_query(question)
+            # Chunk embeddings come from the embedding cache when indexing got that far
+            vectors = await embeddings.aembed_documents([chunk.page_content for chunk in chunks])
+        except Exception as e:
+            logger.warning(f"Could not embed chunks, using the first {k}: {e}")
+            return chunks[:k]
+
+        return [chunks[i] for i in cosine_top_k(vectors, question_embedding, k)]
+
+    def _split_documents(self, documents: list[Document]) -> list[Document]:
+        """Split documents into chunks, reusing the chunks of documents split before."""
+        chunks = []
+        for doc in documents:
+            key = (doc.metadata.get("id", doc.metadata.get("source")),
+                   hashlib.blake2b(doc.page_content.encode(), digest_size=16).digest())
+            doc_chunks = self._chunk_cache.get(key)
+            if doc_chunks is None:
+                doc_chunks = self.text_splitter.split_documents([doc])
+                self._chunk_cache[key] = doc_chunks
+                while len(self._chunk_cache) > CHUNK_CACHE_DOCUMENTS:
+                    self._chunk_cache.popitem(last=False)
+            else:
+                self._chunk_cache.move_to_end(key)
+            chunks.extend(doc_chunks)
+        return chunks
+
     async def _generate_node(self, state: dict) -> dict:
         """Generate answer using LLM with conversation history."""
         question = state["question"]
         context = state["context"]
         provider = state.get("provider")
-        chat_history = state.get("chat_history", [])
         use_agent_mode = state.get("use_agent_mode", False)
 
         logger.info(f"Generating answer using provider: {provider or 'default'}")
 
         # Build LLM
-        llm = self.llm_loader.build_model(provider)
+        llm = self.llm_loader.get_model(provider)
 
         # Create prompt based on mode
         if use_agent_mode:
             # AI Agent mode - no context, just conversation
-            prompt = f"""You are a helpful AI assistant. Answer the user's question directly using your general knowledge and the conversation history if available.
-
-DO NOT ask the user to upload or paste any documents or files. If the user references a specific file that is not available, say that you don't have access to the file and answer from your general knowledge instead.
-
-Question: {question}
-
-Answer:"""
+            prompt = _AGENT_PROMPT.format_map({"question": question})
         else:
-            # RAG mode - use context from documents (possibly multiple documents)
-            docs_in_context = state.get("documents", [])
-            doc_sources = set([doc.metadata.get("source", "unknown") for doc in docs_in_context])
-            
-            prompt = f"""You are an AI assistant helping the user with their question based on the uploaded documents.
-
-I have provided context from {len(doc_sources)} document(s): {', '.join(doc_sources)}
-
-Please analyze ALL the provided context carefully and answer the question. Synthesize information from multiple documents if relevant. If the information is spread across different documents, combine them in your answer.
-
-Context from uploaded documents:
-{context}
-
-Question: {question}
-
-Instructions:
-- Use the context above to answer the question thoroughly
-- If information is found in the documents, cite which document(s) you're referencing
-- If the context doesn't fully answer the question, use your general knowledge to supplement
-- DO NOT ask the user to upload additional documents
-- Provide a clear, comprehensive answer
-
-Answer:"""
-
-        # Add chat history for context if available
-        if chat_history:
-            history_text = "\n".join([
-                f"{'User' if isinstance(msg, HumanMessage) else 'Assistant'}: {msg.content}"
-                for msg in chat_history[-6:]  # Last 3 exchanges
-            ])
-            prompt = f"Previous conversation:\n{history_text}\n\n{prompt}"
-
-        # Generate answer
-        response = llm.invoke(prompt)
-        answer = response.content if hasattr(response, "content") else str(response)
+            # RAG mode - use context from documents (possibly multiple documents).
+            # Sources are listed in rank order, so the same retrieval gives the same prompt.
+            doc_sources = dict.fromkeys(doc.metadata.get("source", "unknown") for doc in state.get("documents", []))
+            prompt = _RAG_PROMPT.format_map({
+                "num_docs": len(doc_sources),
+                "doc_list": ", ".join(doc_sources),
+                "context": context,
+                "question": question,
+            })
+
+        # Add chat history for context if available. The history block leads the prompt
+        # so that, as long as it stays byte-identical across turns, providers with
+        # prompt caching can reuse it instead of re-reading it on every turn.
+        history = self._histories.get(state.get("thread_id"))
+        history_prefix = f"Previous conversation:\n{history.text()}\n\n" if history else ""
+
+        # Generate answer, stopping early if the model starts asking for an upload
+        answer, asked_for_upload = await _stream_answer(
+            llm,
+            _cacheable_prompt(llm, history_prefix, prompt),
+            stop_on_upload_request=True,
+            **_prompt_cache_kwargs(llm, state.get("thread_id")),
+        )
 
         # If the model responds by asking the user to provide document contents (common when the user explicitly asks for the contents of a specific file),
         # then automatically fallback to a strict general-knowledge response so the UI receives a useful answer instead of a request for upload.
-        answer_lower = answer.lower() if isinstance(answer, str) else ""
-        ask_for_upload_signals = [
-            "please provide",
-            "please paste",
-            "i need the text",
-            "provide the content",
-            "upload the",
-            "send the",
-            "paste the",
-            "can't access files",
-            "i don't have access to",
-        ]
-        if any(sig in answer_lower for sig in ask_for_upload_signals):
+        if asked_for_upload:
             logger.info("LLM asked for document content; running strict general-knowledge fallback")
-            fallback_prompt = f"You are a helpful AI assistant. The user asked: {question}\n\nAnswer directly using your general knowledge. Do NOT ask the user to upload or paste any documents or files. If you don't know, give the best possible general answer."
+            fallback_prompt = _FALLBACK_PROMPT.format_map({"question": question})
+            sink = _token_sink.get()
+            if sink is not None:
+                # Streamed tokens so far belong to the discarded answer
+                sink.put_nowait(("reset", ""))
             try:
-                fallback_resp = llm.invoke(fallback_prompt)
-                fallback_answer = fallback_resp.content if hasattr(fallback_resp, "content") else str(fallback_resp)
+                fallback_answer, _ = await _stream_answer(llm, fallback_prompt)
                 # If fallback produced something different, use it
                 if fallback_answer and fallback_answer.strip():
                     answer = fallback_answer
             except Exception as e:
                 logger.warning(f"Fallback general-knowledge LLM call failed: {e}")
 
+        self.remember_turn(state.get("thread_id"), question, answer)
+
         state["answer"] = answer
         state["metadata"] = {
             "num_sources": len(state.get("documents", [])),
             "context_length": len(context),
+            "context_tokens": state.get("context_tokens", 0),
             "mode": "agent" if use_agent_mode else "rag",
         }
 
         return state
 
-    async def _load_documents(self, document_name: str | None = None) -> list[Document]:
-        """Load and process documents (user and conversation specific)."""
-        from llm_pkg.database.models import get_db, Document as DBDocument
+    async def _load_documents(self, document_name: str | None = None,
+                              indexed_content: bool = False) -> list[Document]:
+        """Load and process documents (user and conversation specific).
+
+        The text of documents already chunked into the vector store is only fetched
+        with ``indexed_content``; otherwise their page_content is empty.
+        """
+        from sqlalchemy import case, exists, select
+        from sqlalchemy.orm import aliased
+
+        from llm_pkg.database.models import AsyncSessionLocal, Document as DBDocument
         from llm_pkg.storage import list_documents, read_document, STORAGE_DIR
 
         documents = []
-        db = next(get_db())
-        
-        try:
-            # Query documents for this user and conversation
-            query = db.query(DBDocument).filter(DBDocument.user_id == self.user_id)
+        async with AsyncSessionLocal() as db:
+            # Uploaded documents only (chunk rows carry an embedding), flagging those
+            # that already have chunks in the vector store
+            chunk = aliased(DBDocument)
+            indexed = exists().where(chunk.source_document_id == DBDocument.id)
+            content = DBDocument.content if indexed_content else case((indexed, None), else_=DBDocument.content)
+            # Uploads still being ingested, or without extractable text, have no content
+            query = select(DBDocument.id, DBDocument.filename, DBDocument.conversation_id, content.label("content"),
+                           indexed.label("indexed")).where(DBDocument.user_id == self.user_id,
+                                                           DBDocument.processing_state == "ready",
+                                                           DBDocument.content.isnot(None),
+                                                           DBDocument.embedding.is_(None))
             
             if self.conversation_id:
                 # Get ONLY conversation-specific documents (strict isolation)
-                query = query.filter(DBDocument.conversation_id == self.conversation_id)
+                query = query.where(DBDocument.conversation_id == self.conversation_id)
             else:
                 # If no conversation_id, get only documents without a conversation
-                query = query.filter(DBDocument.conversation_id == None)
+                query = query.where(DBDocument.conversation_id.is_(None))
             
             if document_name:
-                query = query.filter(DBDocument.filename == document_name)
-            
-            db_docs = query.all()
+                query = query.where(DBDocument.filename == document_name)
             
-            for db_doc in db_docs:
+            for row in await db.execute(query):
                 doc = Document(
-                    page_content=db_doc.content,
+                    page_content=row.content or "",
                     metadata={
-                        "source": db_doc.filename,
-                        "id": db_doc.id,
-                        "conversation_id": db_doc.conversation_id,
+                        "source": row.filename,
+                        "id": row.id,
+                        "conversation_id": row.conversation_id,
+                        "indexed": row.indexed,
                     }
                 )
                 documents.append(doc)
-                
-        finally:
-            db.close()
 
         # If no documents were found in DB, try to load files directly from the storage directory
         if not documents:
             try:
                 if STORAGE_DIR.exists():
-                    for path in list_documents():
-                        # Optionally filter by document_name
-                        if document_name and path.name != document_name:
-                            continue
-                        try:
-                            doc = read_document(path)
-                            documents.append(doc)
-                        except Exception as e:
-                            logger.warning(f"Failed to read document from storage: {path}: {e}")
+                    # Optionally filter by document_name
+                    paths = [path for path in list_documents() if not document_name or path.name == document_name]
+                    # Read the files concurrently in worker threads
+                    results = await asyncio.gather(*(asyncio.to_thread(read_document, path) for path in paths),
+                                                   return_exceptions=True)
+                    for path, result in zip(paths, results):
+                        if isinstance(result, Exception):
+                            logger.warning(f"Failed to read document from storage: {path}: {result}")
+                        else:
+                            documents.append(result)
             except Exception as e:
                 logger.warning(f"Error listing storage documents: {e}")
 
@@ -333,32 +716,50 @@ Answer:"""
             "context": "",
             "answer": "",
             "metadata": {},
-            "chat_history": [],
         }
 
         # Execute LangGraph workflow with thread
-        config = {"configurable": {"thread_id": thread_id}}
+        config = {"configurable": {"thread_id": thread_id, _ENGINE_CONFIG_KEY: self}}
         result = await self.qa_graph.ainvoke(initial_state, config)
 
         # Format response
         return {
             "answer": result["answer"],
-            "sources": [
-                {
-                    "source": doc.metadata.get("source"),
-                    "filename": doc.metadata.get("source"),
-                    "id": doc.metadata.get("id"),
-                    "page": doc.metadata.get("page"),
-                    "content": doc.page_content[:200] + "...",
-                    "similarity": doc.metadata.get("similarity"),
-                }
-                for doc in result.get("documents", [])
-            ],
+            "sources": [_source(doc) for doc in result.get("documents", [])],
             "provider": provider or "default",
             "metadata": result.get("metadata", {}),
             "thread_id": thread_id,
         }
 
+    async def query_stream(
+        self,
+        question: str,
+        provider: str | None = None,
+        document_name: str | None = None,
+        thread_id: str | None = None,
+    ) -> AsyncIterator[tuple[str, Any]]:
+        """
+        Run :meth:`query`, yielding the answer's tokens as they are generated.
+
+        Yields ``("token", text)`` for each piece of the answer, ``("reset", "")`` when
+        the text streamed so far was discarded for a fallback answer, and finally
+        ``("result", result)`` with the same dictionary :meth:`query` returns.
+        """
+        queue: asyncio.Queue = asyncio.Queue()
+        sink = _token_sink.set(queue)
+        try:
+            # The task copies the current context, so its generate node sees the queue
+            task = asyncio.create_task(self.query(question, provider, document_name, thread_id))
+        finally:
+            _token_sink.reset(sink)
+        task.add_done_callback(lambda _: queue.put_nowait(None))
+        try:
+            while (event := await queue.get()) is not None:
+                yield event
+            yield "result", task.result()
+        finally:
+            task.cancel()
+
     async def query_simple(
         self,
         question: str,
@@ -374,6 +775,6 @@ Answer:"""
         Returns:
             Answer string
         """
-        llm = self.llm_loader.build_model(provider)
-        response = llm.invoke(question)
+        llm = self.llm_loader.get_model(provider)
+        response = await llm.ainvoke(question)
         return response.content if hasattr(response, "content") else str(response)
@@ -0,0 +1,193 @@
+"""
+Semantic response cache.
+Remembers recent answers per conversation and returns one when a new question's
+embedding is close enough to an earlier question's, skipping retrieval and the
+LLM call entirely. Follow-ups whose meaning depends on the conversation so far
+("why?", "tell me more") are never cached.
+
+The cache lives in each server process; with several workers a question only
+hits in the worker that answered it first. Invalidation is per process too, so
+entries carry the conversation's document generation (read from the database
+before retrieval) and a lookup under a different generation misses. Entries also
+expire after ``SEMANTIC_CACHE_TTL`` seconds.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, List, Optional
+
+import numpy as np
+
+# Cosine similarity above which two questions are treated as the same question
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.93"))
+# Answers remembered per conversation, and conversations remembered per process
+SEMANTIC_CACHE_ENTRIES = int(os.getenv("SEMANTIC_CACHE_ENTRIES", "64"))
+SEMANTIC_CACHE_CONVERSATIONS = int(os.getenv("SEMANTIC_CACHE_CONVERSATIONS", "1024"))
+SEMANTIC_CACHE_TTL = float(os.getenv("SEMANTIC_CACHE_TTL", "1800"))
+# Retrieved chunks are reused for questions at least this similar, for up to this many seconds
+RETRIEVAL_CACHE_THRESHOLD = float(os.getenv("RETRIEVAL_CACHE_THRESHOLD", "0.95"))
+RETRIEVAL_CACHE_TTL = float(os.getenv("RETRIEVAL_CACHE_TTL", "600"))
+# Questions with fewer words than this are treated as follow-ups and bypass the response cache
+SEMANTIC_CACHE_MIN_WORDS = int(os.getenv("SEMANTIC_CACHE_MIN_WORDS", "4"))
+
+# Words that refer back to earlier turns, so the same text can ask something different
+# once the history has moved on
+_FOLLOW_UP_RE = re.compile(
+    r"\b(?:it|its|this|that|these|those|they|them|their|he|she|him|her|above|previous|earlier|again"
+    r"|more|else|continue|go on|elaborate|expand|why|same)\b",
+    re.IGNORECASE,
+)
+
+
+def is_follow_up(question: str) -> bool:
+    """Whether a question depends on the conversation history and so must not be answered from cache."""
+    return (
+        len(question.split()) < SEMANTIC_CACHE_MIN_WORDS
+        or _FOLLOW_UP_RE.search(question) is not None
+    )
+
+
+def _normalize(vector: List[float]) -> np.ndarray:
+    array = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(array)
+    return array / norm if norm else array
+
+
+# Generation of a conversation invalidated in this process; no caller's generation matches it
+_INVALIDATED = object()
+
+
+class _Scope:
+    """One conversation's entries; ``keys`` holds their normalized question embeddings as rows.
+
+    All entries belong to ``generation``; a lookup under another generation empties the scope.
+    """
+
+    __slots__ = ("generation", "keys", "providers", "results", "stored_at")
+
+    def __init__(self, generation: Any, dimensions: int = 0) -> None:
+        self.generation = generation
+        self.keys = np.empty((0, dimensions), dtype=np.float32)
+        self.providers: list[Optional[str]] = []
+        self.results: list[dict[str, Any]] = []
+        self.stored_at = np.empty(0)
+
+
+class SemanticResponseCache:
+    """Per-conversation LRU of (question embedding, provider, result) entries.
+
+    ``provider`` is an exact-match discriminator within a conversation; entries
+    older than ``ttl`` seconds (if set) are never returned. ``generation`` is any
+    comparable version of the data behind the results: read it before computing a
+    result and pass the same value to lookup and store, and results computed under
+    an older generation, or before an ``invalidate``, are neither returned nor kept.
+    """
+
+    def __init__(
+        self,
+        threshold: float = SEMANTIC_CACHE_THRESHOLD,
+        max_entries: int = SEMANTIC_CACHE_ENTRIES,
+        max_conversations: int = SEMANTIC_CACHE_CONVERSATIONS,
+        ttl: Optional[float] = None,
+    ) -> None:
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.max_conversations = max_conversations
+        self.ttl = ttl
+        self._scopes: OrderedDict[int, _Scope] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def lookup(
+        self,
+        conversation_id: int,
+        provider: Optional[str],
+        embedding: List[float],
+        generation: Any = None,
+    ) -> Optional[dict[str, Any]]:
+        """Return the cached result for the most similar earlier question, if similar enough."""
+        query = _normalize(embedding)
+        oldest = time.monotonic() - self.ttl if self.ttl is not None else float("-inf")
+        with self._lock:
+            scope = self._scopes.get(conversation_id)
+            if scope is None:
+                return None
+            self._scopes.move_to_end(conversation_id)
+            if scope.generation != generation:
+                # The data changed since these entries were stored
+                self._scopes[conversation_id] = _Scope(generation)
+                return None
+            # store() replaces rather than mutates these, so they can be read unlocked
+            keys, providers, results, stored_at = (
+                scope.keys,
+                scope.providers,
+                scope.results,
+                scope.stored_at,
+            )
+        if not results:
+            return None
+        # One float32 matrix-vector product scores every earlier question at once
+        scores = keys @ query
+        scores[
+            (stored_at < oldest)
+            | np.array([cached != provider for cached in providers], dtype=bool)
+        ] = -np.inf
+        best = int(np.argmax(scores))
+        return results[best] if scores[best] >= self.threshold else None
+
+    def store(
+        self,
+        conversation_id: int,
+        provider: Optional[str],
+        embedding: List[float],
+        result: dict[str, Any],
+        generation: Any = None,
+    ) -> None:
+        key = _normalize(embedding)
+        now = time.monotonic()
+        with self._lock:
+            scope = self._scopes.get(conversation_id)
+            if scope is None:
+                scope = self._scopes[conversation_id] = _Scope(generation, len(key))
+            elif scope.generation != generation:
+                # Invalidated, or a newer generation was seen, while this result was computed
+                return
+            elif not scope.results:
+                scope.keys = np.empty((0, len(key)), dtype=np.float32)
+            self._scopes.move_to_end(conversation_id)
+            # The key matrix grows once per store instead of being rebuilt per lookup
+            scope.keys = np.vstack((scope.keys, key))[-self.max_entries :]
+            scope.providers = (scope.providers + [provider])[-self.max_entries :]
+            scope.results = (scope.results + [result])[-self.max_entries :]
+            scope.stored_at = np.append(scope.stored_at, now)[-self.max_entries :]
+            while len(self._scopes) > self.max_conversations:
+                self._scopes.popitem(last=False)
+
+    def invalidate(self, conversation_id: int) -> None:
+        """Forget a conversation's answers, e.g. after its documents change.
+
+        Results still being computed from before the call are not stored either.
+        """
+        with self._lock:
+            self._scopes[conversation_id] = _Scope(_INVALIDATED)
+            self._scopes.move_to_end(conversation_id)
+            while len(self._scopes) > self.max_conversations:
+                self._scopes.popitem(last=False)
+
+
+response_cache = SemanticResponseCache(ttl=SEMANTIC_CACHE_TTL)
+# Chunks retrieved per conversation and document filter, reused for near-duplicate
+# questions regardless of which provider answers them
+retrieval_cache = SemanticResponseCache(
+    threshold=RETRIEVAL_CACHE_THRESHOLD, ttl=RETRIEVAL_CACHE_TTL
+)
+
+
+def invalidate_conversation(conversation_id: int) -> None:
+    """Drop cached answers and retrievals for a conversation whose documents changed."""
+    response_cache.invalidate(conversation_id)
+    retrieval_cache.invalidate(conversation_id)
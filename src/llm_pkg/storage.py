@@ -5,17 +5,31 @@ Uses PostgreSQL with pgvector for vector storage.
 
 from __future__ import annotations
 
+import asyncio
+import functools
+import hashlib
+import mmap
 import os
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
-from typing import Iterable, List, Optional
+from typing import TYPE_CHECKING, BinaryIO, Iterable, List, Optional
 
+import numpy as np
 from langchain_core.documents import Document
 from langchain_core.embeddings import Embeddings
 from langchain_core.vectorstores import VectorStore
+from pgvector import HalfVector
+from sqlalchemy import TextClause, delete, text
 
 from llm_pkg.database.models import Document as DBDocument
-from llm_pkg.database.models import get_db
+from llm_pkg.database.models import (DB_NULL_POOL, HNSW_EF_SEARCH, AsyncSessionLocal, SessionLocal,
+                                     bulk_insert_documents, copy_insert_documents, halfvec_literal)
+
+if TYPE_CHECKING:
+    from fastapi import UploadFile
 
 # Determine storage directory with safe fallbacks. Priority:
 # 1) STORAGE_DIR env var
@@ -35,28 +49,40 @@ else:
     STORAGE_DIR = DOCKER_STORAGE
 
 
+# The storage directory last created or found by _ensure_storage_dir. Compared with
+# STORAGE_DIR rather than kept as a flag, so reassigning STORAGE_DIR (tests) still works.
+_ready_storage_dir: Optional[Path] = None
+
+
 def _ensure_storage_dir() -> None:
     """Create the storage directory if it doesn't exist.
 
     This is called lazily by functions that write to disk to avoid permission
-    issues during import in development environments.
+    issues during import in development environments. After the first success
+    it is a comparison, not a mkdir system call per write.
     """
+    global _ready_storage_dir
+    if _ready_storage_dir == STORAGE_DIR:
+        return
     try:
         STORAGE_DIR.mkdir(parents=True, exist_ok=True)
     except Exception as e:
         raise RuntimeError(
             f"Unable to create storage directory at {STORAGE_DIR}: {e}"
         ) from e
+    _ready_storage_dir = STORAGE_DIR
 
 
 class DocumentMetadata:
     """Document metadata for file storage."""
 
-    def __init__(self, path: Path) -> None:
-        self.path = path
-        self.uploaded_at = datetime.fromtimestamp(path.stat().st_mtime)
+    def __init__(self, path: Path | os.DirEntry[str]) -> None:
+        # One stat call, cached on the entry when listed through os.scandir
+        stat = path.stat()
+        self.path = Path(path)
+        self.uploaded_at = datetime.fromtimestamp(stat.st_mtime)
         self.name = path.name
-        self.size_bytes = path.stat().st_size
+        self.size_bytes = stat.st_size
 
     def to_dict(self) -> dict[str, str | int]:
         return {
@@ -67,66 +93,307 @@ class DocumentMetadata:
         }
 
 
+def _write_file(target_path: Path, data: bytes) -> None:
+    """Write ``data`` with unbuffered os.write calls; the bytes are already in memory."""
+    fd = os.open(target_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        view = memoryview(data)
+        while view:
+            view = view[os.write(fd, view):]
+    finally:
+        os.close(fd)
+
+
 def save_document(
-    file_bytes: bytes, filename: str, user_id: Optional[int] = None
+    file_bytes: bytes, filename: str, user_id: Optional[int] = None,
+    extracted_text: Optional[str] = None,
 ) -> Path:
-    """Save document to file system and database."""
+    """Save document to file system and database.
+
+    The database row's content is ``extracted_text``, the document's text as
+    produced by DocumentProcessor. Without it the content is left NULL rather
+    than filled with the raw bytes decoded as UTF-8, which for PDFs and other
+    binary files is a full-size copy of mostly garbage.
+    """
     _ensure_storage_dir()
 
     target_path = STORAGE_DIR / filename
-    with target_path.open("wb") as out_file:
-        out_file.write(file_bytes)
+    _write_file(target_path, file_bytes)
+    record_document(target_path, filename, user_id, extracted_text)
+
+    return target_path
 
+
+def record_document(
+    target_path: Path, filename: Optional[str] = None, user_id: Optional[int] = None,
+    extracted_text: Optional[str] = None,
+) -> None:
+    """Insert the database row for a file already in the storage directory.
+
+    ``extracted_text`` becomes the row's content, as in save_document.
+    """
     # Save to database (best-effort) - tests may not have a DB available, so do not raise on DB errors
     import logging
     logger = logging.getLogger(__name__)
 
-    db = None
     try:
-        db = next(get_db())
-        try:
-            content = file_bytes.decode("utf-8", errors="ignore")
+        with SessionLocal() as db:
             db_doc = DBDocument(
-                filename=filename,
-                content=content,
+                filename=filename or target_path.name,
+                content=extracted_text,
                 file_path=str(target_path),
                 user_id=user_id,
             )
             db.add(db_doc)
             db.commit()
-            db.refresh(db_doc)
-        except Exception as e:
-            # Log and continue without failing - some environments (tests) won't have DB configured
-            logger.warning(f"Failed to save document metadata to DB: {e}")
-    finally:
-        if db is not None:
-            db.close()
+    except Exception as e:
+        # Log and continue without failing - some environments (tests) won't have DB configured
+        logger.warning(f"Failed to save document metadata to DB: {e}")
+
+
+async def save_document_async(
+    file_bytes: bytes, filename: str, user_id: Optional[int] = None,
+    extracted_text: Optional[str] = None,
+) -> Path:
+    """save_document for async callers: the file and database writes run in a worker thread."""
+    return await asyncio.to_thread(save_document, file_bytes, filename, user_id, extracted_text)
+
+
+# Read size used when streaming uploads to disk; bounds per-upload memory use.
+UPLOAD_CHUNK_SIZE = 1 << 20
+
+
+def _copy_and_hash(source: BinaryIO, target_path: Path) -> str:
+    """Copy ``source`` to ``target_path`` through one reused buffer, returning the SHA-256."""
+    digest = hashlib.sha256()
+    buffer = bytearray(UPLOAD_CHUNK_SIZE)
+    view = memoryview(buffer)
+    with target_path.open("wb") as out_file:
+        while size := source.readinto(view):
+            digest.update(view[:size])
+            out_file.write(view[:size])
+    return digest.hexdigest()
+
+
+def _stream_to_storage(source: BinaryIO, filename: str) -> tuple[Path, str]:
+    # The hidden temporary name is skipped by _scan_storage until the file is moved
+    fd, temp_name = tempfile.mkstemp(dir=STORAGE_DIR, prefix=".upload-")
+    os.close(fd)
+    temp_path = Path(temp_name)
+    try:
+        digest = _copy_and_hash(source, temp_path)
+        target_path = STORAGE_DIR / digest / Path(filename).name
+        target_path.parent.mkdir(exist_ok=True)
+        os.replace(temp_path, target_path)
+    except BaseException:
+        temp_path.unlink(missing_ok=True)
+        raise
+    return target_path, digest
+
+
+async def save_document_stream(
+    upload_file: UploadFile, filename: str
+) -> tuple[Path, str]:
+    """Stream an uploaded file to the file system without buffering it whole.
+
+    Peak memory is bounded by UPLOAD_CHUNK_SIZE rather than the file size. The
+    SHA-256 of the content is computed in the same pass so callers can key
+    caches and detect duplicate uploads without re-reading the file. The whole
+    copy runs in a single worker thread instead of hopping to the threadpool
+    for every chunk read and write.
+
+    The file is stored as ``<sha256>/<filename>``, so uploads that share a name
+    never overwrite each other while they wait in the ingest queue: a path only
+    ever holds the content its hash names.
+
+    Returns:
+        Tuple of the saved path and the hex SHA-256 digest of its content
+    """
+    _ensure_storage_dir()
+
+    return await asyncio.to_thread(_stream_to_storage, upload_file.file, filename)
+
+
+def save_document_file(source_path: Path, filename: Optional[str] = None) -> Path:
+    """Copy a local file into the storage directory without reading it into memory.
+
+    shutil.copyfile uses the kernel's copy_file_range/sendfile fast path on
+    Linux, so the bytes never pass through Python buffers. Unlike save_document
+    it writes no database row; call record_document once the text is extracted.
+    """
+    _ensure_storage_dir()
+
+    target_path = STORAGE_DIR / (filename or source_path.name)
+    shutil.copyfile(source_path, target_path)
 
     return target_path
 
 
+def _scan_storage() -> list[os.DirEntry[str]]:
+    """Files in the storage directory sorted by name, skipping hidden files like glob("*").
+
+    Conversation uploads live in per-hash subdirectories and are tracked by their
+    database rows, so they are not listed here.
+    """
+    try:
+        with os.scandir(STORAGE_DIR) as entries:
+            return sorted((entry for entry in entries if not entry.name.startswith(".") and entry.is_file()),
+                          key=lambda e: e.name)
+    except FileNotFoundError:
+        return []
+
+
 def list_documents() -> Iterable[Path]:
     """List all document files. If storage dir doesn't exist, return empty iterator."""
-    if not STORAGE_DIR.exists():
-        return []
-    return sorted(STORAGE_DIR.glob("*"))
+    return [Path(entry.path) for entry in _scan_storage()]
 
 
 def list_document_metadata() -> list[DocumentMetadata]:
     """List metadata for all document files."""
-    return [DocumentMetadata(path) for path in list_documents()]
+    return [DocumentMetadata(entry) for entry in _scan_storage()]
 
 
 def read_document(path: Path) -> Document:
-    """Read document from file system."""
+    """Read document from file system.
+
+    The file is memory-mapped and decoded straight from the mapping, so no
+    bytes copy of it is made next to the decoded text.
+    """
     with path.open("rb") as doc_file:
-        content = doc_file.read()
+        if os.fstat(doc_file.fileno()).st_size == 0:
+            # Empty files cannot be mapped
+            content = ""
+        else:
+            with mmap.mmap(doc_file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                if hasattr(mapped, "madvise"):
+                    mapped.madvise(mmap.MADV_SEQUENTIAL)
+                content = str(mapped, "utf-8", "ignore")
     return Document(
-        page_content=content.decode("utf-8", errors="ignore"),
+        page_content=content,
         metadata={"source": str(path), "filename": path.name},
     )
 
 
+# Number of coarse candidates fetched from the binary-quantized index before
+# exact re-ranking in similarity_search; pooled connections already use it as ef_search.
+RERANK_CANDIDATES = HNSW_EF_SEARCH
+# hybrid_search fuses the top HYBRID_POOL chunks of the vector and full-text rankings
+# with Reciprocal Rank Fusion (RRF_K dampens the lead of the very first ranks),
+# weighting the vector ranking by HYBRID_VECTOR_WEIGHT and the keyword one by the rest
+HYBRID_POOL = 50
+RRF_K = 60
+HYBRID_VECTOR_WEIGHT = float(os.getenv("HYBRID_VECTOR_WEIGHT", "0.6"))
+
+# Texts per embed_documents request when indexing chunks
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "512"))
+# Embedding requests in flight at once in add_texts and aadd_texts
+EMBED_CONCURRENCY = int(os.getenv("EMBED_CONCURRENCY", "8"))
+# Chunk batches at least this large are written with COPY instead of INSERT
+COPY_MIN_ROWS = 32
+
+
+# Per-transaction HNSW settings for a search, for when the connection's defaults
+# (SEARCH_SESSION_SETTINGS) do not cover it. Iterative scans (pgvector 0.8+) keep
+# walking the graph when the user_id filter discards rows, instead of returning
+# fewer candidates; order is restored by the exact re-rank anyway.
+_SET_SEARCH_OPTIONS = text(
+    "SELECT set_config('hnsw.ef_search', :ef_search, true), "
+    "set_config('hnsw.iterative_scan', 'relaxed_order', true)"
+)
+
+
+def _search_results(rows: Iterable) -> List[Document]:
+    return [
+        Document(
+            page_content=row.content,
+            metadata={
+                "source": row.filename,
+                "id": row.id,
+                "similarity": float(row.similarity),
+            },
+        )
+        for row in rows
+    ]
+
+
+@functools.cache
+def _search_sql(in_conversation: bool, hybrid: bool) -> TextClause:
+    """One of the four search statements, built once so every search reuses the same
+    SQL text (and with asyncpg, the same prepared statement)."""
+    # Only search within conversation-specific documents for strict isolation.
+    # If no conversation_id, only search documents without conversation. Each
+    # filter implies the predicate of one of the partial HNSW indexes.
+    if in_conversation:
+        scope_filter = "conversation_id = :conversation_id"
+    else:
+        scope_filter = "conversation_id IS NULL"
+
+    # Two-stage search: a Hamming-distance pass over the binary-quantized
+    # shadow column picks coarse candidates from its HNSW index, then the
+    # candidates are re-ranked by exact cosine similarity on the halfvec: stored and
+    # query embeddings are unit length, so that is the inner product (<#> is its
+    # negation) and skips the two norms <=> computes per row. Only
+    # the final rows are joined back for their filename and content, so the
+    # candidate sort carries just ids and embeddings.
+    candidates = f"""
+        SELECT id, embedding
+        FROM documents
+        WHERE embedding IS NOT NULL
+        AND user_id = :user_id
+        AND {scope_filter}
+        ORDER BY embedding_bin <~> binary_quantize(CAST(:query_embedding AS halfvec(1536)))
+        LIMIT :candidates
+    """
+    if not hybrid:
+        return text(f"""
+            SELECT d.id, d.filename, d.content, -ranked.distance as similarity
+            FROM (
+                SELECT id, embedding <#> CAST(:query_embedding AS halfvec(1536)) AS distance
+                FROM ({candidates}) AS candidates
+                ORDER BY distance
+                LIMIT :k
+            ) AS ranked JOIN documents d ON d.id = ranked.id
+            ORDER BY ranked.distance
+        """)
+    # Rank the top HYBRID_POOL chunks by each method, then order their union
+    # by the weighted sum of 1 / (RRF_K + rank) over the rankings they appear in
+    return text(f"""
+        WITH vector_ranked AS (
+            SELECT id, row_number() OVER (
+                ORDER BY embedding <#> CAST(:query_embedding AS halfvec(1536))) AS rank
+            FROM ({candidates}) AS candidates
+            ORDER BY rank
+            LIMIT :pool
+        ), keyword_ranked AS (
+            SELECT id, row_number() OVER (ORDER BY ts_rank_cd(content_tsv, tsquery) DESC) AS rank
+            FROM documents, plainto_tsquery('english', :keywords) AS tsquery
+            WHERE content_tsv @@ tsquery
+            AND user_id = :user_id
+            AND {scope_filter}
+            ORDER BY rank
+            LIMIT :pool
+        ), fused AS (
+            SELECT coalesce(v.id, kw.id) AS id,
+                   coalesce(CAST(:vector_weight AS float8) / (:rrf_k + v.rank), 0)
+                   + coalesce(CAST(:keyword_weight AS float8) / (:rrf_k + kw.rank), 0) AS score
+            FROM vector_ranked v FULL OUTER JOIN keyword_ranked kw ON kw.id = v.id
+            ORDER BY score DESC
+            LIMIT :k
+        )
+        SELECT d.id, d.filename, d.content,
+               -(d.embedding <#> CAST(:query_embedding AS halfvec(1536))) as similarity
+        FROM fused JOIN documents d ON d.id = fused.id
+        ORDER BY fused.score DESC
+    """)
+
+
+def unit_vectors(embeddings: List[float] | List[List[float]]) -> np.ndarray:
+    """Scale an embedding, or each row of a batch, to unit L2 norm as float32."""
+    vectors = np.array(embeddings, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
 class PostgreSQLVectorStore(VectorStore):
     """PostgreSQL-based vector store using pgvector."""
 
@@ -143,31 +410,63 @@ class PostgreSQLVectorStore(VectorStore):
     def add_texts(
         self, texts: List[str], metadatas: Optional[List[dict]] = None, **kwargs
     ) -> List[str]:
-        """Add texts to the vector store."""
-        embeddings = self.embedding_function.embed_documents(texts)
-
-        db = next(get_db())
-        try:
-            ids = []
-            for i, (text, embedding) in enumerate(zip(texts, embeddings)):
-                metadata = metadatas[i] if metadatas else {}
-
-                # Create document record
-                db_doc = DBDocument(
-                    filename=metadata.get("source", f"chunk_{i}"),
-                    content=text,
-                    embedding=embedding,
-                    user_id=self.user_id,
-                    conversation_id=self.conversation_id,
-                )
-                db.add(db_doc)
-                db.commit()
-                db.refresh(db_doc)
-                ids.append(str(db_doc.id))
+        """Add texts to the vector store, embedding up to EMBED_CONCURRENCY batches at once."""
+        texts = list(texts)
+        batches = [texts[start:start + EMBED_BATCH_SIZE] for start in range(0, len(texts), EMBED_BATCH_SIZE)]
+        if len(batches) > 1:
+            # Overlap the embedding API round trips; map() keeps the batches in order
+            with ThreadPoolExecutor(max_workers=min(EMBED_CONCURRENCY, len(batches))) as executor:
+                embedded = list(executor.map(self.embedding_function.embed_documents, batches))
+        else:
+            embedded = [self.embedding_function.embed_documents(batch) for batch in batches]
+        embeddings = [embedding for batch in embedded for embedding in batch]
+
+        return self._insert_chunks(texts, embeddings, metadatas)
+
+    async def aadd_texts(
+        self, texts: Iterable[str], metadatas: Optional[List[dict]] = None, **kwargs
+    ) -> List[str]:
+        """Add texts to the vector store, embedding up to EMBED_CONCURRENCY batches at once."""
+        texts = list(texts)
+        semaphore = asyncio.Semaphore(EMBED_CONCURRENCY)
+
+        async def embed_batch(batch: List[str]) -> List[List[float]]:
+            async with semaphore:
+                return await self.embedding_function.aembed_documents(batch)
+
+        batches = await asyncio.gather(*(
+            embed_batch(texts[start:start + EMBED_BATCH_SIZE])
+            for start in range(0, len(texts), EMBED_BATCH_SIZE)
+        ))
+        embeddings = [embedding for batch in batches for embedding in batch]
+
+        return await asyncio.to_thread(self._insert_chunks, texts, embeddings, metadatas)
+
+    def _insert_chunks(
+        self, texts: List[str], embeddings: List[List[float]], metadatas: Optional[List[dict]]
+    ) -> List[str]:
+        metadatas = metadatas or [{}] * len(texts)
+        # Searches rank by inner product, which needs unit-length vectors
+        embeddings = unit_vectors(embeddings)
+        rows = [
+            {
+                "filename": metadata.get("source", f"chunk_{i}"),
+                "content": text,
+                "embedding": embedding,
+                "user_id": self.user_id,
+                "conversation_id": self.conversation_id,
+                # The uploaded document's row id, carried in the chunk metadata
+                "source_document_id": metadata.get("id"),
+            }
+            for i, (text, embedding, metadata) in enumerate(zip(texts, embeddings, metadatas))
+        ]
+        with SessionLocal() as db:
+            # Large uploads stream through COPY; small batches use multi-row INSERTs
+            insert_rows = copy_insert_documents if len(rows) >= COPY_MIN_ROWS else bulk_insert_documents
+            ids = [str(doc_id) for doc_id in insert_rows(db, rows)]
+            db.commit()
 
             return ids
-        finally:
-            db.close()
 
     def similarity_search(self, query: str, k: int = 10, **kwargs) -> List[Document]:
         """Search for similar documents.
@@ -176,80 +475,83 @@ class PostgreSQLVectorStore(VectorStore):
             query: Search query
             k: Number of results to return (default 10 to get chunks from multiple docs)
         """
-        query_embedding = self.embedding_function.embed_query(query)
-
-        db = next(get_db())
-        try:
-            # Use pgvector's cosine similarity
-            from sqlalchemy import text
-
-            # Build query to find similar documents
-            # Only search within conversation-specific documents for strict isolation
-            if self.conversation_id:
-                sql = text("""
-                    SELECT id, filename, content,
-                           1 - (embedding <=> :query_embedding) as similarity
-                    FROM documents
-                    WHERE embedding IS NOT NULL
-                    AND user_id = :user_id
-                    AND conversation_id = :conversation_id
-                    ORDER BY embedding <=> :query_embedding
-                    LIMIT :k
-                """)
-                result = db.execute(
-                    sql,
-                    {
-                        "query_embedding": query_embedding,
-                        "user_id": self.user_id,
-                        "conversation_id": self.conversation_id,
-                        "k": k,
-                    },
-                )
-            else:
-                # If no conversation_id, only search documents without conversation
-                sql = text("""
-                    SELECT id, filename, content,
-                           1 - (embedding <=> :query_embedding) as similarity
-                    FROM documents
-                    WHERE embedding IS NOT NULL
-                    AND user_id = :user_id
-                    AND conversation_id IS NULL
-                    ORDER BY embedding <=> :query_embedding
-                    LIMIT :k
-                """)
-                result = db.execute(
-                    sql,
-                    {"query_embedding": query_embedding, "user_id": self.user_id, "k": k},
-                )
-
-            documents = []
-            for row in result:
-                doc = Document(
-                    page_content=row.content,
-                    metadata={
-                        "source": row.filename,
-                        "id": row.id,
-                        "similarity": float(row.similarity),
-                    },
-                )
-                documents.append(doc)
-
-            return documents
-        finally:
-            db.close()
+        return self.similarity_search_by_vector(self.embedding_function.embed_query(query), k=k)
+
+    def similarity_search_by_vector(self, embedding: List[float], k: int = 10, **kwargs) -> List[Document]:
+        """Search for documents similar to an already computed query embedding."""
+        return self._search(embedding, k)
+
+    def hybrid_search(self, query: str, k: int = 10, embedding: Optional[List[float]] = None) -> List[Document]:
+        """Search by vector similarity and full-text match, fused with Reciprocal Rank Fusion.
+
+        Exact keyword matches (filenames, identifiers copied from a document) that the
+        embedding ranks poorly still surface. ``embedding`` skips re-embedding ``query``.
+        """
+        if embedding is None:
+            embedding = self.embedding_function.embed_query(query)
+        return self._search(embedding, k, query)
+
+    async def asimilarity_search(self, query: str, k: int = 10, **kwargs) -> List[Document]:
+        """Async similarity_search, querying over the asyncpg pool instead of a worker thread."""
+        return await self.asimilarity_search_by_vector(await self.embedding_function.aembed_query(query), k=k)
+
+    async def asimilarity_search_by_vector(self, embedding: List[float], k: int = 10, **kwargs) -> List[Document]:
+        return await self._asearch(embedding, k)
+
+    async def ahybrid_search(self, query: str, k: int = 10, embedding: Optional[List[float]] = None) -> List[Document]:
+        """Async hybrid_search, querying over the asyncpg pool instead of a worker thread."""
+        if embedding is None:
+            embedding = await self.embedding_function.aembed_query(query)
+        return await self._asearch(embedding, k, query)
+
+    def _search(self, embedding: List[float], k: int, keywords: Optional[str] = None) -> List[Document]:
+        sql, params = self._search_statement(k, keywords)
+        # psycopg2 interpolates parameters into the SQL text, so send the short float16 form
+        params["query_embedding"] = halfvec_literal(unit_vectors(embedding))
+        with SessionLocal() as db:
+            if params["ef_search"] is not None:
+                db.execute(_SET_SEARCH_OPTIONS, {"ef_search": params["ef_search"]})
+            return _search_results(db.execute(sql, params))
+
+    async def _asearch(self, embedding: List[float], k: int, keywords: Optional[str] = None) -> List[Document]:
+        sql, params = self._search_statement(k, keywords)
+        # Bound in pgvector's binary format (codecs registered on the asyncpg engine)
+        params["query_embedding"] = HalfVector(unit_vectors(embedding).astype(np.float16))
+        async with AsyncSessionLocal() as db:
+            if params["ef_search"] is not None:
+                await db.execute(_SET_SEARCH_OPTIONS, {"ef_search": params["ef_search"]})
+            return _search_results(await db.execute(sql, params))
+
+    def _search_statement(self, k: int, keywords: Optional[str] = None) -> tuple[TextClause, dict]:
+        """The search SQL and its parameters other than the query embedding, shared by the sync and async paths."""
+        params = {
+            "user_id": self.user_id,
+            "k": k,
+            "candidates": max(k, RERANK_CANDIDATES),
+        }
+        if self.conversation_id:
+            params["conversation_id"] = self.conversation_id
+        if keywords is not None:
+            params.update(keywords=keywords, pool=max(k, HYBRID_POOL), rrf_k=RRF_K,
+                          vector_weight=HYBRID_VECTOR_WEIGHT, keyword_weight=1 - HYBRID_VECTOR_WEIGHT)
+        # An HNSW scan yields at most hnsw.ef_search rows (default 40), which would
+        # silently cap the first stage well below the requested candidate count
+        # (pgvector accepts up to 1000). None when the connection's default suffices.
+        ef_search = min(params["candidates"], 1000)
+        params["ef_search"] = str(ef_search) if DB_NULL_POOL or ef_search > HNSW_EF_SEARCH else None
+        return _search_sql(bool(self.conversation_id), keywords is not None), params
 
     def delete(self, ids: Optional[List[str]] = None, **kwargs) -> None:
         """Delete documents by IDs."""
         if not ids:
             return
 
-        db = next(get_db())
-        try:
+        with SessionLocal() as db:
             doc_ids = [int(id) for id in ids]
-            db.query(DBDocument).filter(DBDocument.id.in_(doc_ids)).delete()
+            # One DELETE statement; nothing is loaded into or synchronized with the session
+            db.execute(delete(DBDocument).where(DBDocument.id.in_(doc_ids)),
+                       execution_options={"synchronize_session": False})
             db.commit()
-        finally:
-            db.close()
 
     @classmethod
     def from_texts(
@@ -28,6 +28,41 @@ class TestStorage:
         assert path.name == filename
         assert path.read_bytes() == content
 
+    @pytest.mark.asyncio
+    async def test_save_document_stream(self, tmp_path):
+        """Test streaming an upload to disk in chunks."""
+        import hashlib
+        import io
+
+        from fastapi import UploadFile
+
+        import llm_pkg.storage as storage
+
+        storage.STORAGE_DIR = tmp_path
+        content = b"x" * (storage.UPLOAD_CHUNK_SIZE + 10)
+        upload = UploadFile(file=io.BytesIO(content), filename="big.txt")
+
+        path, digest = await storage.save_document_stream(upload, "big.txt")
+
+        assert path == tmp_path / digest / "big.txt"
+        assert path.read_bytes() == content
+        assert digest == hashlib.sha256(content).hexdigest()
+        # Per-hash upload directories are not listed
+        assert list(storage.list_documents()) == []
+
+    def test_save_document_file(self, tmp_path):
+        """Test copying a local file into storage."""
+        import llm_pkg.storage as storage
+
+        storage.STORAGE_DIR = tmp_path / "store"
+        source = tmp_path / "src.txt"
+        source.write_bytes(b"y" * 4096)
+
+        path = storage.save_document_file(source)
+
+        assert path == tmp_path / "store" / "src.txt"
+        assert path.read_bytes() == source.read_bytes()
+
     def test_list_documents(self, tmp_path):
         """Test listing documents."""
         import llm_pkg.storage as storage
@@ -54,6 +89,25 @@ class TestStorage:
         assert metadata.size_bytes > 0
         assert metadata.uploaded_at is not None
 
+    def test_copy_field_escapes_text(self):
+        """Test values are rendered in COPY's text format."""
+        from llm_pkg.database.models import _copy_field
+
+        assert _copy_field(None) == "\\N"
+        assert _copy_field([0.5, -1.0]) == "[0.5,-1.0]"
+        assert _copy_field([0.1, 1 / 3]) == "[0.1,0.3333]"
+        assert _copy_field("a\tb\nc\\d") == "a\\tb\\nc\\\\d"
+
+    def test_unit_vectors(self):
+        """Test embeddings are scaled to unit length, leaving zero vectors alone."""
+        from llm_pkg.storage import unit_vectors
+
+        assert unit_vectors([3.0, 4.0]).tolist() == pytest.approx([0.6, 0.8])
+        assert unit_vectors([[0.0, 2.0], [0.0, 0.0]]).tolist() == [
+            [0.0, 1.0],
+            [0.0, 0.0],
+        ]
+
 
 class TestDocumentProcessor:
     """Test document processor."""
@@ -104,6 +158,201 @@ class TestDocumentProcessor:
         assert docs[0].metadata["source"] == "test.txt"
 
 
+class TestIngest:
+    """Test background ingestion bookkeeping."""
+
+    @pytest.mark.asyncio
+    async def test_cancelled_ingest_releases_claim(self, monkeypatch, tmp_path):
+        """Test a document interrupted by shutdown is released instead of left claimed."""
+        import asyncio
+
+        import llm_pkg.ingest as ingest
+
+        released = []
+        monkeypatch.setattr(ingest, "_claim_document", lambda document_id: True)
+        monkeypatch.setattr(ingest, "_release_claim", released.append)
+
+        class Processor:
+            async def process_document(self, path, page_text=True):
+                raise asyncio.CancelledError
+
+        with pytest.raises(asyncio.CancelledError):
+            await ingest.ingest_document(Processor(), 7, tmp_path / "doc.txt", 1)
+        assert released == [7]
+
+
+class TestEmbeddingCache:
+    """Test the query embedding cache."""
+
+    def test_cached_embedder_reuses_query_embeddings(self):
+        """Test repeated queries hit the cache and old entries are evicted."""
+        from langchain_core.embeddings import FakeEmbeddings
+
+        from llm_pkg.embedding_cache import CachedEmbedder
+
+        embedder = CachedEmbedder(FakeEmbeddings(size=4), maxsize=2)
+
+        first = embedder.embed_query("hello")
+        # Served from the float16 in-memory copy
+        assert embedder.embed_query("hello") == pytest.approx(first, rel=1e-3, abs=1e-4)
+
+        embedder.embed_query("a")
+        embedder.embed_query("b")
+        assert embedder.stats() == {"hits": 1, "misses": 3, "size": 2, "maxsize": 2}
+        # "hello" was evicted
+        embedder.embed_query("hello")
+        assert embedder.stats()["misses"] == 4
+
+    def test_cached_embedder_async_query_hits_memory(self):
+        """Test aembed_query answers repeated questions from the cache."""
+        import asyncio
+
+        from langchain_core.embeddings import DeterministicFakeEmbedding
+
+        from llm_pkg.embedding_cache import CachedEmbedder
+
+        embedder = CachedEmbedder(DeterministicFakeEmbedding(size=8))
+        first = asyncio.run(embedder.aembed_query("same question"))
+        second = asyncio.run(embedder.aembed_query("same question"))
+
+        assert second == pytest.approx(first, rel=1e-3, abs=1e-4)
+        assert embedder.stats()["hits"] == 1
+        assert embedder.stats()["misses"] == 1
+
+    def test_cached_embedder_persists_to_disk(self, tmp_path):
+        """Test embeddings written by one cache are served from disk by the next."""
+        from langchain_core.embeddings import DeterministicFakeEmbedding
+
+        from llm_pkg.embedding_cache import CachedEmbedder
+
+        path = tmp_path / "emb_cache.sqlite"
+        inner = DeterministicFakeEmbedding(size=4)
+        expected = CachedEmbedder(inner, path=path).embed_query("hello")
+
+        reloaded = CachedEmbedder(inner, path=path)
+        assert reloaded.embed_query("hello") == pytest.approx(expected)
+        assert reloaded.stats()["hits"] == 1
+
+    def test_cached_embedder_dedupes_document_texts(self):
+        """Test only unseen, distinct chunk texts reach the embeddings provider."""
+        from langchain_core.embeddings import DeterministicFakeEmbedding
+
+        from llm_pkg.embedding_cache import CachedEmbedder
+
+        calls = []
+
+        class CountingEmbeddings(DeterministicFakeEmbedding):
+            def embed_documents(self, texts):
+                calls.append(list(texts))
+                return super().embed_documents(texts)
+
+        inner = CountingEmbeddings(size=4)
+        embedder = CachedEmbedder(inner)
+
+        first = embedder.embed_documents(["header", "body", "header"])
+        second = embedder.embed_documents(["body", "footer"])
+
+        assert calls == [["header", "body"], ["footer"]]
+        assert first[0] == first[2] == inner.embed_query("header")
+        assert second[0] == pytest.approx(first[1], rel=1e-3, abs=1e-4)
+
+    def test_semantic_response_cache(self):
+        """Test similar questions hit per conversation and provider until invalidated."""
+        from llm_pkg.response_cache import SemanticResponseCache
+
+        cache = SemanticResponseCache(threshold=0.9)
+        result = {"answer": "42", "sources": []}
+        cache.store(1, None, [1.0, 0.0], result)
+
+        assert cache.lookup(1, None, [0.99, 0.05]) is result
+        assert cache.lookup(1, None, [0.0, 1.0]) is None
+        assert cache.lookup(1, "openai", [1.0, 0.0]) is None
+        assert cache.lookup(2, None, [1.0, 0.0]) is None
+
+        cache.invalidate(1)
+        assert cache.lookup(1, None, [1.0, 0.0]) is None
+
+    def test_semantic_cache_generations(self):
+        """Test results computed under an older document generation are neither returned nor kept."""
+        from llm_pkg.response_cache import SemanticResponseCache
+
+        cache = SemanticResponseCache(threshold=0.9)
+        cache.store(1, None, [1.0, 0.0], {"answer": "old"}, generation=1)
+        assert cache.lookup(1, None, [1.0, 0.0], generation=1) is not None
+        assert cache.lookup(1, None, [1.0, 0.0], generation=2) is None
+
+        # Stored by a query that started before the documents changed
+        cache.store(1, None, [1.0, 0.0], {"answer": "stale"}, generation=1)
+        assert cache.lookup(1, None, [1.0, 0.0], generation=2) is None
+
+        # Invalidated while the answer was being computed
+        cache.invalidate(1)
+        cache.store(1, None, [1.0, 0.0], {"answer": "stale"}, generation=2)
+        assert cache.lookup(1, None, [1.0, 0.0], generation=2) is None
+
+    def test_follow_up_questions_bypass_cache(self):
+        """Test short or anaphoric questions are treated as follow-ups."""
+        from llm_pkg.response_cache import is_follow_up
+
+        assert is_follow_up("why?")
+        assert is_follow_up("tell me more")
+        assert is_follow_up("What does that mean for the budget")
+        assert not is_follow_up("What is the capital of France?")
+
+    def test_semantic_cache_entries_expire(self, monkeypatch):
+        """Test entries older than the cache's TTL are not returned."""
+        import llm_pkg.response_cache as response_cache
+
+        cache = response_cache.SemanticResponseCache(threshold=0.9, ttl=60)
+        cache.store(1, None, [1.0, 0.0], {"documents": []})
+        assert cache.lookup(1, None, [1.0, 0.0]) is not None
+
+        now = response_cache.time.monotonic()
+        monkeypatch.setattr(response_cache.time, "monotonic", lambda: now + 61)
+        assert cache.lookup(1, None, [1.0, 0.0]) is None
+
+
+class TestQAEngine:
+    """Test QA engine helpers."""
+
+    def test_cosine_top_k(self):
+        """Test the fallback ranking orders rows by cosine similarity, not magnitude."""
+        from llm_pkg.qa_engine import cosine_top_k
+
+        vectors = [[10.0, 0.0], [0.0, 1.0], [1.0, 1.0], [-1.0, 0.0]]
+
+        assert cosine_top_k(vectors, [1.0, 0.1], 2) == [0, 2]
+        assert cosine_top_k(vectors, [0.1, 2.0], 10) == [1, 2, 0, 3]
+
+    def test_small_talk_detection(self):
+        """Test only messages made entirely of pleasantries skip retrieval."""
+        from llm_pkg.qa_engine import _SMALL_TALK_RE
+
+        for message in ["hi", "Thanks!", "ok, thank you.", " Good morning "]:
+            assert _SMALL_TALK_RE.fullmatch(message)
+        for message in [
+            "hi, what does the report say?",
+            "okay so what is chapter 2 about",
+            "history",
+        ]:
+            assert not _SMALL_TALK_RE.fullmatch(message)
+
+    def test_rolling_history(self):
+        """Test the history keeps the newest messages within its message and token limits."""
+        from llm_pkg.qa_engine import RollingHistory
+
+        history = RollingHistory(len, max_messages=3, token_budget=50)
+        for i in range(4):
+            history.append("User", f"question {i}")
+
+        assert history.text() == "User: question 1\nUser: question 2\nUser: question 3"
+
+        history.append("Assistant", "x" * 20)
+        assert history.text() == "User: question 3\nAssistant: " + "x" * 20
+        history.append("Assistant", "y" * 40)
+        assert len(history) == 1
+
+
 class TestConfig:
     """Test configuration loading."""
 
@@ -115,6 +364,74 @@ class TestConfig:
         assert len(llm_loader.providers) > 0
         assert llm_loader.default is not None
 
+    def test_serialized_providers_cached_until_reload(self):
+        """Test the /config payload is reused until the config is reloaded."""
+        from llm_pkg.config import LLMLoader
+
+        loader = LLMLoader()
+        first = loader.serialized_providers()
+
+        assert loader.serialized_providers() is first
+        assert set(first["providers"]) == set(loader.providers)
+
+        loader.reload()
+        assert loader.serialized_providers() is not first
+
+    def test_get_model_cached_until_reload(self, monkeypatch):
+        """Test built models are reused per provider until the config is reloaded."""
+        from llm_pkg.config import LLMLoader
+
+        loader = LLMLoader()
+        monkeypatch.setattr(loader, "build_model", lambda name=None, **kw: object())
+
+        model = loader.get_model("openai")
+
+        assert loader.get_model("openai") is model
+        assert loader.get_model("openai", temperature=0.1) is not model
+        stop = loader.get_model("openai", stop=["\n"])
+        assert loader.get_model("openai", stop=["\n"]) is stop
+
+        loader.reload()
+        assert loader.get_model("openai") is not model
+
+    def test_placeholder_api_keys_are_not_sent(self, tmp_path, monkeypatch):
+        """Test any <...> api_key is replaced from the environment instead of used as a key."""
+        import llm_pkg.config as config
+
+        captured = {}
+        monkeypatch.setattr(
+            config, "init_chat_model", lambda **kwargs: captured.update(kwargs)
+        )
+        monkeypatch.setenv("OPENAI_API_KEY", "sk-test")
+        path = tmp_path / "llm_config.toml"
+        path.write_text(
+            '[openai]\nprovider = "openai"\nmodel = "gpt-4o"\napi_key = "<your api-key>"\n'
+        )
+        loader = config.LLMLoader(path)
+
+        loader.build_model("openai")
+        assert captured["openai_api_key"] == "sk-test"
+
+    def test_reload_skips_unchanged_file(self, tmp_path):
+        """Test the TOML is only re-parsed when its mtime changes."""
+        import os
+
+        from llm_pkg.config import LLMLoader
+
+        config = tmp_path / "llm_config.toml"
+        config.write_text('[openai]\nprovider = "openai"\nmodel = "gpt-4o"\n')
+        loader = LLMLoader(config)
+        first = loader.providers["openai"]
+
+        loader.reload()
+        assert loader.providers["openai"] is first
+
+        config.write_text('[openai]\nprovider = "openai"\nmodel = "gpt-4o-mini"\n')
+        stat = config.stat()
+        os.utime(config, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+        loader.reload()
+        assert loader.providers["openai"].model == "gpt-4o-mini"
+
 
 @pytest.mark.asyncio
 async def test_fastapi_health():
@@ -162,3 +479,21 @@ async def test_fastapi_config():
 
         assert response.status_code == 200
         assert "providers" in response.json()
+
+
+@pytest.mark.asyncio
+async def test_fastapi_deprecated_endpoints_gone():
+    """Test deprecated endpoints answer 410 without reaching a handler."""
+    from httpx import ASGITransport, AsyncClient
+
+    from llm_pkg.app import app
+
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test"
+    ) as client:
+        upload = await client.post("/upload", files={"file": ("a.txt", b"data")})
+        listing = await client.get("/documents")
+
+        assert upload.status_code == 410
+        assert "/chat/upload-document" in upload.json()["detail"]
+        assert listing.status_code == 410
@@ -2,9 +2,14 @@
 """
 Token count helper using tiktoken.
 Usage: python tools/token_check.py --model gpt-4o --text "Some text here"
+       python tools/token_check.py --model gpt-4o --glob "data/uploads/*.txt"
 """
 
 import argparse
+import functools
+import glob
+import os
+from typing import Iterator
 
 try:
     import tiktoken
@@ -13,13 +18,64 @@ except ImportError:
     raise
 
 
-def count_tokens(model: str, text: str) -> int:
+@functools.lru_cache(maxsize=32)
+def _get_encoder(model: str) -> "tiktoken.Encoding":
+    """Resolve a model's encoding once; repeated lookups (and the fallback warning) are skipped."""
     try:
-        enc = tiktoken.encoding_for_model(model)
+        return tiktoken.encoding_for_model(model)
     except Exception:
         print(f"Warning: no exact encoder for {model}, using cl100k_base fallback")
-        enc = tiktoken.get_encoding("cl100k_base")
-    return len(enc.encode(text))
+        return tiktoken.get_encoding("cl100k_base")
+
+
+def count_tokens(model: str, text: str) -> int:
+    return len(_get_encoder(model).encode(text))
+
+
+ENCODE_THREADS = min(8, os.cpu_count() or 1)
+# Text read per piece when streaming a file; ENCODE_THREADS pieces are encoded at once
+CHUNK_BYTES = 1 << 20
+
+
+def count_tokens_batch(model: str, texts: list[str]) -> list[int]:
+    """Token counts for several texts, encoded in parallel by tiktoken's native threads."""
+    encoded = _get_encoder(model).encode_batch(texts, num_threads=ENCODE_THREADS)
+    return [len(tokens) for tokens in encoded]
+
+
+def _file_pieces(path: str) -> Iterator[str]:
+    """Yield a text file in pieces of about CHUNK_BYTES, split after a line break.
+
+    Blank lines stay with the piece before them: tiktoken merges runs of line
+    breaks into one token, so a piece never starts with one.
+    """
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        piece: list[str] = []
+        while lines := f.readlines(CHUNK_BYTES):
+            start = 0
+            while start < len(lines) and not lines[start].strip():
+                start += 1
+            piece.extend(lines[:start])
+            if piece and start < len(lines):
+                yield "".join(piece)
+                piece = []
+            piece.extend(lines[start:])
+        if piece:
+            yield "".join(piece)
+
+
+def count_file_tokens(model: str, path: str) -> int:
+    """Token count of a file, streamed so only a few pieces are in memory at a time."""
+    total = 0
+    batch: list[str] = []
+    for piece in _file_pieces(path):
+        batch.append(piece)
+        if len(batch) == ENCODE_THREADS:
+            total += sum(count_tokens_batch(model, batch))
+            batch = []
+    if batch:
+        total += sum(count_tokens_batch(model, batch))
+    return total
 
 
 def main():
@@ -29,22 +85,46 @@ def main():
     parser.add_argument(
         "--model", required=True, help="Model name (e.g., gpt-4o or openai/gpt-4o)"
     )
-    parser.add_argument(
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument(
         "--text",
-        required=True,
         help="Text to encode (wrap in quotes) or path: file://path.txt",
     )
+    source.add_argument(
+        "--glob",
+        help="Count every file matching a pattern (e.g. 'docs/**/*.md'), reporting per-file counts",
+    )
     args = parser.parse_args()
 
-    text = args.text
+    if args.glob:
+        paths = sorted(
+            path
+            for path in glob.glob(args.glob, recursive=True)
+            if os.path.isfile(path)
+        )
+        texts = []
+        for path in paths:
+            with open(path, "r", encoding="utf-8", errors="ignore") as f:
+                texts.append(f.read())
+        counts = count_tokens_batch(args.model, texts)
+        print(f"Model: {args.model}")
+        for path, tokens in zip(paths, counts):
+            print(f"{path}: {tokens}")
+        print(f"Files: {len(paths)}")
+        print(f"Token count: {sum(counts)}")
+        return
+
     if args.text.startswith("file://"):
         path = args.text[len("file://") :]
-        with open(path, "r", encoding="utf-8") as f:
-            text = f.read()
+        tokens = count_file_tokens(args.model, path)
+        print(f"Model: {args.model}")
+        print(f"File size: {os.path.getsize(path)} bytes")
+        print(f"Token count: {tokens}")
+        return
 
-    tokens = count_tokens(args.model, text)
+    tokens = count_tokens(args.model, args.text)
     print(f"Model: {args.model}")
-    print(f"Text length: {len(text)} chars")
+    print(f"Text length: {len(args.text)} chars")
     print(f"Token count: {tokens}")
 
 